@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import CustomUser, MentorProfile, MenteeProfile, InvitationToken
+from .models import CustomUser, MentorProfile, MenteeProfile, InvitationToken, OutboundEmail, Language
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+from django.utils import timezone
+from core.thumbnails import thumbnail_url
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -10,18 +12,27 @@ class CustomUserAdmin(UserAdmin):
 
 
 
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'position')
+    ordering = ('position',)
+
+
+
+
 @admin.register(MentorProfile)
 class MentorProfileAdmin(admin.ModelAdmin):
-    list_display = ('user_email', 'language', 'get_bio_summary', 'get_profile_picture')
-    search_fields = ('user__email', 'professional_career', 'language')
-    list_filter = ('language',)
+    list_display = ('user_email', 'get_languages', 'get_bio_summary', 'get_profile_picture')
+    search_fields = ('user__email', 'professional_career', 'languages__name')
+    list_filter = ('languages',)
+    filter_horizontal = ('languages',)
 
     fieldsets = (
         ('User Information', {
             'fields': ('user',)
         }),
         ('Professional Information', {
-            'fields': ('bio', 'professional_career', 'language')
+            'fields': ('bio', 'professional_career', 'languages')
         }),
         ('Profile Media', {
             'fields': ('profile_picture',)
@@ -29,10 +40,18 @@ class MentorProfileAdmin(admin.ModelAdmin):
     )
     
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').prefetch_related('languages')
+
+
     @admin.display(description='Mentor Email', empty_value='-')
     def user_email(self, obj):
         return obj.user.email
 
+    @admin.display(description='Languages')
+    def get_languages(self, obj):
+        return obj.formatted_languages
+
     @admin.display(description='Bio Summary')
     def get_bio_summary(self, obj):
         return (obj.bio[:75] + '...') if obj.bio and len(obj.bio) > 75 else obj.bio
@@ -42,7 +61,7 @@ class MentorProfileAdmin(admin.ModelAdmin):
         if obj.profile_picture:
             return format_html(
                 '<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 50%;" />',
-                obj.profile_picture.url
+                thumbnail_url(obj.profile_picture, 128)
             )
         return '-'
 
@@ -51,9 +70,10 @@ class MentorProfileAdmin(admin.ModelAdmin):
 
 @admin.register(MenteeProfile)
 class MenteeProfileAdmin(admin.ModelAdmin):
-    list_display = ('user_email', 'location', 'language', 'created_at', 'get_profile_picture')
+    list_display = ('user_email', 'location', 'get_languages', 'created_at', 'get_profile_picture')
     search_fields = ('user__email', 'location', 'professional_career', 'professional_goal')
-    list_filter = ('location',)
+    list_filter = ('location', 'languages')
+    filter_horizontal = ('languages',)
     readonly_fields = ('created_at', 'updated_at')
 
     fieldsets = (
@@ -64,7 +84,7 @@ class MenteeProfileAdmin(admin.ModelAdmin):
             'fields': ('bio', 'profile_picture')
         }),
         ('Professional Information', {
-            'fields': ('professional_career', 'professional_goal', 'location', 'language', 'cv_file')
+            'fields': ('professional_career', 'professional_goal', 'location', 'languages', 'cv_file')
         }),
         ('Mentor Feedback', {
             'classes': ('collapse',),
@@ -76,9 +96,17 @@ class MenteeProfileAdmin(admin.ModelAdmin):
     )
 
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').prefetch_related('languages')
+
+
     @admin.display(description='Mentee Email', empty_value='-')
     def user_email(self, obj):
         return obj.user.email
+
+    @admin.display(description='Languages')
+    def get_languages(self, obj):
+        return obj.formatted_languages
     
 
     @admin.display(description='Profile Picture')
@@ -86,7 +114,7 @@ class MenteeProfileAdmin(admin.ModelAdmin):
         if obj.profile_picture:
             return format_html(
                 '<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 50%;" />',
-                obj.profile_picture.url
+                thumbnail_url(obj.profile_picture, 128)
             )
         return '-'
 
@@ -102,4 +130,24 @@ class InvitationTokenAdmin(admin.ModelAdmin):
     @admin.display(description='Inviting Mentor Email', empty_value='-')
     def mentor_email(self, obj):
         return obj.mentor.email
-   
+
+
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status__in=[OutboundEmail.SENT, OutboundEmail.SENDING]).update(
+            status=OutboundEmail.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'{updated} emails queued for retry.')
@@ -0,0 +1,98 @@
+"""
+Background extraction of the text of mentee CVs.
+
+Saving a profile with a new ``cv_file`` marks it ``cv_text_pending``
+(``accounts.signals``). The ``extract_cv_text`` command reads the PDFs in a
+process pool (``core.pdftext``), then stores the normalized text, used by
+mentee search, and its key terms, used by mentor matching.
+
+Work is keyed on the stored file, whose name is its content digest
+(core.storage): a CV that was already read for any profile is copied instead
+of extracted again, so re-running a batch is cheap and gives the same result.
+"""
+
+import logging
+
+from django.db import connection
+from django.utils import timezone
+
+from core.pdftext import extract_text
+
+from . import search
+from .invitations import chunked
+from .matching import tokenize
+from .models import MenteeProfile
+
+logger = logging.getLogger(__name__)
+
+
+
+KEY_TERMS = 30
+
+
+
+def key_terms(text):
+    return ' '.join(term for term, _ in tokenize(text).most_common(KEY_TERMS))
+
+
+
+def known_texts(names):
+    """{file name: (text, terms)} for CVs already read for some profile."""
+    found = {}
+    for chunk in chunked(list(names), connection.features.max_query_params):
+        rows = MenteeProfile.objects.filter(cv_text_source__in=chunk, cv_text_pending=False)
+        for name, text, terms in rows.values_list('cv_text_source', 'cv_text', 'cv_terms'):
+            found[name] = (text, terms)
+    return found
+
+
+
+def extract_pending(map_function=map, batch_size=50):
+    """
+    Read one batch of pending CVs and return how many profiles it updated.
+    ``map_function`` runs the extraction, e.g. ``ProcessPoolExecutor.map``.
+    """
+    rows = list(
+        MenteeProfile.objects.filter(cv_text_pending=True)
+        .order_by('pk')
+        .values_list('pk', 'cv_file')[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    names = {name for _, name in rows}
+    results = known_texts(names)
+
+    storage = MenteeProfile._meta.get_field('cv_file').storage
+    missing = sorted(names - results.keys())
+
+    for name, (text, error) in zip(missing, map_function(extract_text, [storage.path(name) for name in missing])):
+        if error:
+            logger.warning(f'Could not read the text of CV {name}: {error}')
+        results[name] = (text, key_terms(text))
+
+    now = timezone.now()
+    for pk, name in rows:
+        text, terms = results[name]
+        # Skipped when the CV was replaced meanwhile; the new one stays pending.
+        # updated_at moves so matching re-reads the profile.
+        MenteeProfile.objects.filter(pk=pk, cv_file=name).update(
+            cv_text=text,
+            cv_terms=terms,
+            cv_text_source=name,
+            cv_text_pending=False,
+            updated_at=now,
+        )
+
+    search.reindex_mentees([pk for pk, _ in rows])
+    return len(rows)
+
+
+
+def queue_all():
+    """Mark every CV for extraction again (e.g. after improving the extractor)."""
+    return (
+        MenteeProfile.objects.exclude(cv_file='')
+        .exclude(cv_file__isnull=True)
+        .update(cv_text_pending=True)
+    )
@@ -0,0 +1,115 @@
+"""
+Cached role and profile ids of the signed-in user.
+
+Most pages need the user's own profile, or their mentor's, only to filter by
+it. ``identity(user)`` loads those ids (and the profile picture the page
+headers show) in one query, keeps them in the shared cache for TIMEOUT
+seconds and on the user object for the rest of the request. The helpers below
+turn them into profile instances whose other fields are deferred: they load
+only if something reads them.
+
+Saving or deleting a user or a profile drops the cached entry
+(``accounts.signals``), in every worker, since the cache is shared.
+"""
+
+import zlib
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404
+
+from .models import CustomUser, MenteeProfile, MentorProfile
+
+
+
+CACHE_ALIAS = 'shared'
+TIMEOUT = 60
+
+FIELDS = ('mentor_profile__id', 'mentor_profile__profile_picture', 'mentee_profile__id', 'mentee_profile__profile_picture', 'mentor__mentor_profile__id')
+
+
+
+def cache_key(user_id):
+    # Per database, so test and benchmark databases never see the site's entries
+    database = zlib.crc32(str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME']).encode())
+    return f'identity:{database:x}:{user_id}'
+
+
+
+def identity(user):
+    """
+    {'mentor_profile': (id, picture) or None, 'mentee_profile': (id, picture) or None,
+    'mentors_profile_id': the profile id of the user's mentor or None}.
+    """
+    found = getattr(user, '_identity', None)
+    if found is not None:
+        return found
+
+    cache = caches[CACHE_ALIAS]
+    key = cache_key(user.pk)
+    found = cache.get(key)
+
+    if found is None:
+        # From the primary: a lagging replica must not be cached for everyone
+        row = CustomUser.objects.using(DEFAULT_DB_ALIAS).filter(pk=user.pk).values_list(*FIELDS).first()
+        row = row or (None,) * len(FIELDS)
+        mentor_id, mentor_picture, mentee_id, mentee_picture, mentors_profile_id = row
+        found = {
+            'mentor_profile': (mentor_id, mentor_picture or '') if mentor_id else None,
+            'mentee_profile': (mentee_id, mentee_picture or '') if mentee_id else None,
+            'mentors_profile_id': mentors_profile_id,
+        }
+        cache.set(key, found, TIMEOUT)
+
+    user._identity = found
+    return found
+
+
+
+def forget(user_ids):
+    caches[CACHE_ALIAS].delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+
+def deferred(model, values):
+    """An instance of ``model`` with only ``values`` loaded, the other fields on first access."""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+
+def own_mentor_profile(user):
+    found = identity(user)['mentor_profile']
+    if found is None:
+        return None
+    return deferred(MentorProfile, {'id': found[0], 'user_id': user.pk, 'profile_picture': found[1]})
+
+
+def own_mentee_profile(user):
+    found = identity(user)['mentee_profile']
+    if found is None:
+        return None
+    return deferred(MenteeProfile, {'id': found[0], 'user_id': user.pk, 'profile_picture': found[1]})
+
+
+def assigned_mentor_profile(user):
+    """The profile of a mentee's mentor, or None."""
+    profile_id = identity(user)['mentors_profile_id']
+    if profile_id is None:
+        return None
+    return deferred(MentorProfile, {'id': profile_id, 'user_id': user.mentor_id})
+
+
+
+def mentor_profile_or_404(user):
+    profile = own_mentor_profile(user)
+    if profile is None:
+        raise Http404('No MentorProfile matches the given query.')
+    return profile
+
+
+def mentee_profile_or_404(user):
+    profile = own_mentee_profile(user)
+    if profile is None:
+        raise Http404('No MenteeProfile matches the given query.')
+    return profile
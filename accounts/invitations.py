@@ -0,0 +1,193 @@
+"""
+Mentee invitations, one at a time or a whole cohort from a CSV file.
+"""
+
+import csv
+import io
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import CustomUser, InvitationToken, OutboundEmail
+
+
+
+INVITATION_LIFETIME = timedelta(hours=24)
+
+# Per-row outcomes of a bulk invitation
+INVITED = 'invited'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+REGISTERED = 'registered'
+PENDING = 'pending'
+
+
+
+def invitation_message(mentor_email, invite_url):
+    subject = 'Invite to join MatkaMestre'
+    body = f'Hello!\n\n You have been invited by {mentor_email} to join MatkaMestre as a Mentee. Use this link to register:{invite_url}\n\nImportant: this invite link is valid for 24 hours.\n\nKind regards,\nMatkaMestre Team.'
+    return subject, body
+
+
+
+def read_emails_from_csv(file):
+    """Return the first column of every row, skipping an optional 'email' header."""
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    emails = []
+    for row in csv.reader(io.StringIO(content)):
+        if not row or not row[0].strip():
+            continue
+        emails.append(row[0].strip())
+
+    if emails and emails[0].lower() in ('email', 'e-mail', 'mentee_email'):
+        emails = emails[1:]
+
+    return emails
+
+
+
+def chunked(items, size):
+    items = list(items)
+    size = size or len(items) or 1
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+
+def normalize_email(email):
+    """Invitations are stored and compared in lowercase."""
+    return email.strip().lower()
+
+
+
+# Compared lowercased on both sides: older rows keep the case they were stored with
+
+def registered_emails(emails):
+    """The normalized ``emails`` that already belong to a user."""
+    found = set()
+    for chunk in chunked(emails, connection.features.max_query_params):
+        found.update(
+            CustomUser.objects.alias(email_lower=Lower('email'))
+            .filter(email_lower__in=chunk)
+            .values_list(Lower('email'), flat=True)
+        )
+    return found
+
+
+def pending_emails(emails):
+    """The normalized ``emails`` with an active invitation."""
+    found = set()
+    for chunk in chunked(emails, connection.features.max_query_params):
+        found.update(
+            InvitationToken.objects.alias(email_lower=Lower('mentee_email'))
+            .filter(email_lower__in=chunk, is_used=False, expires_at__gt=timezone.now())
+            .values_list(Lower('mentee_email'), flat=True)
+        )
+    return found
+
+
+
+def bulk_invite(mentor, emails, build_invite_url):
+    """
+    Invite every address in ``emails`` on behalf of ``mentor``.
+
+    Addresses are lowercased, then checked against registered users and
+    active invitations, whatever their case, with one set-based query each
+    (split only to respect the database's parameter limit). Tokens are created
+    with bulk_create and the invitation emails are queued in the outbox for
+    send_queued_emails. ``build_invite_url`` turns a token into the
+    registration link. Returns a list of (email, outcome) pairs in input
+    order, with the addresses as given.
+    """
+    outcomes = []
+    candidates = set()
+
+    for email in emails:
+        key = normalize_email(email)
+        try:
+            validate_email(key)
+        except ValidationError:
+            outcomes.append((email, INVALID))
+            continue
+
+        if key in candidates:
+            outcomes.append((email, DUPLICATE))
+            continue
+
+        candidates.add(key)
+        outcomes.append((email, None))
+
+    registered = registered_emails(candidates)
+    pending = pending_emails(candidates)
+
+    expires_at = timezone.now() + INVITATION_LIFETIME
+    tokens = []
+    emails_to_send = []
+
+    for index, (email, outcome) in enumerate(outcomes):
+        if outcome is not None:
+            continue
+
+        key = normalize_email(email)
+        if key in registered:
+            outcomes[index] = (email, REGISTERED)
+            continue
+        if key in pending:
+            outcomes[index] = (email, PENDING)
+            continue
+
+        token = str(uuid4())
+        subject, body = invitation_message(mentor.email, build_invite_url(token))
+
+        tokens.append(InvitationToken(token=token, mentee_email=key, mentor=mentor, expires_at=expires_at))
+        emails_to_send.append(OutboundEmail(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to_email=key))
+        outcomes[index] = (email, INVITED)
+
+    with transaction.atomic():
+        InvitationToken.objects.bulk_create(tokens, batch_size=1000)
+        OutboundEmail.objects.bulk_create(emails_to_send, batch_size=1000)
+
+    return outcomes
+
+
+
+def purge_invitation_tokens(keep_days=7, chunk_size=5000, pause=0.0):
+    """
+    Delete used and expired invitation tokens in bounded chunks.
+
+    Tokens that expired more than ``keep_days`` ago go first, then tokens
+    that were already used. Each chunk is its own short DELETE ... WHERE id IN
+    (SELECT ... LIMIT n), so the table is never locked for long. Returns the
+    number of deleted rows.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(days=keep_days)
+
+    stale = [
+        InvitationToken.objects.filter(expires_at__lt=cutoff),
+        InvitationToken.objects.filter(expires_at__gte=cutoff, is_used=True),
+    ]
+
+    deleted = 0
+    for queryset in stale:
+        while True:
+            count, _ = InvitationToken.objects.filter(pk__in=queryset.values('pk')[:chunk_size]).delete()
+            if not count:
+                break
+
+            deleted += count
+
+            if pause:
+                time.sleep(pause)
+
+    return deleted
@@ -0,0 +1,143 @@
+"""
+Database-backed outbox for outgoing email.
+
+Views only call ``enqueue_email``; the ``send_queued_emails`` management
+command drains the outbox in batches over a single backend connection,
+retrying failures with exponential backoff until they are dead-lettered.
+
+A batch is claimed in a short transaction (status SENDING, with a lease until
+``next_attempt_at``) and sent after the commit, so no database lock is held
+while the mail server answers. Each result is recorded on its own. Emails
+whose lease ran out, because their worker died, are claimed again.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+
+def enqueue_email(subject, message, recipient, from_email=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to_email=recipient,
+    )
+
+
+
+def retry_delay(attempts, backoff_seconds):
+    return timedelta(seconds=min(backoff_seconds * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+
+def record_failure(email, error, max_attempts, backoff_seconds, now):
+    # The attempt was counted when the email was claimed
+    email.last_error = str(error)[:2000]
+
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.DEAD
+        logger.error(f"Outbound email {email.pk} to {email.to_email} dead-lettered after {email.attempts} attempts: {error}")
+    else:
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = now + retry_delay(email.attempts, backoff_seconds)
+        logger.warning(f"Outbound email {email.pk} to {email.to_email} failed (attempt {email.attempts}): {error}")
+
+    email.save(update_fields=['last_error', 'status', 'next_attempt_at'])
+
+
+
+def reclaim_expired(now, max_attempts):
+    """Put emails whose sending worker never finished back in the queue; returns how many."""
+    expired = OutboundEmail.objects.filter(status=OutboundEmail.SENDING, next_attempt_at__lte=now)
+    expired.filter(attempts__gte=max_attempts).update(
+        status=OutboundEmail.DEAD,
+        last_error='The sending worker stopped before the email was sent.',
+    )
+    return expired.update(status=OutboundEmail.PENDING)
+
+
+
+def claim_batch(batch_size, lease_seconds, now):
+    """Mark a batch of due emails SENDING and count their attempt; commits before returning."""
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=ids, status=OutboundEmail.PENDING).update(
+            status=OutboundEmail.SENDING,
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        )
+
+    return list(OutboundEmail.objects.filter(pk__in=ids, status=OutboundEmail.SENDING).order_by('id'))
+
+
+
+def send_queued_emails(batch_size=100, max_attempts=5, backoff_seconds=60, lease_seconds=600):
+    """
+    Send one batch of due emails over a single connection.
+
+    Returns a tuple of (sent, failed) counts. Rows are claimed with
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it, so
+    several workers can drain the same outbox. ``lease_seconds`` must cover
+    sending a whole batch.
+    """
+    now = timezone.now()
+    reclaim_expired(now, max_attempts)
+
+    batch = claim_batch(batch_size, lease_seconds, now)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            record_failure(email, e, max_attempts, backoff_seconds, now)
+        return 0, len(batch)
+
+    sent = 0
+    failed = 0
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.to_email],
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                record_failure(email, e, max_attempts, backoff_seconds, now)
+                failed += 1
+                continue
+
+            OutboundEmail.objects.filter(pk=email.pk, status=OutboundEmail.SENDING).update(
+                status=OutboundEmail.SENT,
+                sent_at=timezone.now(),
+                last_error='',
+            )
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from accounts.invitations import purge_invitation_tokens
+from accounts.models import InvitationToken
+from core.benchmarking import benchmark_database, create_mentor
+
+
+
+def active_invitation_exists(email):
+    return InvitationToken.objects.filter(mentee_email=email, is_used=False, expires_at__gt=timezone.now()).exists()
+
+
+
+class Command(BaseCommand):
+    help = 'Measure active-invitation lookups and token purging on a large InvitationToken table.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--active-ratio', type=float, default=0.02, help='Share of tokens that are still usable.')
+        parser.add_argument('--probes', type=int, default=500)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        random.seed(42)
+
+        with benchmark_database(keepdb=options['keepdb']):
+            mentor = create_mentor('tokens').user
+            self.stdout.write(f'Database: {connection.vendor}, {rows:,} tokens')
+
+            began = time.perf_counter()
+            self.seed(mentor, rows, options['active_ratio'])
+            self.stdout.write(f'Seeded in {time.perf_counter() - began:.1f}s')
+
+            emails = [f'mentee{random.randrange(rows)}@example.com' for _ in range(options['probes'])]
+
+            indexed = self.measure(emails)
+            self.stdout.write(f'Active lookup with index:    {indexed * 1e6:>10,.0f} us')
+
+            indexes = list(InvitationToken._meta.indexes)
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(InvitationToken, index)
+
+            scan = self.measure(emails[:max(1, len(emails) // 20)])
+            self.stdout.write(f'Active lookup without index: {scan * 1e6:>10,.0f} us')
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(InvitationToken, index)
+
+            began = time.perf_counter()
+            deleted = purge_invitation_tokens(keep_days=0, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - began
+            chunks = max(1, -(-deleted // options['chunk_size']))
+
+            self.stdout.write(
+                f'Purged {deleted:,} tokens in {elapsed:.1f}s '
+                f'({chunks} chunks, {elapsed / chunks * 1000:.0f} ms per chunk), '
+                f'{InvitationToken.objects.count():,} left'
+            )
+
+            after = self.measure(emails)
+            self.stdout.write(f'Active lookup after purge:   {after * 1e6:>10,.0f} us')
+
+
+    def seed(self, mentor, rows, active_ratio, batch=50_000):
+        now = timezone.now()
+
+        for offset in range(0, rows, batch):
+            tokens = []
+            for i in range(offset, min(rows, offset + batch)):
+                roll = random.random()
+                if roll < active_ratio:
+                    expires_at, is_used = now + timedelta(hours=random.randint(1, 24)), False
+                elif roll < active_ratio + 0.2:
+                    expires_at, is_used = now - timedelta(days=random.randint(1, 365)), True
+                else:
+                    expires_at, is_used = now - timedelta(days=random.randint(1, 365)), False
+
+                tokens.append(InvitationToken(
+                    token=uuid4().hex,
+                    mentee_email=f'mentee{i}@example.com',
+                    mentor=mentor,
+                    expires_at=expires_at,
+                    is_used=is_used,
+                ))
+
+            InvitationToken.objects.bulk_create(tokens, batch_size=5000)
+
+
+    def measure(self, emails):
+        timings = []
+        for email in emails:
+            begin = time.perf_counter()
+            active_invitation_exists(email)
+            timings.append(time.perf_counter() - begin)
+        return statistics.median(timings)
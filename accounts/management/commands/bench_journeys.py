@@ -0,0 +1,120 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmarking import benchmark_database, run_journeys, seed_volumes, summarize
+
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the main user journeys (login and dashboards, booking a slot, creating and listing tasks) '
+        'through the full request stack on a seeded database and report latency percentiles, '
+        'queries per request and throughput.'
+    )
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the seeded volumes (1k mentors, 50k mentees, 1M slots, 500k tasks).')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data and of the journeys.')
+        parser.add_argument('--iterations', type=int, default=50, help='Runs of each journey.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Journeys run at once, one thread each.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unrecorded runs of each journey first.')
+        parser.add_argument('--json', help='Write the results to this file.')
+        parser.add_argument('--baseline', help='Fail when a step is slower (p95) or makes more queries than in this earlier --json file.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed growth of p95 and of queries per request against --baseline (0.2 = 20%%).')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database, and its data, between runs.')
+
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            volumes = seed_volumes(options['scale'], options['seed'], self.stdout.write)
+
+            setup_test_environment(debug=False)
+            try:
+                results, wall = run_journeys(
+                    volumes, options['iterations'], options['concurrency'], options['seed'], warmup=options['warmup']
+                )
+            finally:
+                teardown_test_environment()
+
+        report = self.report(results, wall, volumes, options)
+
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['tolerance'])
+
+
+    def report(self, results, wall, volumes, options):
+        steps = summarize(results)
+        self.stdout.write(
+            f"\n{'step':<20} {'runs':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'errors':>7}"
+        )
+        for step, row in steps.items():
+            self.stdout.write(
+                f"{step:<20} {row['runs']:>6} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+                f"{row['p99_ms']:>7.1f}ms {row['queries']:>8} {row['errors']:>7}"
+            )
+
+        requests = sum(row['runs'] for row in steps.values())
+        throughput = requests / wall if wall else 0.0
+        self.stdout.write(
+            f'\n{requests:,} requests in {wall:.1f}s with {options["concurrency"]} thread(s): {throughput:.1f} requests/s'
+        )
+
+        errors = sum(row['errors'] for row in steps.values())
+        if errors:
+            self.stdout.write(self.style.WARNING(f'{errors} request(s) did not succeed'))
+
+        return {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'scale': options['scale'],
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'concurrency': options['concurrency'],
+                'volumes': volumes,
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'wall_s': round(wall, 2),
+            'throughput_rps': round(throughput, 2),
+            'steps': steps,
+        }
+
+
+    def compare(self, report, path, tolerance):
+        with open(path) as source:
+            baseline = json.load(source)
+
+        for key in ('scale', 'concurrency', 'database'):
+            if baseline['meta'].get(key) != report['meta'][key]:
+                self.stdout.write(self.style.WARNING(
+                    f"The baseline was run with {key}={baseline['meta'].get(key)}, this run with {report['meta'][key]}"
+                ))
+
+        regressions = []
+        for step, before in baseline.get('steps', {}).items():
+            now = report['steps'].get(step)
+            if now is None:
+                continue
+            if now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{step}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+            # Seeded data drifts a little as journeys add rows, so queries get the same tolerance
+            if now['queries'] > before['queries'] * (1 + tolerance):
+                regressions.append(f"{step}: {before['queries']} -> {now['queries']} queries per request")
+
+        if regressions:
+            raise CommandError('Slower than the baseline:\n  ' + '\n  '.join(regressions))
+
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path} (tolerance {tolerance:.0%})'))
@@ -0,0 +1,115 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from accounts import matching
+from accounts.models import CustomUser, Language, MentorProfile, MenteeProfile
+from core.benchmarking import benchmark_database
+
+
+
+FIELDS = {
+    'software': 'python django javascript react backend frontend developer cloud devops kubernetes testing api',
+    'data': 'data analyst analytics sql statistics machine learning python dashboards visualization modelling',
+    'health': 'nurse nursing hospital patient care clinical healthcare elderly registered licence',
+    'finance': 'accounting finance bookkeeping audit tax controller budgeting reporting payroll excel',
+    'design': 'design designer figma user experience interface research prototyping branding graphic',
+    'logistics': 'logistics warehouse supply chain procurement transport forklift inventory planning',
+    'teaching': 'teacher teaching school pupils curriculum classroom early childhood education pedagogy',
+    'hospitality': 'restaurant kitchen chef hotel service customer tourism cleaning reception',
+}
+LOCATIONS = ['Helsinki', 'Espoo', 'Tampere', 'Turku', 'Oulu', 'Remote']
+LANGUAGE_CODES = ['en', 'fi', 'sv', 'es', 'pt', 'ar', 'ru', 'uk', 'fa', 'so']
+
+
+
+def profile_text(field, words=40):
+    vocabulary = FIELDS[field].split()
+    other = FIELDS[random.choice(list(FIELDS))].split()
+    return ' '.join(random.choice(vocabulary if random.random() < 0.8 else other) for _ in range(words))
+
+
+
+class Command(BaseCommand):
+    help = 'Measure mentor suggestions for many mentees against many mentors.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=2000)
+        parser.add_argument('--mentees', type=int, default=10000)
+        parser.add_argument('--top', type=int, default=5)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        random.seed(42)
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.seed(options['mentors'], options['mentees'])
+            cache.clear()
+            matching._index['signature'] = None
+
+            mentees = list(MenteeProfile.objects.all())
+            self.stdout.write(f"{len(mentees):,} mentees against {options['mentors']:,} mentors")
+
+            for label in ('Cold cache', 'Warm cache'):
+                began = time.perf_counter()
+                matching.suggest_mentors_for_mentees(mentees, k=options['top'])
+                elapsed = time.perf_counter() - began
+                self.stdout.write(f'{label}: {elapsed:.2f}s ({elapsed / len(mentees) * 1000:.2f} ms per mentee)')
+
+            mentor = MentorProfile.objects.first()
+            mentor.bio = 'Recently moved into data engineering.'
+            mentor.save()
+
+            began = time.perf_counter()
+            matching.suggest_mentors(mentees[0], k=options['top'])
+            self.stdout.write(f'One mentor edited, single mentee: {(time.perf_counter() - began) * 1000:.1f} ms')
+
+
+    def seed(self, mentor_count, mentee_count):
+        password = make_password(None)
+        fields = list(FIELDS)
+        languages = {language.code: language for language in Language.objects.all()}
+
+        mentor_users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'match-mentor-{i}', email=f'match-mentor-{i}@example.com', password=password, is_mentor=True)
+            for i in range(mentor_count)
+        ], batch_size=1000)
+        mentors = MentorProfile.objects.bulk_create([
+            MentorProfile(user=user, professional_career=profile_text(random.choice(fields)))
+            for user in mentor_users
+        ], batch_size=1000)
+
+        mentee_users = CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'match-mentee-{i}',
+                email=f'match-mentee-{i}@example.com',
+                password=password,
+                mentor=random.choice(mentor_users) if random.random() < 0.5 else None,
+            )
+            for i in range(mentee_count)
+        ], batch_size=1000)
+        mentees = MenteeProfile.objects.bulk_create([
+            MenteeProfile(
+                user=user,
+                location=random.choice(LOCATIONS),
+                professional_career=profile_text(random.choice(fields), 30),
+                professional_goal=profile_text(random.choice(fields), 15),
+            )
+            for user in mentee_users
+        ], batch_size=1000)
+
+        for model, profiles, column in (
+            (MentorProfile, mentors, 'mentorprofile'),
+            (MenteeProfile, mentees, 'menteeprofile'),
+        ):
+            through = model.languages.through
+            through.objects.bulk_create([
+                through(**{column: profile, 'language': languages[code]})
+                for profile in profiles
+                for code in random.sample(LANGUAGE_CODES, random.randint(1, 3))
+            ], batch_size=5000)
@@ -0,0 +1,131 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from accounts import search
+from accounts.models import CustomUser, MenteeProfile
+from core.benchmarking import benchmark_database
+
+
+
+SYLLABLES = ['ai', 'no', 'mik', 'ko', 'fa', 'ti', 'ma', 'ah', 'med', 'ol', 'ga', 'ri', 'ju', 'an', 'li', 'pri', 'ya', 'om', 'ar', 'el', 'e', 'na', 'yu', 'suf', 'vir', 'ta', 'nen', 'kor', 'ho', 'has', 'san', 'iva', 'sil', 'va', 'gar', 'ci', 'wang', 'shar', 'no', 'vak']
+LOCATIONS = ['Helsinki', 'Espoo', 'Vantaa', 'Tampere', 'Turku', 'Oulu', 'Jyväskylä', 'Lahti', 'Kuopio', 'Remote']
+WORDS = (
+    'python developer nurse accountant designer logistics teacher chef data analyst marketing sales '
+    'engineer cloud backend frontend finance healthcare education hospitality warehouse research'
+).split()
+
+
+
+def random_name():
+    return ''.join(random.choice(SYLLABLES) for _ in range(random.randint(2, 4)))
+
+
+
+class Command(BaseCommand):
+    help = 'Measure dashboard mentee search with the full-text index against icontains scans.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentees', type=int, default=100_000)
+        parser.add_argument('--mentors', type=int, default=100)
+        parser.add_argument('--probes', type=int, default=200)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        random.seed(42)
+
+        with benchmark_database(keepdb=options['keepdb']):
+            began = time.perf_counter()
+            mentors = self.seed(options['mentees'], options['mentors'])
+            indexed = search.rebuild_index()
+            self.stdout.write(
+                f'Database: {connection.vendor}, {indexed:,} mentees indexed in {time.perf_counter() - began:.1f}s'
+            )
+
+            # Mentors look mentees up by (part of) a name or an email, or by a career word
+            sample = list(MenteeProfile.objects.select_related('user').order_by('?')[:options['probes']])
+            probes = []
+            for mentee in sample:
+                roll = random.random()
+                if roll < 0.4:
+                    query = mentee.user.username.split('-')[random.randint(0, 1)]
+                elif roll < 0.8:
+                    query = mentee.user.email.split('@')[0][:random.randint(4, 8)]
+                else:
+                    query = random.choice(WORDS)
+                probes.append((mentee.user.mentor, query))
+
+            def indexed_search(mentor, query):
+                queryset = MenteeProfile.objects.filter(user__mentor=mentor)
+                return list(search.search_mentees(queryset, query, mentor=mentor)[:50])
+
+            def scoped_scan(mentor, query):
+                return list(MenteeProfile.objects.filter(user__mentor=mentor).filter(
+                    models.Q(user__username__icontains=query) | models.Q(user__email__icontains=query)
+                    | models.Q(professional_career__icontains=query) | models.Q(professional_goal__icontains=query)
+                ).order_by('-pk')[:50])
+
+            def global_search(mentor, query):
+                return list(search.search_mentees(MenteeProfile.objects.all(), query)[:50])
+
+            def global_scan(mentor, query):
+                return list(MenteeProfile.objects.filter(
+                    models.Q(user__username__icontains=query) | models.Q(user__email__icontains=query)
+                    | models.Q(professional_career__icontains=query) | models.Q(professional_goal__icontains=query)
+                ).order_by('-pk')[:50])
+
+            for label, function in (
+                ("Mentor's mentees, full-text", indexed_search),
+                ("Mentor's mentees, icontains", scoped_scan),
+                ('All mentees, full-text', global_search),
+                ('All mentees, icontains', global_scan),
+            ):
+                timings = []
+                for mentor, query in probes:
+                    begin = time.perf_counter()
+                    function(mentor, query)
+                    timings.append(time.perf_counter() - begin)
+
+                timings.sort()
+                self.stdout.write(
+                    f'{label:<30} median {statistics.median(timings) * 1000:7.2f} ms, '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1] * 1000:7.2f} ms'
+                )
+
+
+    def seed(self, mentee_count, mentor_count, batch=10_000):
+        password = make_password(None)
+
+        mentors = CustomUser.objects.bulk_create([
+            CustomUser(username=f'search-mentor-{i}', email=f'search-mentor-{i}@example.com', password=password, is_mentor=True)
+            for i in range(mentor_count)
+        ])
+
+        for offset in range(0, mentee_count, batch):
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=f'{random_name()}-{random_name()}-{i}',
+                    email=f'{random_name()}.{random_name()}{i}@example.com',
+                    password=password,
+                    mentor=random.choice(mentors),
+                )
+                for i in range(offset, min(mentee_count, offset + batch))
+            ], batch_size=5000)
+
+            MenteeProfile.objects.bulk_create([
+                MenteeProfile(
+                    user=user,
+                    location=random.choice(LOCATIONS),
+                    professional_career=' '.join(random.sample(WORDS, 6)),
+                    professional_goal=' '.join(random.sample(WORDS, 4)),
+                )
+                for user in users
+            ], batch_size=5000)
+
+        return mentors
@@ -0,0 +1,136 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from core.benchmarking import HttpClient, benchmark_database, run_journeys, seed_volumes, summarize
+
+
+
+class Command(BaseCommand):
+    help = (
+        'Start runserver and gunicorn in turn on a seeded benchmark database and compare their startup time, '
+        'throughput and latency on the user journeys of bench_journeys, driven over HTTP.'
+    )
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=['runserver', 'gunicorn'], default=['runserver', 'gunicorn'])
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn worker processes.')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker.')
+        parser.add_argument('--scale', type=float, default=0.1, help='Multiplies the seeded volumes of bench_journeys.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=30, help='Runs of each journey per server.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Simulated users at once.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--json', help='Write the results to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database, and its data, between runs.')
+
+
+    def handle(self, *args, **options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        report = {}
+
+        with benchmark_database(keepdb=options['keepdb']) as connection:
+            volumes = seed_volumes(options['scale'], options['seed'], self.stdout.write)
+
+            env = {
+                **os.environ,
+                'DB_NAME': str(connection.settings_dict['NAME']),
+                'DEBUG': 'False',
+                'ALLOWED_HOSTS': '127.0.0.1,localhost',
+                'PROFILING_ENABLED': 'False',
+            }
+            # SQLite: let the server processes write
+            connections.close_all()
+
+            for server in options['servers']:
+                process = subprocess.Popen(
+                    self.command(server, options), cwd=settings.BASE_DIR, env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                try:
+                    startup = self.wait_until_up(process, base_url + reverse('login'))
+                    results, wall = run_journeys(
+                        volumes, options['iterations'], options['concurrency'], options['seed'],
+                        warmup=1, client_class=partial(HttpClient, base_url),
+                    )
+                finally:
+                    process.send_signal(signal.SIGTERM)
+                    process.wait(timeout=60)
+
+                steps = summarize(results)
+                requests = sum(row['runs'] for row in steps.values())
+                report[server] = {
+                    'startup_s': round(startup, 2),
+                    'wall_s': round(wall, 2),
+                    'throughput_rps': round(requests / wall, 2),
+                    'errors': sum(row['errors'] for row in steps.values()),
+                    'steps': steps,
+                }
+                self.print_server(server, report[server])
+
+        self.stdout.write(f"\n{'server':<10} {'startup':>8} {'requests/s':>11} {'errors':>7}")
+        for server, row in report.items():
+            self.stdout.write(f"{server:<10} {row['startup_s']:>7.2f}s {row['throughput_rps']:>11.1f} {row['errors']:>7}")
+
+        if options['json']:
+            report = {
+                'meta': {
+                    key: options[key]
+                    for key in ('scale', 'seed', 'iterations', 'concurrency', 'workers', 'threads')
+                } | {'volumes': volumes},
+                'servers': report,
+            }
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+
+    def command(self, server, options):
+        address = f"127.0.0.1:{options['port']}"
+        if server == 'runserver':
+            return [sys.executable, 'manage.py', 'runserver', '--noreload', address]
+        return [
+            sys.executable, '-m', 'gunicorn', 'core.wsgi', '--config', 'gunicorn.conf.py', '--bind', address,
+            '--workers', str(options['workers']), '--threads', str(options['threads']),
+        ]
+
+
+    def wait_until_up(self, process, url, timeout=60):
+        """Seconds from start until the server answers ``url``."""
+        began = time.perf_counter()
+        while time.perf_counter() - began < timeout:
+            if process.poll() is not None:
+                raise CommandError(f'The server exited with code {process.returncode} before answering.')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - began
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.02)
+
+        raise CommandError(f'The server did not answer within {timeout}s.')
+
+
+    def print_server(self, server, row):
+        self.stdout.write(
+            f"\n{server}: up in {row['startup_s']:.2f}s, {row['throughput_rps']:.1f} requests/s over {row['wall_s']:.1f}s"
+        )
+        self.stdout.write(f"{'step':<20} {'runs':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+        for step, stats in row['steps'].items():
+            self.stdout.write(
+                f"{step:<20} {stats['runs']:>6} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+                f"{stats['p99_ms']:>7.1f}ms {stats['errors']:>7}"
+            )
@@ -0,0 +1,52 @@
+import csv
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from accounts import invitations
+from accounts.models import CustomUser
+
+
+
+class Command(BaseCommand):
+    help = 'Invite every email in a CSV file on behalf of a mentor and report the outcome of each row.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV file with one email per line in the first column.')
+        parser.add_argument('--mentor-email', required=True)
+        parser.add_argument('--base-url', required=True, help='Public site URL used in the invitation links, e.g. https://matkamestre.fi')
+        parser.add_argument('--report', help='Write the per-row outcomes to this CSV file instead of stdout.')
+
+
+    def handle(self, *args, **options):
+        try:
+            mentor = CustomUser.objects.get(email=options['mentor_email'], is_mentor=True)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'Mentor {options["mentor_email"]} not found.')
+
+        with open(options['csv_path'], 'rb') as csv_file:
+            emails = invitations.read_emails_from_csv(csv_file)
+
+        register_url = options['base_url'].rstrip('/') + reverse('register_mentee')
+
+        began = time.perf_counter()
+        results = invitations.bulk_invite(mentor, emails, lambda token: f'{register_url}?token={token}')
+        elapsed = time.perf_counter() - began
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report:
+                self.write_report(report, results)
+        else:
+            self.write_report(self.stdout, results)
+
+        summary = ', '.join(f'{outcome}: {count}' for outcome, count in Counter(o for _, o in results).items())
+        self.stderr.write(self.style.SUCCESS(f'{len(results)} rows in {elapsed:.2f}s ({summary})'))
+
+
+    def write_report(self, stream, results):
+        writer = csv.writer(stream)
+        writer.writerow(['email', 'outcome'])
+        writer.writerows(results)
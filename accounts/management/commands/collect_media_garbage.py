@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import thumbnails
+from core.storage import GRACE_SECONDS, adopt_legacy_files, collect_garbage
+
+
+
+class Command(BaseCommand):
+    help = 'Delete stored media blobs that no CV, picture or recording references. Safe to schedule (e.g. daily from cron).'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-seconds', type=int, default=GRACE_SECONDS, help='Keep blobs written this recently.')
+        parser.add_argument(
+            '--adopt-legacy', action='store_true',
+            help='First move files stored under their upload names into deduplicated blobs.',
+        )
+
+
+    def handle(self, *args, **options):
+        if options['adopt_legacy']:
+            moved = adopt_legacy_files()
+            self.stdout.write(f'Moved {moved} files into blobs.')
+
+        deleted, freed = collect_garbage(grace_seconds=options['grace_seconds'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced blobs ({freed / 1024 ** 2:.1f} MB).'))
+
+        deleted = thumbnails.collect_garbage()
+        self.stdout.write(self.style.SUCCESS(f'Deleted the thumbnails of {deleted} pictures no longer used.'))
@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts.cv_text import extract_pending, queue_all
+from core import pdftext
+
+
+
+class Command(BaseCommand):
+    help = 'Extract the text of uploaded CVs in a process pool and feed it to mentee search and matching.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes reading PDFs.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Profiles per batch (default: 8 per worker).')
+        parser.add_argument('--all', action='store_true', help='Re-read every CV, e.g. after improving the extractor.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new CVs instead of exiting when none are left.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls in --loop mode.')
+
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size'] or workers * 8
+
+        if options['all']:
+            self.stdout.write(f'Queued {queue_all()} CVs.')
+
+        if not pdftext.is_available():
+            self.stderr.write('pypdf is not installed: CVs stay queued until it is.')
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+
+        total = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                done = extract_pending(executor.map, batch_size=batch_size)
+                total += done
+
+                if done:
+                    self.stdout.write(f'Read {done} CVs')
+                    continue
+
+                if not options['loop']:
+                    break
+
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done. Read {total} CVs.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.invitations import purge_invitation_tokens
+
+
+
+class Command(BaseCommand):
+    help = 'Delete used and expired invitation tokens in small chunks. Safe to schedule (e.g. daily from cron).'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=7, help='Keep expired tokens this many days for support requests.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per statement.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks.')
+
+
+    def handle(self, *args, **options):
+        deleted = purge_invitation_tokens(
+            keep_days=options['keep_days'],
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} invitation tokens.'))
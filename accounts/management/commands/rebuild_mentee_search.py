@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import search
+
+
+
+class Command(BaseCommand):
+    help = 'Refill the mentee full-text search index, e.g. after bulk imports that bypass signals.'
+
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search is only available on SQLite and PostgreSQL.')
+
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} mentees.'))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomUser
+from core import seeding
+
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with generated mentors, mentees, availability slots, tasks, invitation tokens '
+        'and meeting recordings for profiling at scale. The same --seed always gives the same data.'
+    )
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=1_000)
+        parser.add_argument('--mentees', type=int, default=50_000)
+        parser.add_argument('--slots', type=int, default=1_000_000, help='Availability slots, spread over a year.')
+        parser.add_argument('--tasks', type=int, default=500_000)
+        parser.add_argument('--tokens', type=int, default=200_000, help='Invitation tokens, most of them used or expired.')
+        parser.add_argument('--recordings', type=int, default=50_000, help='Meeting recordings, all sharing one small video file.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5_000, help='Rows per bulk INSERT.')
+
+
+    def handle(self, *args, **options):
+        if options['mentors'] < 1 or options['mentees'] < 1:
+            raise CommandError('Seed at least one mentor and one mentee.')
+
+        if CustomUser.objects.filter(email=seeding.mentor_email(0)).exists():
+            raise CommandError(
+                f'The database already holds seeded users (@{seeding.EMAIL_DOMAIN}). Seed an empty database instead.'
+            )
+
+        began = time.perf_counter()
+        counts = seeding.seed_database(
+            mentors=options['mentors'],
+            mentees=options['mentees'],
+            slots=options['slots'],
+            tasks=options['tasks'],
+            tokens=options['tokens'],
+            recordings=options['recordings'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - began
+
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s). '
+            f'Users log in as {seeding.mentor_email(0)} or {seeding.mentee_email(0)} '
+            f'with the password "{seeding.PASSWORD}".'
+        ))
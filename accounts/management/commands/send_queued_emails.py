@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mailer import send_queued_emails
+
+
+
+class Command(BaseCommand):
+    help = 'Drain the outbound email queue in batches over a single mail connection.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before an email is dead-lettered.')
+        parser.add_argument('--backoff', type=int, default=60, help='Base retry delay in seconds, doubled per attempt.')
+        parser.add_argument('--lease', type=int, default=600, help='Seconds a batch stays claimed; expired claims are retried.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting when the queue is empty.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls in --loop mode.')
+
+
+    def handle(self, *args, **options):
+        total_sent = 0
+        total_failed = 0
+
+        while True:
+            sent, failed = send_queued_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                backoff_seconds=options['backoff'],
+                lease_seconds=options['lease'],
+            )
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+
+            if not options['loop']:
+                break
+
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done. Sent {total_sent}, failed {total_failed}.'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.matching import suggest_mentors_for_mentees
+from accounts.models import MenteeProfile
+
+
+
+class Command(BaseCommand):
+    help = 'Print the best mentor suggestions for one or more mentees.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentee-email', action='append', default=[], help='Mentee to match (repeatable).')
+        parser.add_argument('--unassigned', action='store_true', help='Match every mentee without a mentor.')
+        parser.add_argument('--top', type=int, default=5)
+
+
+    def handle(self, *args, **options):
+        mentees = MenteeProfile.objects.select_related('user')
+
+        if options['unassigned']:
+            mentees = mentees.filter(user__mentor__isnull=True)
+        elif options['mentee_email']:
+            mentees = mentees.filter(user__email__in=options['mentee_email'])
+        else:
+            raise CommandError('Pass --mentee-email or --unassigned.')
+
+        mentees = list(mentees)
+        suggestions = suggest_mentors_for_mentees(mentees, k=options['top'])
+
+        for mentee in mentees:
+            self.stdout.write(self.style.MIGRATE_HEADING(mentee.user.email))
+
+            if not suggestions[mentee.pk]:
+                self.stdout.write('  no suggestions')
+
+            for suggestion in suggestions[mentee.pk]:
+                details = [f'text {suggestion.text_score:.2f}']
+                if suggestion.shared_languages:
+                    details.append('speaks ' + ', '.join(suggestion.shared_languages))
+                if suggestion.same_location:
+                    details.append('same location')
+
+                self.stdout.write(
+                    f'  {suggestion.score:.3f}  {suggestion.mentor_profile.user.email}  ({"; ".join(details)})'
+                )
@@ -0,0 +1,252 @@
+"""
+Offline mentor suggestions for mentees.
+
+Mentor text (professional background and bio) and mentee text (background,
+goal and the key terms of their CV) are turned into TF-IDF vectors and compared by cosine similarity
+through an inverted index, then combined with language overlap and
+location. Nothing leaves the process: the vectors are plain dicts.
+
+Token counts are cached per profile under a key that contains the profile's
+``updated_at``, so only edited profiles are re-tokenized. The mentor index
+is rebuilt only when some mentor's ``updated_at`` changes.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.db import connection
+
+from .invitations import chunked
+from .models import CustomUser, MentorProfile, MenteeProfile
+
+
+
+TEXT_WEIGHT = 0.7
+LANGUAGE_WEIGHT = 0.2
+LOCATION_WEIGHT = 0.1
+
+# Terms used by more than this share of mentors carry no signal
+MAX_DOCUMENT_FREQUENCY = 0.5
+# Only the strongest mentee terms are looked up in the index
+MAX_QUERY_TERMS = 40
+
+CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,}')
+
+STOP_WORDS = frozenset('''
+    about after also and any are been but can could did does each for from had has have her his how
+    into its just like more most not now our out over own she should some such than that the their
+    them then there these they this those through too very was were what when where which while who
+    will with would you your want work working year years
+'''.split())
+
+Suggestion = namedtuple('Suggestion', ['mentor_profile', 'score', 'text_score', 'shared_languages', 'same_location'])
+
+
+
+def tokenize(*texts):
+    counts = Counter()
+    for text in texts:
+        if text:
+            counts.update(token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS)
+    return counts
+
+
+def normalize_location(location):
+    return (location or '').strip().lower()
+
+
+def cache_key(kind, pk, updated_at):
+    return f'matching:{kind}:{pk}:{updated_at.timestamp()}'
+
+
+
+def cached_term_counts(kind, rows, text_of):
+    """
+    Return {pk: Counter} for ``rows`` of (pk, updated_at, ...) tuples,
+    tokenizing only the profiles whose cache entry is missing.
+    """
+    keys = {cache_key(kind, row[0], row[1]): row for row in rows}
+    found = cache.get_many(keys)
+
+    missing = {}
+    for key, row in keys.items():
+        if key not in found:
+            missing[key] = tokenize(*text_of(row))
+
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+        found.update(missing)
+
+    return {row[0]: found[key] for key, row in keys.items()}
+
+
+
+class MentorIndex:
+    """TF-IDF vectors of every mentor, stored as an inverted index."""
+
+    def __init__(self, term_counts):
+        self.mentor_ids = list(term_counts)
+        total = len(self.mentor_ids) or 1
+
+        document_frequency = Counter()
+        for counts in term_counts.values():
+            document_frequency.update(counts.keys())
+
+        self.idf = {
+            term: math.log((1 + total) / (1 + df)) + 1
+            for term, df in document_frequency.items()
+            if total < 10 or df / total <= MAX_DOCUMENT_FREQUENCY
+        }
+
+        self.postings = defaultdict(list)
+        for position, pk in enumerate(self.mentor_ids):
+            for term, weight in self.vectorize(term_counts[pk]).items():
+                self.postings[term].append((position, weight))
+        self.postings = dict(self.postings)
+
+
+    def vectorize(self, counts, limit=None):
+        vector = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in counts.items()
+            if term in self.idf
+        }
+
+        if limit and len(vector) > limit:
+            vector = dict(heapq.nlargest(limit, vector.items(), key=lambda item: item[1]))
+
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return {}
+        return {term: weight / norm for term, weight in vector.items()}
+
+
+    def similarities(self, counts):
+        """Cosine similarity of a mentee against every mentor, by index position."""
+        scores = [0.0] * len(self.mentor_ids)
+        for term, weight in self.vectorize(counts, limit=MAX_QUERY_TERMS).items():
+            for position, mentor_weight in self.postings.get(term, ()):
+                scores[position] += weight * mentor_weight
+        return scores
+
+
+
+_index = {'signature': None, 'index': None}
+
+
+def mentor_index():
+    rows = list(
+        MentorProfile.objects.order_by('pk').values_list('pk', 'updated_at', 'professional_career', 'bio')
+    )
+    signature = hash(tuple((pk, updated_at) for pk, updated_at, *_ in rows))
+
+    if _index['signature'] != signature:
+        term_counts = cached_term_counts('mentor', rows, lambda row: row[2:])
+        _index['index'] = MentorIndex(term_counts)
+        _index['signature'] = signature
+
+    return _index['index']
+
+
+
+def mentors_by_language(positions):
+    mentors = defaultdict(set)
+    for pk, code in MentorProfile.languages.through.objects.values_list('mentorprofile_id', 'language_id'):
+        if pk in positions:
+            mentors[code].add(positions[pk])
+    return mentors
+
+
+def mentors_by_location(positions):
+    """Mentors have no location of their own; use where their mentees are."""
+    mentors = defaultdict(set)
+    rows = (
+        CustomUser.objects.filter(mentor__mentor_profile__isnull=False, mentee_profile__location__isnull=False)
+        .values_list('mentor__mentor_profile', 'mentee_profile__location')
+    )
+    for pk, location in rows:
+        location = normalize_location(location)
+        if location and pk in positions:
+            mentors[location].add(positions[pk])
+    return mentors
+
+
+
+def suggest_mentors_for_mentees(mentees, k=5):
+    """
+    Return {mentee pk: [Suggestion, ...]} with the ``k`` best mentors for each
+    mentee, best first. The mentor index, languages and locations are loaded
+    once for the whole batch.
+    """
+    mentees = list(mentees)
+    index = mentor_index()
+    positions = {pk: position for position, pk in enumerate(index.mentor_ids)}
+    by_language = mentors_by_language(positions)
+    by_location = mentors_by_location(positions)
+
+    rows = [
+        (mentee.pk, mentee.updated_at, mentee.professional_career, mentee.professional_goal, mentee.cv_terms)
+        for mentee in mentees
+    ]
+    term_counts = cached_term_counts('mentee', rows, lambda row: row[2:])
+
+    mentee_languages = defaultdict(set)
+    for chunk in chunked([mentee.pk for mentee in mentees], connection.features.max_query_params):
+        for pk, code in MenteeProfile.languages.through.objects.filter(
+            menteeprofile_id__in=chunk
+        ).values_list('menteeprofile_id', 'language_id'):
+            mentee_languages[pk].add(code)
+
+    scored = {}
+    for mentee in mentees:
+        wanted = sorted(mentee_languages[mentee.pk])
+        location = normalize_location(mentee.location)
+
+        text_scores = index.similarities(term_counts[mentee.pk])
+        scores = [TEXT_WEIGHT * score for score in text_scores]
+
+        # Mentors without any shared text can still match on language and location
+        for code in wanted:
+            bonus = LANGUAGE_WEIGHT / len(wanted)
+            for position in by_language.get(code, ()):
+                scores[position] += bonus
+
+        nearby = by_location.get(location, set()) if location else set()
+        for position in nearby:
+            scores[position] += LOCATION_WEIGHT
+
+        best = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+        scored[mentee.pk] = [
+            (
+                scores[position],
+                index.mentor_ids[position],
+                text_scores[position],
+                [code for code in wanted if position in by_language.get(code, ())],
+                position in nearby,
+            )
+            for position in best
+            if scores[position] > 0
+        ]
+
+    needed = {result[1] for results in scored.values() for result in results}
+    profiles = {}
+    for chunk in chunked(needed, connection.features.max_query_params):
+        profiles.update(MentorProfile.objects.select_related('user').in_bulk(chunk))
+
+    return {
+        pk: [
+            Suggestion(profiles[mentor_pk], round(score, 4), round(text_score, 4), shared, same_location)
+            for score, mentor_pk, text_score, shared, same_location in results
+        ]
+        for pk, results in scored.items()
+    }
+
+
+
+def suggest_mentors(mentee_profile, k=5):
+    return suggest_mentors_for_mentees([mentee_profile], k=k)[mentee_profile.pk]
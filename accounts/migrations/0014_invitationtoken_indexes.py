@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invitationtoken',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['mentee_email', 'expires_at'], name='invitation_active_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitationtoken',
+            index=models.Index(fields=['expires_at'], name='invitation_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_invitationtoken_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Language',
+            fields=[
+                ('code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='languages',
+            field=models.ManyToManyField(blank=True, help_text='Languages for Mentoring/job search.', related_name='mentees', to='accounts.language'),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='languages',
+            field=models.ManyToManyField(blank=True, help_text='Languages spoken for mentoring.', related_name='mentors', to='accounts.language'),
+        ),
+    ]
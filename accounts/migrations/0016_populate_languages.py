@@ -0,0 +1,74 @@
+from django.db import migrations
+
+
+# Frozen copy of accounts.models.LANGUAGE_CHOICES at the time of this migration
+LANGUAGE_CHOICES = [
+    ('en', 'English'),
+    ('fi', 'Finnish'),
+    ('sv', 'Swedish'),
+    ('es', 'Spanish (Español)'),
+    ('pt', 'Portuguese (Português)'),
+    ('zh', 'Chinese (Mandarim)'),
+    ('hi', 'Hindi'),
+    ('ar', 'Arabic (العربية)'),
+    ('fr', 'French (Français)'),
+    ('ru', 'Russian (Русский)'),
+    ('de', 'German (Deutsch)'),
+    ('it', 'Italian (Italiano)'),
+    ('ja', 'Japanese (日本語)'),
+    ('ko', 'Korean (한국어)'),
+    ('nl', 'Dutch (Nederlands)'),
+    ('tr', 'Turkish (Türkçe)'),
+    ('pl', 'Polish (Polski)'),
+    ('cs', 'Czech (Čeština)'),
+    ('uk', 'Ukrainian (Українська)'),
+    ('fa', 'Farsi (Persian/Dari)'),
+    ('so', 'Somali'),
+]
+
+
+
+def copy_languages(apps, schema_editor):
+    Language = apps.get_model('accounts', 'Language')
+    known = {}
+
+    for position, (code, name) in enumerate(LANGUAGE_CHOICES):
+        known[code] = Language.objects.update_or_create(code=code, defaults={'name': name, 'position': position})[0]
+
+    for model_name, column in [('MentorProfile', 'mentorprofile_id'), ('MenteeProfile', 'menteeprofile_id')]:
+        Profile = apps.get_model('accounts', model_name)
+        Through = Profile.languages.through
+        links = []
+
+        for profile_id, language in Profile.objects.exclude(language__isnull=True).exclude(language='').values_list('id', 'language').iterator():
+            # Language.code holds 5 characters: longer codes sharing them become one language
+            codes = {code.strip()[:5] for code in language.split(',') if code.strip()}
+            for code in codes:
+                if code not in known:
+                    # Unknown codes used to be displayed upper-cased, keep them
+                    known[code] = Language.objects.create(code=code, name=code.upper(), position=len(known))
+                links.append(Through(**{column: profile_id, 'language_id': known[code].pk}))
+
+        Through.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+
+
+
+def restore_languages(apps, schema_editor):
+    for model_name in ['MentorProfile', 'MenteeProfile']:
+        Profile = apps.get_model('accounts', model_name)
+
+        for profile in Profile.objects.prefetch_related('languages'):
+            profile.language = ','.join(language.code for language in profile.languages.all())
+            profile.save(update_fields=['language'])
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_language'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_languages, restore_languages),
+    ]
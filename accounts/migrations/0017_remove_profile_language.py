@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_populate_languages'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='menteeprofile',
+            name='language',
+        ),
+        migrations.RemoveField(
+            model_name='mentorprofile',
+            name='language',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_remove_profile_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:02
+
+from django.db import migrations
+
+
+# Side table for accounts.search. It is not a Django model: on SQLite it is an
+# FTS5 virtual table (rowid is the mentee profile id, "owner" holds a
+# "mentor<id>" token so a mentor's search is answered by the index alone),
+# on PostgreSQL a plain table with a tsvector and trigram indexes.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_mentee_search USING fts5(
+        owner, username, email, location, career, goal,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4 5 6'
+    )
+    """,
+    """
+    INSERT INTO accounts_mentee_search (rowid, owner, username, email, location, career, goal)
+    SELECT p.id, 'mentor' || coalesce(u.mentor_id, 0), u.username, u.email,
+           coalesce(p.location, ''), coalesce(p.professional_career, ''), coalesce(p.professional_goal, '')
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TABLE IF EXISTS accounts_mentee_search',
+]
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE TABLE accounts_mentee_search (
+        mentee_id bigint PRIMARY KEY REFERENCES accounts_menteeprofile (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        mentor_id bigint NULL,
+        location text NOT NULL,
+        content text NOT NULL,
+        document tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX accounts_mentee_search_document_idx ON accounts_mentee_search USING gin (document)',
+    'CREATE INDEX accounts_mentee_search_content_trgm_idx ON accounts_mentee_search USING gin (content gin_trgm_ops)',
+    'CREATE INDEX accounts_mentee_search_location_trgm_idx ON accounts_mentee_search USING gin (location gin_trgm_ops)',
+    'CREATE INDEX accounts_mentee_search_mentor_idx ON accounts_mentee_search (mentor_id)',
+    """
+    INSERT INTO accounts_mentee_search (mentee_id, mentor_id, location, content, document)
+    SELECT p.id, u.mentor_id, coalesce(p.location, ''),
+           concat_ws(' ', u.username, u.email, p.location, p.professional_career, p.professional_goal),
+           setweight(to_tsvector('simple', u.username || ' ' || u.email), 'A')
+           || setweight(to_tsvector('simple', coalesce(p.location, '')), 'B')
+           || setweight(to_tsvector('simple', concat_ws(' ', p.professional_career, p.professional_goal)), 'C')
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP TABLE IF EXISTS accounts_mentee_search',
+]
+
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_mentorprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_statements({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
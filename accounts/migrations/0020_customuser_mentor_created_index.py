@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_mentee_search'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['mentor', 'created_at', 'id'], name='user_mentor_created_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:56
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+
+def count_tasks(apps, schema_editor):
+    MenteeProfile = apps.get_model('accounts', 'MenteeProfile')
+    Task = apps.get_model('mentor', 'Task')
+
+    def task_count(is_done):
+        counts = (
+            Task.objects.filter(mentee=OuterRef('pk'), is_done=is_done)
+            .order_by().values('mentee').annotate(count=Count('pk')).values('count')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    MenteeProfile.objects.update(pending_task_count=task_count(False), done_task_count=task_count(True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_customuser_mentor_created_index'),
+        ('mentor', '0004_mentoravailability_interval_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='done_task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='pending_task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='menteeprofile',
+            index=models.Index(fields=['pending_task_count'], name='mentee_pending_tasks_idx'),
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
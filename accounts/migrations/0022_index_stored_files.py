@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_menteeprofile_task_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menteeprofile',
+            name='cv_analysis_feedback',
+            field=models.FileField(blank=True, db_index=True, help_text="Initial feedback on the mentee's CV, uploaded as a PDF.", null=True, upload_to='mentee_files/cv_analysis/', verbose_name='CV Analysis Feedback (PDF)'),
+        ),
+        migrations.AlterField(
+            model_name='menteeprofile',
+            name='cv_file',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='mentee_files/cv/', verbose_name='CV/Resume (PDF)'),
+        ),
+        migrations.AlterField(
+            model_name='menteeprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='profiles/mentee/'),
+        ),
+        migrations.AlterField(
+            model_name='mentorprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='profiles/mentor/'),
+        ),
+    ]
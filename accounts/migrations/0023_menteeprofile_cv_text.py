@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+def queue_existing_cvs(apps, schema_editor):
+    # CVs uploaded before this migration are read by the next extract_cv_text run
+    MenteeProfile = apps.get_model('accounts', 'MenteeProfile')
+    MenteeProfile.objects.exclude(cv_file='').exclude(cv_file__isnull=True).update(cv_text_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_index_stored_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='cv_terms',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='cv_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='cv_text_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menteeprofile',
+            name='cv_text_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='menteeprofile',
+            index=models.Index(condition=models.Q(('cv_text_pending', True)), fields=['id'], name='mentee_cv_pending_idx'),
+        ),
+        migrations.RunPython(queue_existing_cvs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+# Adds the text of mentee CVs (MenteeProfile.cv_text) to the search table of
+# migration 0019: a "cv" column of the FTS5 table on SQLite, the lowest
+# weight of the tsvector on PostgreSQL.
+
+SQLITE_FORWARD = [
+    'DROP TABLE IF EXISTS accounts_mentee_search',
+    """
+    CREATE VIRTUAL TABLE accounts_mentee_search USING fts5(
+        owner, username, email, location, career, goal, cv,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4 5 6'
+    )
+    """,
+    """
+    INSERT INTO accounts_mentee_search (rowid, owner, username, email, location, career, goal, cv)
+    SELECT p.id, 'mentor' || coalesce(u.mentor_id, 0), u.username, u.email,
+           coalesce(p.location, ''), coalesce(p.professional_career, ''), coalesce(p.professional_goal, ''),
+           p.cv_text
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TABLE IF EXISTS accounts_mentee_search',
+    """
+    CREATE VIRTUAL TABLE accounts_mentee_search USING fts5(
+        owner, username, email, location, career, goal,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4 5 6'
+    )
+    """,
+    """
+    INSERT INTO accounts_mentee_search (rowid, owner, username, email, location, career, goal)
+    SELECT p.id, 'mentor' || coalesce(u.mentor_id, 0), u.username, u.email,
+           coalesce(p.location, ''), coalesce(p.professional_career, ''), coalesce(p.professional_goal, '')
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+    """,
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    UPDATE accounts_mentee_search s
+    SET document = s.document || setweight(to_tsvector('simple', p.cv_text), 'D')
+    FROM accounts_menteeprofile p
+    WHERE p.id = s.mentee_id AND p.cv_text <> ''
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    """
+    UPDATE accounts_mentee_search s
+    SET document = setweight(to_tsvector('simple', u.username || ' ' || u.email), 'A')
+        || setweight(to_tsvector('simple', coalesce(p.location, '')), 'B')
+        || setweight(to_tsvector('simple', concat_ws(' ', p.professional_career, p.professional_goal)), 'C')
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+    WHERE p.id = s.mentee_id
+    """,
+]
+
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_menteeprofile_cv_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_statements({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:44
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_mentee_search_cv'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menteeprofile',
+            name='cv_analysis_feedback',
+            field=models.FileField(blank=True, db_index=True, help_text="Initial feedback on the mentee's CV, uploaded as a PDF.", null=True, storage=core.storage.protected_storage, upload_to='mentee_files/cv_analysis/', verbose_name='CV Analysis Feedback (PDF)'),
+        ),
+        migrations.AlterField(
+            model_name='menteeprofile',
+            name='cv_file',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=core.storage.protected_storage, upload_to='mentee_files/cv/', verbose_name='CV/Resume (PDF)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:53
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_outbound_email_sending'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitationtoken',
+            index=models.Index(django.db.models.functions.text.Lower('mentee_email'), models.F('expires_at'), condition=models.Q(('is_used', False)), name='invitation_active_lower_idx'),
+        ),
+    ]
@@ -1,5 +1,35 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.storage import protected_storage
+
+
+
+LANGUAGE_CHOICES = [
+    ('en', 'English'),
+    ('fi', 'Finnish'),
+    ('sv', 'Swedish'),
+    ('es', 'Spanish (Español)'),
+    ('pt', 'Portuguese (Português)'),
+    ('zh', 'Chinese (Mandarim)'),
+    ('hi', 'Hindi'),
+    ('ar', 'Arabic (العربية)'),
+    ('fr', 'French (Français)'),
+    ('ru', 'Russian (Русский)'),
+    ('de', 'German (Deutsch)'),
+    ('it', 'Italian (Italiano)'),
+    ('ja', 'Japanese (日本語)'),
+    ('ko', 'Korean (한국어)'),
+    ('nl', 'Dutch (Nederlands)'),
+    ('tr', 'Turkish (Türkçe)'),
+    ('pl', 'Polish (Polski)'),
+    ('cs', 'Czech (Čeština)'),
+    ('uk', 'Ukrainian (Українська)'),
+    ('fa', 'Farsi (Persian/Dari)'),
+    ('so', 'Somali'),
+]
 
 
 
@@ -14,9 +44,54 @@ class CustomUser(AbstractUser):
 
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # A mentor's mentees in keyset pagination order, newest first
+            models.Index(fields=['mentor', 'created_at', 'id'], name='user_mentor_created_idx'),
+            # Case-insensitive "already registered" lookups in bulk_invite
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return f'Email: {self.email} | Is Mentor: {self.is_mentor} | Created at: {self.created_at}'
 
+    @property
+    def is_mentee(self):
+        return not self.is_mentor
+
+
+
+
+class Language(models.Model):
+    # One row per LANGUAGE_CHOICES entry, created by migration 0016
+    code = models.CharField(max_length=5, primary_key=True)
+    name = models.CharField(max_length=50)
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+
+    def __str__(self):
+        return self.name
+
+
+    @staticmethod
+    def valid_codes(codes):
+        """Keep the submitted codes that are known languages, in choice order."""
+        known = dict(LANGUAGE_CHOICES)
+        return [code for code in known if code in codes]
+
+
+
+
+class ProfileQuerySet(models.QuerySet):
+    def speaking(self, *codes):
+        """Profiles that speak every one of the given language codes."""
+        queryset = self
+        for code in codes:
+            queryset = queryset.filter(languages__code=code)
+        return queryset
+
 
 
 
@@ -29,38 +104,28 @@ class MentorProfile(models.Model):
         verbose_name="Professional Background",
     )
     
-    LANGUAGE_CHOICES = [
-        ('en', 'English'),
-        ('fi', 'Finnish'),
-        ('sv', 'Swedish'),
-        ('es', 'Spanish (Español)'),
-        ('pt', 'Portuguese (Português)'),
-        ('zh', 'Chinese (Mandarim)'),
-        ('hi', 'Hindi'),
-        ('ar', 'Arabic (العربية)'),
-        ('fr', 'French (Français)'),
-        ('ru', 'Russian (Русский)'),
-        ('de', 'German (Deutsch)'),
-        ('it', 'Italian (Italiano)'),
-        ('ja', 'Japanese (日本語)'),
-        ('ko', 'Korean (한국어)'),
-        ('nl', 'Dutch (Nederlands)'),
-        ('tr', 'Turkish (Türkçe)'),
-        ('pl', 'Polish (Polski)'),
-        ('cs', 'Czech (Čeština)'),
-        ('uk', 'Ukrainian (Українська)'),
-        ('fa', 'Farsi (Persian/Dari)'),
-        ('so', 'Somali'),
-    ]
-    language = models.TextField(
+    LANGUAGE_CHOICES = LANGUAGE_CHOICES
+    languages = models.ManyToManyField(
+        Language,
         blank=True,
-        null=True,
+        related_name='mentors',
         help_text="Languages spoken for mentoring."
     )
-    profile_picture = models.ImageField(upload_to='profiles/mentor/', null=True, blank=True)
+    profile_picture = models.ImageField(upload_to='profiles/mentor/', null=True, blank=True, db_index=True)
+
+    # Lets the matching engine reuse cached vectors until the profile changes
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProfileQuerySet.as_manager()
 
     def __str__(self):
         return f'Mentor profile of {self.user.email}'
+
+    @property
+    def formatted_languages(self):
+        # Uses the prefetched languages when the view prefetch_related() them
+        names = [language.name for language in self.languages.all()]
+        return ', '.join(names) if names else "Not specified"
     
 
 
@@ -70,41 +135,20 @@ class MenteeProfile(models.Model):
     # --- New Field 1: CV/Resume (PDF File) ---
     cv_file = models.FileField(
         upload_to='mentee_files/cv/', 
+        storage=protected_storage,
         null=True, 
         blank=True,
+        db_index=True,
         verbose_name="CV/Resume (PDF)"
     )
 
     # --- New Field 2: Language Proficiency ---
-    LANGUAGE_CHOICES = [
-        ('en', 'English'),
-        ('fi', 'Finnish'),
-        ('sv', 'Swedish'),
-        ('es', 'Spanish (Español)'),
-        ('pt', 'Portuguese (Português)'),
-        ('zh', 'Chinese (Mandarim)'),
-        ('hi', 'Hindi'),
-        ('ar', 'Arabic (العربية)'),
-        ('fr', 'French (Français)'),
-        ('ru', 'Russian (Русский)'),
-        ('de', 'German (Deutsch)'),
-        ('it', 'Italian (Italiano)'),
-        ('ja', 'Japanese (日本語)'),
-        ('ko', 'Korean (한국어)'),
-        ('nl', 'Dutch (Nederlands)'),
-        ('tr', 'Turkish (Türkçe)'),
-        ('pl', 'Polish (Polski)'),
-        ('cs', 'Czech (Čeština)'),
-        ('uk', 'Ukrainian (Українська)'),
-        ('fa', 'Farsi (Persian/Dari)'),
-        ('tr', 'Turkish (Türkçe)'),
-        ('so', 'Somali')
-    ]
-    # Note: Use a comma-separated string or a separate many-to-many field for multiple languages/levels
-    language = models.TextField(
+    LANGUAGE_CHOICES = LANGUAGE_CHOICES
+    languages = models.ManyToManyField(
+        Language,
         blank=True,
-        null=True,
-        help_text="Primary language for Mentoring/job search."
+        related_name='mentees',
+        help_text="Languages for Mentoring/job search."
     )
 
     # --- New Field 3: Location ---
@@ -136,20 +180,48 @@ class MenteeProfile(models.Model):
     # Can be populated by a mentor or an AI tool
     cv_analysis_feedback = models.FileField(
         upload_to='mentee_files/cv_analysis/',
+        storage=protected_storage,
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="CV Analysis Feedback (PDF)",
         help_text="Initial feedback on the mentee's CV, uploaded as a PDF."
     )
     
-    profile_picture = models.ImageField(upload_to='profiles/mentee/', null=True, blank=True)
+    profile_picture = models.ImageField(upload_to='profiles/mentee/', null=True, blank=True, db_index=True)
     bio = models.TextField(blank=True, null=True)
+
+    # Kept up to date by mentor.services; repaired by reconcile_task_counters
+    pending_task_count = models.PositiveIntegerField(default=0)
+    done_task_count = models.PositiveIntegerField(default=0)
+
+    # Filled in the background by extract_cv_text (accounts.cv_text)
+    cv_text = models.TextField(blank=True, default='', editable=False)
+    cv_terms = models.TextField(blank=True, default='', editable=False)
+    cv_text_source = models.CharField(max_length=100, blank=True, default='', editable=False)
+    cv_text_pending = models.BooleanField(default=False, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Task status filter of the mentor dashboard
+            models.Index(fields=['pending_task_count'], name='mentee_pending_tasks_idx'),
+            # Queue of CVs waiting for text extraction
+            models.Index(fields=['id'], condition=models.Q(cv_text_pending=True), name='mentee_cv_pending_idx'),
+        ]
+
     def __str__(self):
         return f'Mentee profile: {self.user.email}'
+
+    @property
+    def formatted_languages(self):
+        # Uses the prefetched languages when the view prefetch_related() them
+        names = [language.name for language in self.languages.all()]
+        return ', '.join(names) if names else "Not specified"
     
 
 
@@ -162,5 +234,50 @@ class InvitationToken(models.Model):
     expires_at = models.DateTimeField()
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # "Active invitation for this email" lookups in invite_mentee and bulk_invite
+            models.Index(fields=['mentee_email', 'expires_at'], condition=models.Q(is_used=False), name='invitation_active_email_idx'),
+            # The same, case-insensitive, for bulk_invite
+            models.Index(Lower('mentee_email'), models.F('expires_at'), condition=models.Q(is_used=False), name='invitation_active_lower_idx'),
+            # Range scans of purge_invitation_tokens
+            models.Index(fields=['expires_at'], name='invitation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'Token for {self.mentee_email} by {self.mentor.email}'
+
+
+
+
+class OutboundEmail(models.Model):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        # Claimed by a worker until next_attempt_at
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead letter'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField(max_length=254)
+    to_email = models.EmailField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
     def __str__(self):
-        return f'Token for {self.mentee_email} by {self.mentor.email}'
\ No newline at end of file
+        return f'{self.subject} to {self.to_email} ({self.status})'
@@ -0,0 +1,221 @@
+"""
+Full-text search over mentees (username, email, location, career, goal and
+the text of their CV).
+
+The searchable text lives in a side table, ``accounts_mentee_search``, created
+by migration 0019: an FTS5 virtual table on SQLite, and a tsvector column
+with GIN and trigram indexes on PostgreSQL. Signals in ``accounts.signals``
+keep it in sync; ``python manage.py rebuild_mentee_search`` refills it after
+bulk loads that bypass signals.
+
+On any other database ``search_mentees`` returns None and callers fall back
+to plain ``icontains`` filters.
+"""
+
+import re
+
+from django.db import connection, connections
+from django.db.models import ExpressionWrapper, F, FloatField, IntegerField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import MenteeProfile
+
+
+
+TABLE = 'accounts_mentee_search'
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Above this many matches, results are not ordered by relevance
+RANK_LIMIT = 250
+
+# Column weights for ranking: owner, username, email, location, career, goal, cv
+SQLITE_RANK = f'-bm25({TABLE}, 0, 10.0, 10.0, 5.0, 1.0, 1.0, 0.5)'
+
+SQLITE_DELETE = f'DELETE FROM {TABLE} WHERE rowid IN ({{ids}})'
+SQLITE_INSERT = f"""
+    INSERT INTO {TABLE} (rowid, owner, username, email, location, career, goal, cv)
+    SELECT p.id, 'mentor' || coalesce(u.mentor_id, 0), u.username, u.email,
+           coalesce(p.location, ''), coalesce(p.professional_career, ''), coalesce(p.professional_goal, ''),
+           p.cv_text
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+"""
+
+POSTGRESQL_DELETE = f'DELETE FROM {TABLE} WHERE mentee_id IN ({{ids}})'
+POSTGRESQL_INSERT = f"""
+    INSERT INTO {TABLE} (mentee_id, mentor_id, location, content, document)
+    SELECT p.id, u.mentor_id, coalesce(p.location, ''),
+           concat_ws(' ', u.username, u.email, p.location, p.professional_career, p.professional_goal),
+           setweight(to_tsvector('simple', u.username || ' ' || u.email), 'A')
+           || setweight(to_tsvector('simple', coalesce(p.location, '')), 'B')
+           || setweight(to_tsvector('simple', concat_ws(' ', p.professional_career, p.professional_goal)), 'C')
+           || setweight(to_tsvector('simple', p.cv_text), 'D')
+    FROM accounts_menteeprofile p JOIN accounts_customuser u ON u.id = p.user_id
+"""
+
+
+
+def is_available():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def query_tokens(text):
+    # Single letters (the "o" of "anna.o") expand to most of the index
+    tokens = TOKEN_RE.findall((text or '').lower())
+    return [token for token in tokens if len(token) > 1] or tokens
+
+
+
+def sqlite_match(query, location, mentor):
+    """Build an FTS5 query where every token is a prefix and all must match."""
+    parts = []
+    if mentor is not None:
+        parts.append(f'owner : mentor{mentor.pk}')
+
+    tokens = query_tokens(query)
+    if tokens:
+        terms = ' '.join(f'"{token}"*' for token in tokens)
+        parts.append(f'{{username email location career goal cv}} : ({terms})')
+
+    tokens = query_tokens(location)
+    if tokens:
+        parts.append('location : (' + ' '.join(f'"{token}"*' for token in tokens) + ')')
+
+    return ' AND '.join(parts)
+
+
+
+def contains_pattern(text):
+    """An ILIKE pattern matching ``text`` anywhere, its %, _ and \\ taken literally."""
+    return f'%{connection.ops.prep_for_like_query(text.strip())}%'
+
+
+
+def match_clause(query, location, mentor):
+    """Return (where, params, rank, rank_params) over the search table alone."""
+    if connection.vendor == 'sqlite':
+        return [f'{TABLE} MATCH %s'], [sqlite_match(query, location, mentor)], SQLITE_RANK, []
+
+    where = []
+    params = []
+    rank = '0'
+    rank_params = []
+
+    if mentor is not None:
+        where.append(f'{TABLE}.mentor_id = %s')
+        params.append(mentor.pk)
+
+    tokens = query_tokens(query)
+    if tokens:
+        # Prefix matches through the GIN index, or substrings of e.g. emails through pg_trgm
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        where.append(f"({TABLE}.document @@ to_tsquery('simple', %s) OR {TABLE}.content ILIKE %s)")
+        params.extend([tsquery, contains_pattern(query)])
+        rank = f"ts_rank({TABLE}.document, to_tsquery('simple', %s)) + similarity({TABLE}.content, %s)"
+        rank_params = [tsquery, query.strip()]
+
+    if query_tokens(location):
+        where.append(f'{TABLE}.location ILIKE %s')
+        params.append(contains_pattern(location))
+
+    return where, params, rank, rank_params
+
+
+
+def count_matches(where, params, limit, using='default'):
+    """Count matches, but stop counting at ``limit`` + 1."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {TABLE} WHERE {" AND ".join(where)} LIMIT %s) matches',
+            [*params, limit + 1],
+        )
+        return cursor.fetchone()[0]
+
+
+
+def search_mentees(queryset, query='', location='', mentor=None):
+    """
+    Narrow a MenteeProfile queryset to the mentees matching ``query`` (and
+    ``location``), best match first, with the score in ``search_rank``.
+
+    Passing ``mentor`` lets the index itself restrict matches to that
+    mentor's mentees instead of scanning every match. Scoring costs time per
+    match, so a query matching more than RANK_LIMIT rows (a single common
+    word) keeps the queryset's own ordering instead.
+    """
+    if not is_available():
+        return None
+
+    if not query_tokens(query) and not query_tokens(location):
+        return queryset
+
+    where, params, rank, rank_params = match_clause(query, location, mentor)
+    key = 'rowid' if connection.vendor == 'sqlite' else 'mentee_id'
+    matches = RawSQL(f'SELECT {key} FROM {TABLE} WHERE {" AND ".join(where)}', params)
+
+    if count_matches(where, params, RANK_LIMIT, using=queryset.db) > RANK_LIMIT:
+        # Materialize the matches once and test each row against them. The
+        # "+ 0" stops SQLite from probing the primary key once per match.
+        return (
+            queryset.alias(search_id=ExpressionWrapper(F('pk') + 0, output_field=IntegerField()))
+            .filter(search_id__in=matches)
+            .annotate(search_rank=Value(0, output_field=FloatField()))
+        )
+
+    # At most RANK_LIMIT rows, each scored by one lookup of its own index row
+    score = RawSQL(
+        f'SELECT {rank} FROM {TABLE} WHERE {TABLE}.{key} = {MenteeProfile._meta.db_table}.id AND {" AND ".join(where)}',
+        [*rank_params, *params],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=matches).annotate(search_rank=score).order_by('-search_rank', 'pk')
+
+
+
+def is_ranked(queryset):
+    """Whether ``queryset`` came back from search_mentees ordered by relevance."""
+    return '-search_rank' in queryset.query.order_by
+
+
+
+def reindex_mentees(ids):
+    """Refresh the index rows of the given mentee profile ids."""
+    ids = [int(pk) for pk in ids]
+    if not ids or not is_available():
+        return
+
+    placeholders = ', '.join(['%s'] * len(ids))
+
+    if connection.vendor == 'sqlite':
+        delete, insert = SQLITE_DELETE, SQLITE_INSERT
+    else:
+        delete, insert = POSTGRESQL_DELETE, POSTGRESQL_INSERT
+
+    with connection.cursor() as cursor:
+        cursor.execute(delete.format(ids=placeholders), ids)
+        cursor.execute(f'{insert} WHERE p.id IN ({placeholders})', ids)
+
+
+def remove_mentees(ids):
+    ids = [int(pk) for pk in ids]
+    if not ids or not is_available():
+        return
+
+    delete = SQLITE_DELETE if connection.vendor == 'sqlite' else POSTGRESQL_DELETE
+    with connection.cursor() as cursor:
+        cursor.execute(delete.format(ids=', '.join(['%s'] * len(ids))), ids)
+
+
+
+def rebuild_index():
+    """Drop and refill every index row. Returns the number of indexed mentees."""
+    if not is_available():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(SQLITE_INSERT if connection.vendor == 'sqlite' else POSTGRESQL_INSERT)
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
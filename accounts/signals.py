@@ -0,0 +1,118 @@
+"""
+Keep the mentee search index (``accounts.search``), the reference counts of
+stored files (``core.storage``), profile picture thumbnails
+(``core.thumbnails``), cached profile ids (``accounts.identity``) and the
+stamps of cached profile pages (``core.fragments``) in sync with the
+models, and queue new CVs for text extraction (``accounts.cv_text``).
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import fragments, storage, thumbnails
+
+from . import identity, search
+from .models import CustomUser, MenteeProfile, MentorProfile
+
+
+
+# User fields copied into the index; saves touching only e.g. last_login are ignored
+INDEXED_USER_FIELDS = {'username', 'email', 'mentor'}
+
+
+
+@receiver(post_save, sender=MenteeProfile)
+def index_mentee_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.reindex_mentees([instance.pk])
+
+
+@receiver(post_delete, sender=MenteeProfile)
+def unindex_mentee_profile(sender, instance, **kwargs):
+    search.remove_mentees([instance.pk])
+
+
+@receiver(pre_save, sender=MenteeProfile)
+def queue_cv_text(sender, instance, raw=False, **kwargs):
+    # A CV not read yet is picked up by extract_cv_text
+    name = instance.cv_file.name or ''
+    if not name:
+        instance.cv_text = instance.cv_terms = instance.cv_text_source = ''
+    instance.cv_text_pending = bool(name) and name != instance.cv_text_source
+
+
+@receiver(post_save, sender=CustomUser)
+def index_mentee_user(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or created or instance.is_mentor:
+        return
+    if update_fields is not None and not INDEXED_USER_FIELDS.intersection(update_fields):
+        return
+
+    search.reindex_mentees(MenteeProfile.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+
+for model in (MentorProfile, MenteeProfile):
+    pre_save.connect(storage.remember_files, sender=model)
+    post_save.connect(storage.release_replaced, sender=model)
+    post_delete.connect(storage.release_deleted, sender=model)
+
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_save, sender=MenteeProfile)
+def render_profile_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not instance.profile_picture:
+        return
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+
+    picture = instance.profile_picture
+    transaction.on_commit(lambda: thumbnails.prepare(picture))
+
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_user_identity(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A login only touches last_login
+    if raw or update_fields is not None and 'mentor' not in update_fields:
+        return
+    transaction.on_commit(lambda: identity.forget([instance.pk]))
+
+
+def forget_profile_identity(instance, mentees=False):
+    user_ids = [instance.user_id]
+    if mentees:
+        # Mentees cache their mentor's profile id, which only appears or disappears with the profile
+        user_ids += CustomUser.objects.filter(mentor_id=instance.user_id).values_list('pk', flat=True)
+    transaction.on_commit(lambda: identity.forget(user_ids))
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_save, sender=MenteeProfile)
+def forget_saved_profile_identity(sender, instance, raw=False, created=False, **kwargs):
+    if not raw:
+        forget_profile_identity(instance, mentees=sender is MentorProfile and created)
+
+
+@receiver(post_delete, sender=MentorProfile)
+@receiver(post_delete, sender=MenteeProfile)
+def forget_deleted_profile_identity(sender, instance, **kwargs):
+    forget_profile_identity(instance, mentees=sender is MentorProfile)
+
+
+
+def touch_language_stamp(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    # Reverse: languages.set() called on a Language, pk_set holds profile ids
+    profile_model = model if reverse else type(instance)
+    profile_ids = list(pk_set or ()) if reverse else [instance.pk]
+    transaction.on_commit(lambda: fragments.touch(profile_model, profile_ids))
+
+
+for model in (MentorProfile, MenteeProfile):
+    m2m_changed.connect(touch_language_stamp, sender=model.languages.through)
@@ -0,0 +1,14 @@
+from django import template
+
+from core.thumbnails import thumbnail_url
+
+
+
+register = template.Library()
+
+
+
+@register.filter
+def thumbnail(field_file, size=128):
+    """{{ profile.profile_picture|thumbnail:64 }} is the URL of a small square copy."""
+    return thumbnail_url(field_file, int(size))
@@ -1,3 +1,669 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import pdftext
+
+from . import cv_text, identity, invitations, matching, search
+from .mailer import enqueue_email, send_queued_emails
+from .models import LANGUAGE_CHOICES, CustomUser, InvitationToken, Language, MenteeProfile, MentorProfile, OutboundEmail
+
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise OSError('Connection refused')
+
+
+
+class SendQueuedEmailsTests(TestCase):
+
+    def test_sends_due_emails_and_marks_them_sent(self):
+        email = enqueue_email('Hello', 'Body', 'mentee@example.com')
+
+        self.assertEqual(send_queued_emails(), (1, 0))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.FailingBackend')
+    def test_failure_is_retried_later_then_dead_lettered(self):
+        email = enqueue_email('Hello', 'Body', 'mentee@example.com')
+
+        self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        send_queued_emails(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.DEAD)
+        self.assertIn('Connection refused', email.last_error)
+
+
+    def test_expired_claims_are_sent_again_and_live_ones_are_left_alone(self):
+        now = timezone.now()
+        expired = enqueue_email('Expired', 'Body', 'a@example.com')
+        claimed = enqueue_email('Claimed', 'Body', 'b@example.com')
+        OutboundEmail.objects.filter(pk=expired.pk).update(
+            status=OutboundEmail.SENDING, attempts=1, next_attempt_at=now - timedelta(seconds=1)
+        )
+        OutboundEmail.objects.filter(pk=claimed.pk).update(
+            status=OutboundEmail.SENDING, attempts=1, next_attempt_at=now + timedelta(minutes=5)
+        )
+
+        self.assertEqual(send_queued_emails(), (1, 0))
+
+        self.assertEqual([message.subject for message in mail.outbox], ['Expired'])
+        self.assertEqual(OutboundEmail.objects.get(pk=expired.pk).attempts, 2)
+        self.assertEqual(OutboundEmail.objects.get(pk=claimed.pk).status, OutboundEmail.SENDING)
+
+
+    def test_expired_claim_out_of_attempts_is_dead_lettered(self):
+        email = enqueue_email('Hello', 'Body', 'mentee@example.com')
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status=OutboundEmail.SENDING, attempts=5, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(send_queued_emails(max_attempts=5), (0, 0))
+        self.assertEqual(OutboundEmail.objects.get(pk=email.pk).status, OutboundEmail.DEAD)
+        self.assertEqual(mail.outbox, [])
+
+
+
+class IdentityCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=cls.mentor)
+
+
+    def setUp(self):
+        caches['shared'].clear()
+
+
+    def identity(self, user):
+        # A fresh user object each time, so only the shared cache remembers
+        return identity.identity(CustomUser.objects.get(pk=user.pk))
+
+
+    def is_cached(self, user):
+        return caches['shared'].get(identity.cache_key(user.pk)) is not None
+
+
+    def test_created_profiles_replace_cached_ids(self):
+        self.assertIsNone(self.identity(self.mentee)['mentee_profile'])
+        self.assertIsNone(self.identity(self.mentee)['mentors_profile_id'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentee_profile = MenteeProfile.objects.create(user=self.mentee)
+        self.assertEqual(self.identity(self.mentee)['mentee_profile'], (mentee_profile.pk, ''))
+
+        # The mentee caches their mentor's profile id too
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor_profile = MentorProfile.objects.create(user=self.mentor)
+        self.assertEqual(self.identity(self.mentee)['mentors_profile_id'], mentor_profile.pk)
+
+
+    def test_deleted_profiles_drop_cached_ids(self):
+        mentor_profile = MentorProfile.objects.create(user=self.mentor)
+        mentee_profile = MenteeProfile.objects.create(user=self.mentee)
+        self.assertEqual(self.identity(self.mentor)['mentor_profile'], (mentor_profile.pk, ''))
+        self.assertEqual(self.identity(self.mentee)['mentors_profile_id'], mentor_profile.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor_profile.delete()
+        self.assertFalse(self.is_cached(self.mentor))
+        self.assertFalse(self.is_cached(self.mentee))
+        self.assertIsNone(self.identity(self.mentor)['mentor_profile'])
+        self.assertIsNone(self.identity(self.mentee)['mentors_profile_id'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentee_profile.delete()
+        self.assertIsNone(self.identity(self.mentee)['mentee_profile'])
+
+
+    def test_deleted_user_is_forgotten(self):
+        MenteeProfile.objects.create(user=self.mentee)
+        self.identity(self.mentee)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(pk=self.mentee.pk).delete()
+
+        self.assertFalse(self.is_cached(self.mentee))
+
+
+    def test_login_keeps_the_entry(self):
+        self.identity(self.mentee)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.mentee)
+
+        self.assertTrue(self.is_cached(self.mentee))
+
+
+
+class BulkInviteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        # Stored before addresses were lowercased
+        CustomUser.objects.create_user(username='legacy', email='Legacy@Example.com', password='pw')
+        InvitationToken.objects.create(
+            token='old', mentee_email='Pending@Example.com', mentor=cls.mentor,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+
+    def invite(self, emails):
+        return invitations.bulk_invite(self.mentor, emails, lambda token: f'https://example.com/register?token={token}')
+
+
+    def test_outcome_of_every_row(self):
+        outcomes = self.invite([
+            'New@Example.com',
+            'new@example.COM',
+            'not-an-email',
+            'legacy@example.com',
+            'MENTOR@example.com',
+            'pending@example.com',
+        ])
+
+        self.assertEqual(outcomes, [
+            ('New@Example.com', invitations.INVITED),
+            ('new@example.COM', invitations.DUPLICATE),
+            ('not-an-email', invitations.INVALID),
+            ('legacy@example.com', invitations.REGISTERED),
+            ('MENTOR@example.com', invitations.REGISTERED),
+            ('pending@example.com', invitations.PENDING),
+        ])
+
+
+    def test_invitations_are_stored_lowercased(self):
+        self.invite(['New@Example.com'])
+
+        self.assertEqual(InvitationToken.objects.exclude(token='old').get().mentee_email, 'new@example.com')
+        self.assertEqual(OutboundEmail.objects.get().to_email, 'new@example.com')
+
+        # A second run in another case finds the first invitation
+        self.assertEqual(self.invite(['NEW@example.com']), [('NEW@example.com', invitations.PENDING)])
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+
+    def test_single_invite_follows_the_same_rules(self):
+        self.invite(['cohort@example.com'])
+        self.client.force_login(self.mentor)
+
+        response = self.client.post(reverse('invite_mentee'), {'mentee_email': 'Cohort@Example.com'})
+        self.assertContains(response, 'There is already an active invitation')
+        response = self.client.post(reverse('invite_mentee'), {'mentee_email': 'LEGACY@example.com'})
+        self.assertContains(response, 'already used')
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+        self.client.post(reverse('invite_mentee'), {'mentee_email': ' Single@Example.com '})
+        self.assertTrue(InvitationToken.objects.filter(mentee_email='single@example.com').exists())
+        self.assertEqual(self.invite(['SINGLE@example.com']), [('SINGLE@example.com', invitations.PENDING)])
+
+
+    def test_command_reports_every_row(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cohort.csv')
+            with open(path, 'w') as file:
+                file.write('email\nNew@Example.com\nnot-an-email\npending@example.com\n')
+
+            stdout = io.StringIO()
+            call_command(
+                'bulk_invite_mentees', path, mentor_email='mentor@example.com',
+                base_url='https://example.com/', stdout=stdout, stderr=io.StringIO(),
+            )
+
+        self.assertEqual(list(csv.reader(io.StringIO(stdout.getvalue()))), [
+            ['email', 'outcome'],
+            ['New@Example.com', invitations.INVITED],
+            ['not-an-email', invitations.INVALID],
+            ['pending@example.com', invitations.PENDING],
+        ])
+        self.assertIn('https://example.com/accounts/register_mentee/?token=', OutboundEmail.objects.get().body)
+
+
+
+class PurgeInvitationTokensTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+
+
+    def add_tokens(self, prefix, count, expires_in, is_used=False):
+        InvitationToken.objects.bulk_create(
+            InvitationToken(
+                token=f'{prefix}{number}', mentee_email=f'{prefix}{number}@example.com', mentor=self.mentor,
+                expires_at=timezone.now() + expires_in, is_used=is_used,
+            )
+            for number in range(count)
+        )
+
+
+    def test_deletes_stale_tokens_in_every_chunk(self):
+        self.add_tokens('expired', 7, timedelta(days=-8))
+        self.add_tokens('used', 5, timedelta(days=1), is_used=True)
+        self.add_tokens('recent', 2, timedelta(days=-6))
+        self.add_tokens('active', 3, timedelta(days=1))
+
+        self.assertEqual(invitations.purge_invitation_tokens(keep_days=7, chunk_size=2), 12)
+
+        self.assertCountEqual(
+            InvitationToken.objects.values_list('token', flat=True),
+            ['recent0', 'recent1', 'active0', 'active1', 'active2'],
+        )
+
+
+    def test_nothing_to_delete(self):
+        self.add_tokens('active', 2, timedelta(days=1))
+
+        self.assertEqual(invitations.purge_invitation_tokens(chunk_size=1), 0)
+        self.assertEqual(InvitationToken.objects.count(), 2)
+
+
+
+class ContainsPatternTests(SimpleTestCase):
+
+    def test_wildcards_are_taken_literally(self):
+        self.assertEqual(search.contains_pattern(' 100%_sure\\ '), r'%100\%\_sure\\%')
+
+
+    def test_plain_text_is_matched_anywhere(self):
+        self.assertEqual(search.contains_pattern('Helsinki'), '%Helsinki%')
+
+
+
+class MenteeSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        MentorProfile.objects.create(user=cls.mentor)
+
+        cls.anna = cls.add_mentee('annakoski', location='Helsinki')
+        cls.bruno = cls.add_mentee('bruno', location='Tampere', cv_text='Kotlin developer, worked with annakoski')
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw', is_mentor=True)
+        cls.outsider = cls.add_mentee('annabel', location='Helsinki', mentor=other)
+
+
+    @classmethod
+    def add_mentee(cls, username, location='', cv_text='', mentor=None):
+        user = CustomUser.objects.create_user(username=username, email=f'{username}@example.com', password='pw', mentor=mentor or cls.mentor)
+        profile = MenteeProfile(user=user, location=location)
+        if cv_text:
+            # Text of a CV that was already read
+            profile.cv_file = 'mentee_files/cv.pdf'
+            profile.cv_text = cv_text
+        profile.save()
+        return profile
+
+
+    def setUp(self):
+        caches['shared'].clear()
+
+
+    def found(self, query='', location='', mentor=None):
+        results = search.search_mentees(MenteeProfile.objects.all(), query, location, mentor=mentor)
+        return [profile.pk for profile in results]
+
+
+    def test_mentees_are_found_by_name_location_and_cv(self):
+        self.assertEqual(self.found('annak'), [self.anna.pk, self.bruno.pk])
+        self.assertEqual(self.found('bruno@example'), [self.bruno.pk])
+        self.assertEqual(self.found(location='helsinki'), sorted([self.anna.pk, self.outsider.pk]))
+        self.assertEqual(self.found('kotlin'), [self.bruno.pk])
+        self.assertEqual(self.found('kotlin', location='helsinki'), [])
+        self.assertEqual(self.found('anna', mentor=self.mentor), [self.anna.pk, self.bruno.pk])
+
+
+    def test_name_matches_rank_above_cv_matches(self):
+        results = search.search_mentees(MenteeProfile.objects.all(), 'annakoski')
+
+        self.assertTrue(search.is_ranked(results))
+        self.assertEqual([profile.pk for profile in results], [self.anna.pk, self.bruno.pk])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+
+    def test_common_query_keeps_the_queryset_order(self):
+        with mock.patch.object(search, 'RANK_LIMIT', 1):
+            results = search.search_mentees(MenteeProfile.objects.order_by('-pk'), 'example')
+
+        self.assertFalse(search.is_ranked(results))
+        self.assertEqual([profile.pk for profile in results], [self.outsider.pk, self.bruno.pk, self.anna.pk])
+
+
+    def test_index_follows_saves_and_deletes(self):
+        self.anna.location = 'Oulu'
+        self.anna.save()
+        self.assertEqual(self.found(location='oulu'), [self.anna.pk])
+        self.assertEqual(self.found(location='helsinki'), [self.outsider.pk])
+
+        user = self.bruno.user
+        user.username = 'brunella'
+        user.save()
+        self.assertEqual(self.found('brunella'), [self.bruno.pk])
+
+        self.anna.delete()
+        self.assertEqual(self.found('annak'), [self.bruno.pk])
+
+
+    @skipUnless(connection.vendor == 'postgresql', 'substrings are matched with ILIKE on PostgreSQL')
+    def test_substrings_match_through_like(self):
+        self.assertEqual(self.found('koski@exam'), [self.anna.pk])
+        self.assertEqual(self.found('100%'), [])
+        self.assertEqual(self.found(location='elsin', mentor=self.mentor), [self.anna.pk])
+
+
+    def dashboard(self, **filters):
+        self.client.force_login(self.mentor)
+        response = self.client.get(reverse('dashboard_mentor'), filters)
+        return sorted(profile.pk for profile in response.context['my_mentees'])
+
+
+    def test_dashboard_filters_with_and_without_the_index(self):
+        for available in [True, False]:
+            with self.subTest(index=available), mock.patch.object(search, 'is_available', return_value=available):
+                self.assertEqual(self.dashboard(q='bruno'), [self.bruno.pk])
+                self.assertEqual(self.dashboard(q='bruno@example'), [self.bruno.pk])
+                self.assertEqual(self.dashboard(location='Helsinki'), [self.anna.pk])
+                self.assertEqual(self.dashboard(q='nobody'), [])
+
+
+
+class LanguageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='secret', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+        cls.mentor_profile.languages.set(['en', 'fi'])
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='secret', is_mentor=True)
+        cls.other_profile = MentorProfile.objects.create(user=other)
+        cls.other_profile.languages.set(['en', 'sv'])
+
+
+    def test_speaking_needs_every_language(self):
+        mentors = MentorProfile.objects.all()
+
+        self.assertCountEqual(mentors.speaking('en'), [self.mentor_profile, self.other_profile])
+        self.assertCountEqual(mentors.speaking('en', 'fi'), [self.mentor_profile])
+        self.assertCountEqual(mentors.speaking('fi', 'sv'), [])
+        self.assertCountEqual(mentors.speaking(), [self.mentor_profile, self.other_profile])
+
+
+    def test_valid_codes_keeps_known_codes_in_choice_order(self):
+        self.assertEqual(Language.valid_codes(['sv', 'xx', 'en']), ['en', 'sv'])
+
+
+    def test_registration_saves_known_languages(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newmentor',
+            'email': 'new@example.com',
+            'password': 'secret',
+            'confirm_password': 'secret',
+            'languages': ['fi', 'xx', 'de'],
+        })
+
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        profile = MentorProfile.objects.get(user__username='newmentor')
+        self.assertEqual(list(profile.languages.values_list('code', flat=True)), ['fi', 'de'])
+
+
+    def test_profile_update_replaces_languages(self):
+        mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='secret', mentor=self.mentor)
+        profile = MenteeProfile.objects.create(user=mentee)
+        profile.languages.set(['en', 'sv'])
+        self.client.force_login(mentee)
+
+        response = self.client.post(reverse('update_menteeprofile'), {
+            'username': 'mentee',
+            'email': 'mentee@example.com',
+            'current_password': 'secret',
+            'location': 'Turku',
+            'languages': ['fi', 'sv'],
+        })
+
+        self.assertRedirects(response, reverse('update_menteeprofile'), fetch_redirect_response=False)
+        self.assertEqual(list(profile.languages.values_list('code', flat=True)), ['fi', 'sv'])
+        self.assertEqual(list(MenteeProfile.objects.speaking('fi')), [profile])
+
+
+
+class MentorMatchingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.backend = cls.add_mentor('backend', 'Python backend developer, Django and PostgreSQL', ['en'])
+        cls.nurse = cls.add_mentor('nurse', 'Nursing in a hospital ward, patient care', ['en'])
+        cls.designer = cls.add_mentor('designer', 'Graphic design and branding', ['fi'])
+        # The designer's mentees are in Oulu, which stands in for the designer's own location
+        mentee = CustomUser.objects.create_user(username='current', email='current@example.com', password='pw', mentor=cls.designer.user)
+        MenteeProfile.objects.create(user=mentee, location='Oulu')
+
+        user = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw')
+        cls.mentee = MenteeProfile.objects.create(user=user, professional_goal='Become a backend developer with Python', location=' oulu')
+        cls.mentee.languages.set(['fi'])
+
+
+    @classmethod
+    def add_mentor(cls, username, career, languages):
+        user = CustomUser.objects.create_user(username=username, email=f'{username}@example.com', password='pw', is_mentor=True)
+        profile = MentorProfile.objects.create(user=user, professional_career=career)
+        profile.languages.set(languages)
+        return profile
+
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.dict(matching._index, signature=None, index=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def suggest(self):
+        return matching.suggest_mentors(MenteeProfile.objects.get(pk=self.mentee.pk))
+
+
+    def test_text_language_and_location_rank_the_mentors(self):
+        suggestions = self.suggest()
+
+        self.assertEqual([suggestion.mentor_profile for suggestion in suggestions], [self.backend, self.designer])
+        backend, designer = suggestions
+        self.assertGreater(backend.text_score, 0)
+        self.assertEqual((backend.shared_languages, backend.same_location), ([], False))
+        self.assertEqual(designer.text_score, 0)
+        self.assertEqual((designer.shared_languages, designer.same_location), (['fi'], True))
+        self.assertAlmostEqual(designer.score, matching.LANGUAGE_WEIGHT + matching.LOCATION_WEIGHT)
+
+
+    def test_mentors_without_mentees_have_no_location(self):
+        # Only the designer has mentees; the others match on text alone
+        suggestions = {suggestion.mentor_profile: suggestion for suggestion in self.suggest()}
+
+        self.assertFalse(suggestions[self.backend].same_location)
+        self.assertEqual(matching.mentors_by_location({self.designer.pk: 0, self.backend.pk: 1}), {'oulu': {0}})
+
+
+    def test_edited_profiles_are_scored_again(self):
+        self.suggest()
+
+        self.nurse.professional_career = 'Python developer, backend services and Django for hospitals'
+        self.nurse.save()
+        self.assertIn(self.nurse, [suggestion.mentor_profile for suggestion in self.suggest()])
+
+        self.mentee.professional_goal = 'Software services for hospitals'
+        self.mentee.save()
+        self.assertEqual(self.suggest()[0].mentor_profile, self.nurse)
+
+
+
+def pdf_with_text(text):
+    """A one-page PDF showing ``text``, with a valid cross-reference table."""
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf
+
+
+
+class CvTextTests(TestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+        media_root = tempfile.mkdtemp(prefix='matkamestre-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=f'{media_root}/public', PROTECTED_MEDIA_ROOT=f'{media_root}/protected')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+    def add_mentee(self, username, cv):
+        user = CustomUser.objects.create_user(username=username, email=f'{username}@example.com', password='pw')
+        profile = MenteeProfile.objects.create(user=user)
+        profile.cv_file.save('cv.pdf', ContentFile(cv))
+        return profile
+
+
+    def test_cv_text_reaches_the_profile_and_search(self):
+        profile = self.add_mentee('mentee', pdf_with_text('Kotlin developer, Kotlin and Django'))
+        self.assertTrue(profile.cv_text_pending)
+
+        self.assertEqual(cv_text.extract_pending(), 1)
+
+        profile.refresh_from_db()
+        self.assertFalse(profile.cv_text_pending)
+        self.assertEqual(profile.cv_text, 'Kotlin developer, Kotlin and Django')
+        self.assertEqual(profile.cv_terms.split()[0], 'kotlin')
+        self.assertEqual(profile.cv_text_source, profile.cv_file.name)
+        self.assertEqual([found.pk for found in search.search_mentees(MenteeProfile.objects.all(), 'kotlin')], [profile.pk])
+
+
+    def test_a_cv_read_before_is_copied(self):
+        first = self.add_mentee('first', pdf_with_text('Kotlin developer'))
+        cv_text.extract_pending()
+        second = self.add_mentee('second', pdf_with_text('Kotlin developer'))
+
+        map_function = mock.Mock(side_effect=map)
+        self.assertEqual(cv_text.extract_pending(map_function), 1)
+
+        map_function.assert_called_once_with(pdftext.extract_text, [])
+        second.refresh_from_db()
+        self.assertEqual(second.cv_file.name, first.cv_file.name)
+        self.assertEqual(second.cv_text, 'Kotlin developer')
+
+
+    def test_unreadable_cv_is_recorded_once(self):
+        profile = self.add_mentee('mentee', b'not a pdf')
+
+        with self.assertLogs('accounts.cv_text', 'WARNING'), self.assertLogs('pypdf', 'WARNING'):
+            self.assertEqual(cv_text.extract_pending(), 1)
+
+        profile.refresh_from_db()
+        self.assertFalse(profile.cv_text_pending)
+        self.assertEqual((profile.cv_text, profile.cv_text_source), ('', profile.cv_file.name))
+
+        # Neither the next batch nor a later save of the profile reads it again
+        profile.location = 'Turku'
+        profile.save()
+        self.assertFalse(profile.cv_text_pending)
+        self.assertEqual(cv_text.extract_pending(), 0)
+
+
+    def test_command_leaves_cvs_queued_without_pypdf(self):
+        profile = self.add_mentee('mentee', pdf_with_text('Kotlin developer'))
+        self.addCleanup(importlib.reload, pdftext)
+        with mock.patch.dict(sys.modules, {'pypdf': None}):
+            importlib.reload(pdftext)
+        self.assertFalse(pdftext.is_available())
+
+        err = io.StringIO()
+        call_command('extract_cv_text', '--all', stdout=io.StringIO(), stderr=err)
+
+        self.assertIn('pypdf is not installed', err.getvalue())
+        profile.refresh_from_db()
+        self.assertTrue(profile.cv_text_pending)
+        self.assertEqual(profile.cv_text, '')
+
+
+
+class PopulateLanguagesMigrationTests(TransactionTestCase):
+    before = [('accounts', '0015_language')]
+    after = [('accounts', '0016_populate_languages')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+        self.addCleanup(self.migrate_to_latest)
+
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+    def test_codes_become_languages(self):
+        User = self.apps.get_model('accounts', 'CustomUser')
+        MentorProfile = self.apps.get_model('accounts', 'MentorProfile')
+        MenteeProfile = self.apps.get_model('accounts', 'MenteeProfile')
+        mentor = User.objects.create(username='mentor', email='mentor@example.com', is_mentor=True)
+        mentee = User.objects.create(username='mentee', email='mentee@example.com', mentor=mentor)
+        mentor_profile = MentorProfile.objects.create(user=mentor, language='en, fi,,sw-latin')
+        # Both are cut to the 5 characters of Language.code
+        mentee_profile = MenteeProfile.objects.create(user=mentee, language='sw-latin,sw-latn,fi')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+
+        Language = apps.get_model('accounts', 'Language')
+        self.assertEqual(Language.objects.get(code='sw-la').name, 'SW-LA')
+        self.assertEqual(Language.objects.count(), len(LANGUAGE_CHOICES) + 1)
+        mentor_profile = apps.get_model('accounts', 'MentorProfile').objects.get(pk=mentor_profile.pk)
+        self.assertEqual(list(mentor_profile.languages.values_list('code', flat=True)), ['en', 'fi', 'sw-la'])
+        mentee_profile = apps.get_model('accounts', 'MenteeProfile').objects.get(pk=mentee_profile.pk)
+        self.assertEqual(list(mentee_profile.languages.values_list('code', flat=True)), ['fi', 'sw-la'])
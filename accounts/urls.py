@@ -8,6 +8,7 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('logout/', views.logout, name='logout'), 
     path('invite_mentee/', views.invite_mentee, name='invite_mentee'), 
+    path('bulk_invite_mentees/', views.bulk_invite_mentees, name='bulk_invite_mentees'),
     path('register_mentee/', views.register_mentee, name='register_mentee'),
     path('update_mentorprofile/', views.update_mentorprofile, name='update_mentorprofile'),
     path('delete_mentee/<int:user_id>', views.delete_mentee, name='delete_mentee'),
@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import CustomUser, MentorProfile, MenteeProfile, InvitationToken
+from .models import CustomUser, MentorProfile, MenteeProfile, InvitationToken, Language
 from django.views.decorators.http import require_http_methods
 from django.http import HttpResponse
 from django.contrib import messages
@@ -7,9 +7,11 @@ from django.contrib.auth import authenticate, login as login_django, logout as l
 from django.contrib.auth.decorators import login_required
 from uuid import uuid4
 from django.utils import timezone
-from datetime import timedelta
-from django.core.mail import send_mail
-from django.conf import settings
+from django.urls import reverse
+from collections import Counter
+import csv
+from .mailer import enqueue_email
+from . import invitations
 from django.db import transaction
 from django.contrib.auth.hashers import make_password
 from mentor.models import MentorAvailability
@@ -70,11 +72,11 @@ def register(request):
             is_mentor=True
         )
 
-        MentorProfile.objects.create(
+        mentor_profile = MentorProfile.objects.create(
             user=user,
             professional_career=professional_career,
-            language=','.join(languages) if languages else ''
         )
+        mentor_profile.languages.set(Language.valid_codes(languages))
 
         messages.success(request, 'Account created successfully!')
         return redirect('login')
@@ -135,16 +137,17 @@ def invite_mentee(request):
         
 
     if request.method == 'POST':
-        mentee_email = request.POST.get('mentee_email')
+        # Same rules as bulk_invite: stored lowercased, matched whatever the case
+        mentee_email = invitations.normalize_email(request.POST.get('mentee_email', ''))
 
 
-        if CustomUser.objects.filter(email=mentee_email).exists():
+        if invitations.registered_emails([mentee_email]):
             messages.error(request, 'This Mentees mail is already used.')
             return render(request, 'invite_mentee.html')
 
 
         
-        if InvitationToken.objects.filter(mentee_email=mentee_email, is_used = False, expires_at__gt=timezone.now()).exists():
+        if invitations.pending_emails([mentee_email]):
             messages.error(request, f'There is already an active invitation for this email: {mentee_email}.')
             return render(request, 'invite_mentee.html')
 
@@ -152,25 +155,20 @@ def invite_mentee(request):
         token = str(uuid4())
 
         try:
-            InvitationToken.objects.create(
-                token = token,
-                mentee_email = mentee_email,
-                mentor = request.user,
-                expires_at = timezone.now() + timedelta(hours=24),
-
-            )
-
             invite_url = request.build_absolute_uri(f'/accounts/register_mentee/?token={token}')
 
+            # The email is only queued here, send_queued_emails delivers it.
+            with transaction.atomic():
+                InvitationToken.objects.create(
+                    token = token,
+                    mentee_email = mentee_email,
+                    mentor = request.user,
+                    expires_at = timezone.now() + invitations.INVITATION_LIFETIME,
 
-            send_mail(
-                subject='Invite to join MatkaMestre',
-                message=f'Hello!\n\n You have been invited by {request.user.email} to join MatkaMestre as a Mentee. Use this link to register:{invite_url}\n\nImportant: this invite link is valid for 24 hours.\n\nKind regards,\n\MatkaMestre Team.',
+                )
 
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[mentee_email],
-                fail_silently=False,
-            )
+                subject, message = invitations.invitation_message(request.user.email, invite_url)
+                enqueue_email(subject=subject, message=message, recipient=mentee_email)
 
 
             messages.success(request, f'Invitation sent successfully to:{mentee_email}')
@@ -188,6 +186,53 @@ def invite_mentee(request):
 
 
 
+@require_http_methods(['GET','POST'])
+def bulk_invite_mentees(request):
+    if not request.user.is_authenticated or not request.user.is_mentor:
+        messages.error(request, 'Only Mentor can invite Mentees.')
+        return redirect('login')
+
+
+    if request.method == 'POST':
+        csv_file = request.FILES.get('csv_file')
+
+        if not csv_file:
+            messages.error(request, 'Please, choose a CSV file with one email per line.')
+            return render(request, 'bulk_invite_mentees.html')
+
+
+        try:
+            emails = invitations.read_emails_from_csv(csv_file)
+        except (UnicodeDecodeError, csv.Error):
+            messages.error(request, 'This file could not be read. Please, upload a UTF-8 CSV file.')
+            return render(request, 'bulk_invite_mentees.html')
+
+
+        if not emails:
+            messages.error(request, 'The CSV file does not contain any email.')
+            return render(request, 'bulk_invite_mentees.html')
+
+
+        base_url = request.build_absolute_uri(reverse('register_mentee'))
+        results = invitations.bulk_invite(request.user, emails, lambda token: f'{base_url}?token={token}')
+
+        summary = Counter(outcome for _, outcome in results)
+        logger.info(f"Bulk invitation by {request.user.email}: {dict(summary)}")
+        messages.success(request, f'{summary[invitations.INVITED]} of {len(results)} invitations queued.')
+
+        context = {
+            'results': results,
+            'summary': summary.most_common(),
+        }
+        return render(request, 'bulk_invite_mentees.html', context)
+
+
+    return render(request, 'bulk_invite_mentees.html')
+
+
+
+
+
 @require_http_methods(['GET','POST'])
 def register_mentee(request):
 
@@ -261,7 +306,7 @@ def register_mentee(request):
             return render(request, 'register_mentee.html', context)
         
 
-        if email != invitation.mentee_email:
+        if invitations.normalize_email(email or '') != invitation.mentee_email.lower():
             messages.error(request, 'The email provided does not match the invitation email.')
             return render(request, 'register_mentee.html', context)
         
@@ -288,14 +333,14 @@ def register_mentee(request):
             )
 
 
-            MenteeProfile.objects.create(
+            mentee_profile = MenteeProfile.objects.create(
                 user=user,
-                language=','.join(languages) if languages else '',
                 location=location,
                 professional_career=professional_career, # Now correctly saves the field
                 professional_goal=professional_goal,
                 cv_file=cv_file
             )
+            mentee_profile.languages.set(Language.valid_codes(languages))
 
             invitation.is_used=True
 
@@ -328,7 +373,7 @@ def update_mentorprofile(request):
 
 
     if request.method == 'GET':
-        selected_languages = mentor_profile.language.split(',') if mentor_profile.language else []
+        selected_languages = list(mentor_profile.languages.values_list('code', flat=True))
 
         context = {
             'user_data': request.user,
@@ -427,13 +472,13 @@ def update_mentorprofile(request):
   
                 mentor_profile.bio = bio
                 mentor_profile.professional_career = professional_career
-                mentor_profile.language = ','.join(languages) if languages else ''
 
                 if profile_picture:
                     logger.info(f"Processing profile picture upload for {request.user.email}")
                     mentor_profile.profile_picture = profile_picture
 
                 mentor_profile.save()
+                mentor_profile.languages.set(Language.valid_codes(languages))
                 logger.info(f"Updated Mentor Profile for {request.user.email}")
 
                 messages.success(request, 'Mentor profile updated successfully!')
@@ -551,7 +596,7 @@ def update_menteeprofile(request):
 
     if request.method == 'GET':
 
-        selected_languages = mentee_profile.language.split(',') if mentee_profile.language else []
+        selected_languages = list(mentee_profile.languages.values_list('code', flat=True))
 
         context = {
             'user_data': request.user,
@@ -652,7 +697,6 @@ def update_menteeprofile(request):
                 request.user.save()
 
                 mentee_profile.bio = bio
-                mentee_profile.language = ','.join(languages) if languages else ''
                 mentee_profile.location = location
                 mentee_profile.professional_career = professional_career
                 mentee_profile.professional_goal = professional_goal
@@ -665,6 +709,7 @@ def update_menteeprofile(request):
                     mentee_profile.cv_file = cv_file
                     
                 mentee_profile.save()
+                mentee_profile.languages.set(Language.valid_codes(languages))
 
                 messages.success(request, 'Mentee profile updated successfully!')
                 # Redirect to avoid form resubmission on refresh
@@ -0,0 +1,297 @@
+"""
+Shared helpers for the ``bench_*`` management commands.
+
+Benchmarks never touch the configured database: they build a throw-away copy
+of the schema the same way the test runner does and drop it afterwards.
+
+``Journeys`` drives the main user journeys through a client: Django's test
+client in process (``bench_journeys``) or ``HttpClient`` against a running
+server (``bench_serving``).
+"""
+
+import http.cookiejar
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser, MentorProfile, MenteeProfile
+from core import seeding
+from core.middleware import QueryTimer
+from mentor.models import MentorAvailability
+
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0, alias='default'):
+    connection = connections[alias]
+
+    # The default SQLite test database lives in memory, which concurrent
+    # benchmarks can not share between threads. Use a file instead.
+    if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tempfile.gettempdir(), 'matkamestre_benchmark.sqlite3'
+        )
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb)
+
+    try:
+        yield connection
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+
+
+
+def create_mentor(label='bench'):
+    user = CustomUser.objects.create(
+        username=f'{label}-mentor-{uuid4().hex[:8]}',
+        email=f'{label}-mentor-{uuid4().hex[:8]}@example.com',
+        password=make_password(None),
+        is_mentor=True,
+    )
+    return MentorProfile.objects.create(user=user)
+
+
+
+def create_mentees(mentor_profile, count, label='bench'):
+    password = make_password(None)
+    prefix = f'{label}-{uuid4().hex[:8]}'
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'{prefix}-mentee-{i}',
+            email=f'{prefix}-mentee-{i}@example.com',
+            password=password,
+            is_mentor=False,
+            mentor=mentor_profile.user,
+        )
+        for i in range(count)
+    ])
+
+    return MenteeProfile.objects.bulk_create([MenteeProfile(user=user) for user in users])
+
+
+
+# Rows per table of the journey benchmarks at scale 1
+VOLUMES = {'mentors': 1_000, 'mentees': 50_000, 'slots': 1_000_000, 'tasks': 500_000}
+
+JOURNEYS = ('mentor', 'mentee', 'tasks')
+
+
+
+def seed_volumes(scale, seed, log):
+    """Seed the benchmark database at ``scale`` unless it already is; return the volumes."""
+    volumes = {name: max(1, round(count * scale)) for name, count in VOLUMES.items()}
+
+    if CustomUser.objects.filter(email=seeding.mentor_email(0)).exists():
+        volumes['mentors'] = CustomUser.objects.filter(is_mentor=True, email__endswith=seeding.EMAIL_DOMAIN).count()
+        volumes['mentees'] = CustomUser.objects.filter(is_mentor=False, email__endswith=seeding.EMAIL_DOMAIN).count()
+        log(f"Reusing the seeded data ({volumes['mentors']:,} mentors, {volumes['mentees']:,} mentees)")
+    else:
+        began = time.perf_counter()
+        seeding.seed_database(seed=seed, log=log, **volumes)
+        log(f'Seeded in {time.perf_counter() - began:.1f}s')
+
+    return volumes
+
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+
+class HttpClient:
+    """Just enough of django.test.Client over real HTTP: cookies, CSRF, no redirects followed."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+
+    def get(self, path, data=None):
+        return self.open(path)
+
+
+    def post(self, path, data=None):
+        token = next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+        body = urllib.parse.urlencode({**(data or {}), 'csrfmiddlewaretoken': token}).encode()
+        return self.open(path, body)
+
+
+    def open(self, path, body=None):
+        request = urllib.request.Request(self.base_url + path, data=body, headers={'Referer': self.base_url + path})
+        try:
+            response = self.opener.open(request, timeout=120)
+        except urllib.error.HTTPError as error:  # Includes the redirects
+            response = error
+
+        with response:
+            response.read()
+        return SimpleNamespace(status_code=response.status, url=response.headers.get('Location', ''))
+
+
+
+class Journeys:
+    """The user journeys, each run with a fresh client (so a fresh login)."""
+
+    def __init__(self, mentors, mentees, record, client_class=Client):
+        self.mentors = mentors
+        self.mentees = mentees
+        self.record = record
+        self.client_class = client_class
+
+
+    def request(self, step, client, method, path, data=None, redirect_to=None):
+        # Queries are only seen when the client runs the views in this process
+        stats = {'queries': 0, 'query_ms': 0.0}
+        with connection.execute_wrapper(QueryTimer(stats)):
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            elapsed = time.perf_counter() - start
+
+        ok = response.status_code < 400
+        if redirect_to is not None:
+            ok = response.status_code == 302 and response.url == redirect_to
+        self.record(step, elapsed * 1000, stats['queries'], ok)
+        return response
+
+
+    def login(self, client, email, dashboard):
+        self.request('login form', client, 'get', reverse('login'))
+        self.request(
+            'login', client, 'post', reverse('login'),
+            {'email': email, 'password': seeding.PASSWORD}, redirect_to=reverse(dashboard),
+        )
+
+
+    def mentor(self, rng):
+        client = self.client_class()
+        self.login(client, seeding.mentor_email(rng.randrange(self.mentors)), 'dashboard_mentor')
+        self.request('dashboard_mentor', client, 'get', reverse('dashboard_mentor'))
+
+
+    def mentee(self, rng):
+        client = self.client_class()
+        i = rng.randrange(self.mentees)
+        self.login(client, seeding.mentee_email(i), 'dashboard_mentee')
+        self.request('dashboard_mentee', client, 'get', reverse('dashboard_mentee'))
+
+        # Chosen outside the timings, as a user would pick it from the page
+        slot = (
+            MentorAvailability.objects.filter(
+                mentor__user__email=seeding.mentor_email(i % self.mentors),
+                is_booked=False,
+                start_time__gt=timezone.now() + timedelta(days=rng.randint(0, 90)),
+            )
+            .order_by('start_time')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if slot:
+            self.request('book_slot', client, 'post', reverse('book_slot', args=[slot]), redirect_to=reverse('dashboard_mentee'))
+
+
+    def tasks(self, rng):
+        client = self.client_class()
+        m = rng.randrange(self.mentors)
+        self.login(client, seeding.mentor_email(m), 'dashboard_mentor')
+        self.request('create_task form', client, 'get', reverse('create_task'))
+
+        mentee = m + self.mentors * rng.randrange(max(1, (self.mentees - m + self.mentors - 1) // self.mentors))
+        self.request('create_task', client, 'post', reverse('create_task'), {
+            'mentee_email': seeding.mentee_email(mentee),
+            'title': 'Benchmark task',
+            'description': 'Created by a benchmark.',
+            'due_date': (timezone.now() + timedelta(days=7)).date().isoformat(),
+        }, redirect_to=reverse('list_task'))
+        self.request('list_task', client, 'get', reverse('list_task'))
+
+
+
+def run_journeys(volumes, iterations, concurrency, seed, warmup=0, client_class=Client):
+    """
+    Run every journey ``iterations`` times over ``concurrency`` threads.
+    Returns ({step: [(ms, queries, ok)]}, wall seconds).
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def record(step, ms, queries, ok):
+        with lock:
+            results.setdefault(step, []).append((ms, queries, ok))
+
+    journeys = Journeys(volumes['mentors'], volumes['mentees'], record, client_class)
+    rng = random.Random(seed)
+
+    unrecorded = Journeys(volumes['mentors'], volumes['mentees'], lambda *args: None, client_class)
+    for name in JOURNEYS:
+        for _ in range(warmup):
+            getattr(unrecorded, name)(rng)
+
+    plan = [name for name in JOURNEYS for _ in range(iterations)]
+    rng.shuffle(plan)
+    concurrency = max(1, concurrency)
+
+    def worker(number):
+        thread_rng = random.Random(f'{seed}-{number}')
+        try:
+            for name in plan[number::concurrency]:
+                getattr(journeys, name)(thread_rng)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results, time.perf_counter() - began
+
+
+
+def percentile(timings, p):
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method='inclusive')[p - 1]
+
+
+
+def summarize(results):
+    """Latency percentiles, mean queries and errors per step."""
+    steps = {}
+    for step, rows in results.items():
+        timings = sorted(ms for ms, _, _ in rows)
+        steps[step] = {
+            'runs': len(rows),
+            'errors': sum(1 for _, _, ok in rows if not ok),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'queries': round(statistics.fmean(queries for _, queries, _ in rows), 1),
+        }
+    return steps
@@ -0,0 +1,93 @@
+"""
+The ``default`` database settings, built from the DB_* environment variables
+in core/settings.py.
+
+SQLite (the default) is tuned for a site with many concurrent readers and a
+few writers:
+
+- WAL lets readers and a writer work at the same time instead of blocking
+  each other, and ``synchronous=NORMAL`` only syncs the disk at checkpoints
+  (a power cut can lose the last commits, never corrupt the file).
+- A busy timeout makes a writer wait for the lock instead of failing with
+  "database is locked", and IMMEDIATE transactions take the write lock at
+  BEGIN, so a transaction never fails halfway when it starts writing.
+- mmap, a bigger page cache and in-memory temp tables speed up reads.
+
+On PostgreSQL, connections are kept open and checked before reuse, or taken
+from a psycopg connection pool (``DB_POOL_SIZE``, needs ``psycopg[pool]``).
+
+Read replicas (``DB_REPLICAS``, used by core/replicas.py) share the primary's
+settings apart from the SQLite file or the PostgreSQL host.
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+
+
+
+SQLITE = 'django.db.backends.sqlite3'
+POSTGRESQL = 'django.db.backends.postgresql'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20_000,  # Negative means KiB
+    'temp_store': 'MEMORY',
+}
+
+
+
+def sqlite_options(busy_timeout=20, pragmas=SQLITE_PRAGMAS):
+    return {
+        'timeout': busy_timeout,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+    }
+
+
+
+def database_config(
+    engine=SQLITE, name='db.sqlite3', user='', password='', host='', port='',
+    base_dir=None, conn_max_age=0, pool_size=0, busy_timeout=20,
+):
+    """
+    A DATABASES entry. ``conn_max_age`` keeps connections open that many
+    seconds (None: forever); relative SQLite names are taken from ``base_dir``.
+    """
+    config = {
+        'ENGINE': engine,
+        'NAME': name,
+        'CONN_MAX_AGE': conn_max_age,
+        # A persistent connection that broke (e.g. the server restarted) is replaced, not reused
+        'CONN_HEALTH_CHECKS': conn_max_age != 0,
+        'OPTIONS': {},
+    }
+
+    if engine == SQLITE:
+        if base_dir is not None:
+            config['NAME'] = base_dir / name
+        config['OPTIONS'] = sqlite_options(busy_timeout)
+
+    else:
+        config.update(USER=user, PASSWORD=password, HOST=host, PORT=port)
+
+        if engine == POSTGRESQL and pool_size:
+            # The pool keeps connections itself, Django must not also hold them
+            config['OPTIONS']['pool'] = {'min_size': 1, 'max_size': pool_size}
+            config['CONN_MAX_AGE'] = 0
+            config['CONN_HEALTH_CHECKS'] = False
+
+    return config
+
+
+
+def replica_config(primary, replica, base_dir=None):
+    """A replica of ``primary``: ``replica`` is a SQLite file name or a database host."""
+    config = {**primary, 'OPTIONS': dict(primary['OPTIONS']), 'TEST': {'MIRROR': DEFAULT_DB_ALIAS}}
+
+    if primary['ENGINE'] == SQLITE:
+        config['NAME'] = base_dir / replica if base_dir is not None else replica
+    else:
+        config['HOST'] = replica
+
+    return config
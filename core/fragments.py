@@ -0,0 +1,61 @@
+"""
+Change stamps for cached template fragments.
+
+A profile page caches its body with ``{% cache %}`` in the shared cache,
+keyed by the profile id and ``updated_at`` plus a stamp: the time of the
+latest change of the related rows the page shows (a mentee's tasks, booked
+slots, recordings, a profile's languages). Signals and the services that write
+with ``update()`` move the stamp forward after the transaction commits, so the
+next view renders under a new key and the old fragment is never read again.
+Nothing is deleted, the cache expires old fragments by itself.
+
+A stamp that is missing (never touched, expired or evicted) starts at the
+current time, which can only cause a miss. Only get/set/add are used, so any
+cache backend works: local memory, files, Redis or Memcached.
+"""
+
+import time
+import zlib
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+
+CACHE_ALIAS = 'shared'
+
+# Seconds a rendered fragment is kept; also bounds what a lagging replica or a
+# slot starting in the meantime can leave on a page
+TIMEOUT = 300
+STAMP_TIMEOUT = 24 * 3600
+
+
+
+def stamp_key(model, pk):
+    # Per database, so test and benchmark databases never touch the site's stamps
+    database = zlib.crc32(str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME']).encode())
+    return f'stamp:{database:x}:{model._meta.label_lower}:{pk}'
+
+
+
+def stamp(model, pk):
+    """The stamp of one object. Read it before the rows it stands for."""
+    cache = caches[CACHE_ALIAS]
+    key = stamp_key(model, pk)
+    found = cache.get(key)
+
+    if found is None:
+        # add(): a stamp another worker just set wins
+        cache.add(key, time.time_ns(), STAMP_TIMEOUT)
+        found = cache.get(key) or time.time_ns()
+
+    return found
+
+
+
+def touch(model, pks):
+    """Record a change of related rows of the given objects. Call it after the commit."""
+    now = time.time_ns()
+    keys = {stamp_key(model, pk): now for pk in pks if pk is not None}
+    if keys:
+        caches[CACHE_ALIAS].set_many(keys, STAMP_TIMEOUT)
@@ -0,0 +1,179 @@
+"""
+Opt-in per-request profiling (``PROFILING_ENABLED``).
+
+For a sample of requests (``PROFILING_SAMPLE_RATE``, none by default) the
+middleware records wall time and the number and time of database queries
+(through ``connection.execute_wrapper``). Records go to an in-process ring
+buffer, shown at /admin/profiling/, and to the ``core.profiling`` logger;
+requests slower than ``PROFILING_SLOW_MS`` are always recorded.
+
+Two measurements cost every request of the worker process, not only the
+sampled ones, and are off unless asked for:
+
+* ``PROFILING_TEMPLATES`` times template rendering by replacing
+  ``Template.render`` for the whole process. It stays replaced until the
+  process exits, even when no request is profiled any more.
+* ``PROFILING_MEMORY`` records peak Python memory with tracemalloc, which
+  traces the allocations of every thread while a sampled request runs.
+
+A staff user can send ``X-Profile: 1`` to run that one request under
+cProfile; the dump is saved to ``PROFILING_DUMP_DIR`` and named in the
+``X-Profile-Dump`` response header.
+"""
+
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+
+logger = logging.getLogger('core.profiling')
+
+
+
+records = deque(maxlen=getattr(settings, 'PROFILING_BUFFER_SIZE', 200))
+
+# Stats of the request being handled; None outside a request
+current = ContextVar('profiling_current', default=None)
+
+# tracemalloc is process-wide: only one request at a time measures memory
+memory_lock = threading.Lock()
+
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and their time."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats['queries'] += 1
+            self.stats['query_ms'] += (time.perf_counter() - start) * 1000
+
+
+
+_original_render = template_base.Template.render
+
+
+def timed_render(self, context):
+    stats = current.get()
+    if stats is None or stats['template_depth']:
+        # Included templates are part of the outermost render
+        return _original_render(self, context)
+
+    stats['template_depth'] += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats['template_depth'] -= 1
+        stats['template_ms'] += (time.perf_counter() - start) * 1000
+
+
+
+def dump_name(request):
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = request.path.strip('/').replace('/', '_') or 'root'
+    return f'{stamp}-{path[:60]}.prof'
+
+
+
+class ProfilingMiddleware:
+    """Place it right after AuthenticationMiddleware, so request.user is known."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.slow_ms = getattr(settings, 'PROFILING_SLOW_MS', 1000)
+        self.dump_dir = getattr(settings, 'PROFILING_DUMP_DIR', None)
+        self.memory = getattr(settings, 'PROFILING_MEMORY', False)
+        self.templates = getattr(settings, 'PROFILING_TEMPLATES', False)
+        if self.templates:
+            template_base.Template.render = timed_render
+
+
+    def __call__(self, request):
+        sampled = random.random() < self.sample_rate
+        profile = (
+            self.dump_dir
+            and 'X-Profile' in request.headers
+            and request.user.is_authenticated
+            and request.user.is_staff
+        )
+
+        stats = {'queries': 0, 'query_ms': 0.0, 'template_ms': 0.0, 'template_depth': 0}
+        token = current.set(stats)
+        tracing = False
+        profiler = cProfile.Profile() if profile else None
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(QueryTimer(stats)))
+
+                if self.memory and (sampled or profile) and memory_lock.acquire(blocking=False):
+                    tracing = True
+                    tracemalloc.start()
+
+                if profiler:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            peak = None
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                memory_lock.release()
+            current.reset(token)
+
+        if profiler:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            name = dump_name(request)
+            profiler.dump_stats(os.path.join(self.dump_dir, name))
+            response['X-Profile-Dump'] = name
+
+        if sampled or profile or elapsed_ms >= self.slow_ms:
+            record = {
+                'time': datetime.now(),
+                'method': request.method,
+                'path': request.path,
+                'view': request.resolver_match.view_name if request.resolver_match else '',
+                'status': response.status_code,
+                'wall_ms': round(elapsed_ms, 1),
+                'queries': stats['queries'],
+                'query_ms': round(stats['query_ms'], 1),
+                'template_ms': round(stats['template_ms'], 1) if self.templates else None,
+                'peak_kb': round(peak / 1024) if peak is not None else None,
+            }
+            records.append(record)
+
+            message = '{method} {path} {status} {wall_ms}ms queries={queries} ({query_ms}ms)'.format(**record)
+            if record['template_ms'] is not None:
+                message += f" templates={record['template_ms']}ms"
+            if record['peak_kb'] is not None:
+                message += f" peak={record['peak_kb']}KB"
+            logger.info(message)
+
+        return response
@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with ``WHERE (created_at, id) < (cursor)`` instead of an
+OFFSET, so every page costs the same however deep into a large list it is,
+and rows added meanwhile do not shift the pages being read.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+
+def encode_cursor(created_at, pk):
+    payload = json.dumps([created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, pk), or None for a missing or tampered cursor."""
+    if not token:
+        return None
+
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, pk = json.loads(payload)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+
+def field_value(item, path):
+    for name in path.split('__'):
+        item = getattr(item, name)
+    return item
+
+
+
+def keyset_page(queryset, after=None, before=None, per_page=25, fields=('created_at', 'pk')):
+    """
+    Return (items, next_cursor, previous_cursor) for one page of ``queryset``
+    ordered newest first on ``fields``, a (timestamp, unique id) pair that
+    should be backed by an index.
+
+    ``after`` continues past the last row of a page, ``before`` goes back
+    from the first one. The cursors are None at either end of the list.
+    """
+    timestamp, unique = fields
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+
+    if before is not None:
+        created_at, pk = before
+        queryset = queryset.filter(**{f'{timestamp}__gte': created_at}).filter(
+            Q(**{f'{timestamp}__gt': created_at}) | Q(**{f'{unique}__gt': pk})
+        )
+        rows = list(queryset.order_by(timestamp, unique)[:per_page + 1])
+        has_previous = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after is not None:
+            created_at, pk = after
+            # The plain bound on the timestamp lets the index seek straight to the cursor
+            queryset = queryset.filter(**{f'{timestamp}__lte': created_at}).filter(
+                Q(**{f'{timestamp}__lt': created_at}) | Q(**{f'{unique}__lt': pk})
+            )
+        rows = list(queryset.order_by(f'-{timestamp}', f'-{unique}')[:per_page + 1])
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_previous = after is not None
+
+    def cursor(item):
+        return encode_cursor(field_value(item, timestamp), field_value(item, unique))
+
+    next_cursor = cursor(items[-1]) if items and has_next else None
+    previous_cursor = cursor(items[0]) if items and has_previous else None
+
+    return items, next_cursor, previous_cursor
+
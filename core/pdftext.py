@@ -0,0 +1,60 @@
+"""
+Plain-text extraction from PDF files with pypdf (pure Python, no system
+libraries). It does not import Django, so it can run in worker processes.
+"""
+
+import re
+import unicodedata
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    # Checked by extract_cv_text, which leaves CVs queued until it is installed
+    PdfReader = None
+
+
+
+# Bounds the work a hostile or huge upload can cause
+MAX_PAGES = 20
+MAX_CHARS = 50_000
+
+HYPHENATED_RE = re.compile(r'(\w)-\s*\n\s*(\w)')
+SPACE_RE = re.compile(r'\s+')
+
+
+
+def is_available():
+    return PdfReader is not None
+
+
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text)
+    # Join words split across lines ("develop-\nment")
+    text = HYPHENATED_RE.sub(r'\1\2', text)
+    text = ''.join(char if char.isprintable() else ' ' for char in text)
+    return SPACE_RE.sub(' ', text).strip()[:MAX_CHARS]
+
+
+
+def extract_text(path):
+    """Return (normalized text, error message) for the PDF at ``path``."""
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            # Many exported CVs are "encrypted" with an empty password
+            reader.decrypt('')
+
+        parts = []
+        length = 0
+        for number in range(min(len(reader.pages), MAX_PAGES)):
+            text = reader.pages[number].extract_text() or ''
+            parts.append(text)
+            length += len(text)
+            if length > MAX_CHARS:
+                break
+
+        return normalize_text('\n'.join(parts)), ''
+
+    except Exception as error:  # A broken upload must not stop the batch
+        return '', f'{type(error).__name__}: {error}'
@@ -0,0 +1,132 @@
+"""
+Read replicas for read-only views.
+
+Every database other than ``default`` is a replica (``DB_REPLICAS`` in
+settings). Views decorated with ``@read_from_replica()``, or code inside
+``with read_from_replica():``, read from a replica; everything else, every
+write and every read inside a transaction use the primary. Within one request
+all replica reads go to the same replica.
+
+Replicas lag behind the primary. So that users always see their own changes,
+a request that writes sets a short-lived cookie (``ReplicaPinMiddleware``)
+that keeps that browser on the primary for ``REPLICA_PIN_SECONDS``; the rest
+of the writing request also stays on the primary.
+"""
+
+import random
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+
+PIN_COOKIE = 'primary_pin'
+
+# Inside read_from_replica
+replica_reads = ContextVar('replica_reads', default=False)
+
+# {'pinned', 'wrote', 'replica'} of the request being handled; None outside requests
+request_state = ContextVar('replica_request_state', default=None)
+
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+
+class read_from_replica(ContextDecorator):
+    """Send the reads of a view or block to a replica, when there is one."""
+
+    def _recreate_cm(self):
+        # A fresh instance per call, so concurrent requests never share a token
+        return type(self)()
+
+
+    def __enter__(self):
+        self.token = replica_reads.set(True)
+        return self
+
+
+    def __exit__(self, *exc_info):
+        replica_reads.reset(self.token)
+        return False
+
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        aliases = replica_aliases()
+        if not aliases:
+            return None
+
+        state = request_state.get()
+        if state is None:
+            return random.choice(aliases)
+        if state['pinned'] or state['wrote']:
+            return None
+        if state['replica'] is None:
+            state['replica'] = random.choice(aliases)
+        return state['replica']
+
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema from the primary through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+
+class ReplicaPinMiddleware:
+    """Place it before SessionMiddleware, so session writes also pin."""
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+
+        state = {'pinned': time.time() < pinned_until, 'wrote': False, 'replica': None}
+        token = request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+
+        if state['wrote']:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(round(time.time() + self.pin_seconds, 3)),
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,254 @@
+"""
+Deterministic bulk data for benchmarks and profiling.
+
+``seed_database`` fills an empty database with mentors, mentees, availability
+slots, tasks, invitation tokens and meeting recordings at production-like
+volumes. Rows go in with ``bulk_create`` in
+large batches, one transaction per table, and every user shares a password
+hashed once. All randomness comes from one ``random.Random(seed)``, so the
+same arguments always build the same data.
+
+Seeded users log in as ``mentor<i>@seed.example.com`` or
+``mentee<i>@seed.example.com`` with the password ``PASSWORD``.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import search
+from accounts.models import LANGUAGE_CHOICES, CustomUser, InvitationToken, MenteeProfile, MentorProfile
+from mentor.models import MeetingRecording, MentorAvailability, Task
+
+
+
+PASSWORD = 'matkamestre-seed'
+EMAIL_DOMAIN = 'seed.example.com'
+
+LOCATIONS = [
+    'Helsinki', 'Espoo', 'Tampere', 'Vantaa', 'Oulu', 'Turku', 'Jyväskylä', 'Lahti',
+    'Kuopio', 'Pori', 'Joensuu', 'Lappeenranta', 'Vaasa', 'Rovaniemi', 'Remote',
+]
+
+WORDS = '''
+    software engineer developer data analyst project manager nurse teacher designer marketing sales
+    finance accounting logistics customer service research chemistry biology healthcare education
+    python java javascript cloud kubernetes security networks product ux agile scrum leadership
+    startup consulting construction electrical mechanical architecture law translation hospitality
+    finnish swedish english language integration career network interview portfolio internship
+'''.split()
+
+# Share of tasks that are done, of slots that are booked and of tokens that were used
+DONE_RATE = 0.4
+BOOKED_RATE = 0.15
+USED_RATE = 0.6
+
+# Every seeded recording points at this one small file (stored once, see core.storage)
+PLACEHOLDER_VIDEO = b'matkamestre seeded recording\n'
+
+
+
+def mentor_email(i):
+    return f'mentor{i}@{EMAIL_DOMAIN}'
+
+
+def mentee_email(i):
+    return f'mentee{i}@{EMAIL_DOMAIN}'
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def spread(total, parts):
+    """How many of ``total`` rows go to each of ``parts`` owners, as evenly as possible."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+
+def insert(model, rows, batch_size, keep=False):
+    """bulk_create ``rows`` (any iterable) in batches; the created objects when ``keep``."""
+    created = [] if keep else None
+    count = 0
+    batch = []
+
+    with transaction.atomic():
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                count += len(batch)
+                if keep:
+                    created.extend(batch)
+                batch = []
+
+        if batch:
+            model.objects.bulk_create(batch)
+            count += len(batch)
+            if keep:
+                created.extend(batch)
+
+    return created if keep else count
+
+
+
+def seed_languages(through, owner_field, owners, rng, most, batch_size):
+    codes = [code for code, _ in LANGUAGE_CHOICES]
+    rows = (
+        through(**{owner_field: owner.pk, 'language_id': code})
+        for owner in owners
+        for code in rng.sample(codes, rng.randint(1, most))
+    )
+    return insert(through, rows, batch_size)
+
+
+
+def seed_database(
+    mentors=1_000, mentees=50_000, slots=1_000_000, tasks=500_000, tokens=0, recordings=0,
+    seed=0, batch_size=5_000, log=None,
+):
+    """
+    Fill the database and return {table: rows}. Mentee ``i`` belongs to mentor
+    ``i % mentors``; slots, tasks, tokens and recordings are spread evenly over
+    mentors and mentees.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    password = make_password(PASSWORD)
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    counts = {}
+
+    def step(name, function):
+        start = time.perf_counter()
+        result = function()
+        counts[name] = result if isinstance(result, int) else len(result)
+        log(f'{name}: {counts[name]:,} rows in {time.perf_counter() - start:.1f}s')
+        return result
+
+    mentor_users = step('mentor users', lambda: insert(CustomUser, (
+        CustomUser(
+            username=f'mentor{i}', email=mentor_email(i), password=password, is_mentor=True,
+            first_name=f'Mentor {i}',
+        )
+        for i in range(mentors)
+    ), batch_size, keep=True))
+
+    mentor_profiles = step('mentor profiles', lambda: insert(MentorProfile, (
+        MentorProfile(user=user, professional_career=words(rng, 25), bio=words(rng, 15))
+        for user in mentor_users
+    ), batch_size, keep=True))
+
+    step('mentor languages', lambda: seed_languages(
+        MentorProfile.languages.through, 'mentorprofile_id', mentor_profiles, rng, 3, batch_size
+    ))
+
+    mentee_users = step('mentee users', lambda: insert(CustomUser, (
+        CustomUser(
+            username=f'mentee{i}', email=mentee_email(i), password=password, is_mentor=False,
+            mentor=mentor_users[i % mentors], first_name=f'Mentee {i}',
+        )
+        for i in range(mentees)
+    ), batch_size, keep=True))
+
+    # Decide every task's state up front so the profile counters match
+    task_owners = spread(tasks, mentees)
+    done = [rng.random() < DONE_RATE for _ in range(tasks)]
+    done_counts = [0] * mentees
+    for j, is_done in enumerate(done):
+        if is_done:
+            done_counts[j % mentees] += 1
+
+    mentee_profiles = step('mentee profiles', lambda: insert(MenteeProfile, (
+        MenteeProfile(
+            user=user,
+            location=rng.choice(LOCATIONS),
+            professional_career=words(rng, 25),
+            professional_goal=words(rng, 12),
+            pending_task_count=task_owners[i] - done_counts[i],
+            done_task_count=done_counts[i],
+        )
+        for i, user in enumerate(mentee_users)
+    ), batch_size, keep=True))
+
+    step('mentee languages', lambda: seed_languages(
+        MenteeProfile.languages.through, 'menteeprofile_id', mentee_profiles, rng, 2, batch_size
+    ))
+
+    def slot_rows():
+        # Half a year back and forward, never overlapping
+        for m, count in enumerate(spread(slots, mentors)):
+            if not count:
+                continue
+            spacing = timedelta(days=365) / count
+            length = min(timedelta(hours=1), spacing)
+            start = now - timedelta(days=182)
+            own_mentees = mentee_profiles[m::mentors]
+
+            for k in range(count):
+                begins = start + spacing * k
+                booked = bool(own_mentees) and rng.random() < BOOKED_RATE
+                yield MentorAvailability(
+                    mentor=mentor_profiles[m],
+                    start_time=begins,
+                    end_time=begins + length,
+                    is_booked=booked,
+                    mentee=rng.choice(own_mentees) if booked else None,
+                )
+
+    step('availability slots', lambda: insert(MentorAvailability, slot_rows(), batch_size))
+
+    def task_rows():
+        today = now.date()
+        for j in range(tasks):
+            i = j % mentees
+            yield Task(
+                mentor=mentor_profiles[i % mentors],
+                mentee=mentee_profiles[i],
+                title=words(rng, 4).capitalize(),
+                description=words(rng, 20),
+                is_done=done[j],
+                due_date=today + timedelta(days=rng.randint(-30, 90)) if rng.random() < 0.8 else None,
+            )
+
+    step('tasks', lambda: insert(Task, task_rows(), batch_size))
+
+    def token_rows():
+        # Used ones were accepted by existing mentees; the rest went out to new addresses
+        for j in range(tokens):
+            used = rng.random() < USED_RATE
+            email = mentee_email(j % mentees) if used else f'invitee{j}@{EMAIL_DOMAIN}'
+            yield InvitationToken(
+                token='%032x' % rng.getrandbits(128),
+                mentee_email=email,
+                mentor=mentor_users[j % mentees % mentors],
+                expires_at=now + timedelta(hours=rng.randint(-24 * 90, 24)),
+                is_used=used,
+            )
+
+    if tokens:
+        step('invitation tokens', lambda: insert(InvitationToken, token_rows(), batch_size))
+
+    def recording_rows():
+        video = MeetingRecording._meta.get_field('video')
+        name = video.storage.save(video.generate_filename(None, 'seed.mp4'), ContentFile(PLACEHOLDER_VIDEO))
+        for j in range(recordings):
+            i = j % mentees
+            yield MeetingRecording(
+                mentor=mentor_profiles[i % mentors],
+                mentee=mentee_profiles[i],
+                title=f'Meeting {j // mentees + 1}: {words(rng, 3)}',
+                video=name,
+            )
+
+    if recordings:
+        step('meeting recordings', lambda: insert(MeetingRecording, recording_rows(), batch_size))
+
+    step('search index', search.rebuild_index)
+
+    return counts
@@ -1,7 +1,11 @@
+import sys
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 from django.contrib.messages import constants
 
+from core.database import database_config, replica_config
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,6 +22,9 @@ DEBUG = config('DEBUG', cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
 
+# Running manage.py test
+TESTING = sys.argv[1:2] == ['test']
+
 
 
 # Application definition
@@ -48,10 +55,12 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,13 +88,35 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection and SQLite tuning in core/database.py. Persistent connections are
+# off under DEBUG: runserver starts a thread, so a connection, per request.
 DATABASES = {
-    'default': {
-        'ENGINE': config("DB_ENGINE", default='django.db.backends.sqlite3'),
-        'NAME': BASE_DIR / config("DB_NAME", default='db.sqlite3'),
-    }
+    'default': database_config(
+        engine=config("DB_ENGINE", default='django.db.backends.sqlite3'),
+        name=config("DB_NAME", default='db.sqlite3'),
+        user=config("DB_USER", default=''),
+        password=config("DB_PASSWORD", default=''),
+        host=config("DB_HOST", default=''),
+        port=config("DB_PORT", default=''),
+        base_dir=BASE_DIR,
+        conn_max_age=config("DB_CONN_MAX_AGE", default=0 if DEBUG else 600, cast=int),
+        pool_size=config("DB_POOL_SIZE", default=0, cast=int),
+        busy_timeout=config("DB_BUSY_TIMEOUT", default=20, cast=int),
+    )
 }
 
+# Read replicas for read-only views (core/replicas.py): SQLite file names or PostgreSQL hosts.
+# After a write a browser stays on the primary for REPLICA_PIN_SECONDS to see its own changes.
+DATABASES.update({
+    f'replica{number}': replica_config(DATABASES['default'], replica, BASE_DIR)
+    for number, replica in enumerate(config("DB_REPLICAS", default='', cast=Csv()), 1)
+})
+if TESTING and len(DATABASES) == 1:
+    # A mirror of the test database, so tests go through the replica routing
+    DATABASES['replica1'] = replica_config(DATABASES['default'], 'replica1.sqlite3', BASE_DIR)
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=10, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,6 +162,47 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content (see core/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Meeting recordings and CVs are stored outside MEDIA_ROOT, which no server
+# exposes, and only served through permission-checked views.
+# '' streams them from Django; 'nginx' hands them to an internal location
+# at PROTECTED_MEDIA_PREFIX with X-Accel-Redirect; 'sendfile' sets X-Sendfile.
+PROTECTED_MEDIA_ROOT = BASE_DIR / 'protected_media'
+PROTECTED_MEDIA_SERVER = config("PROTECTED_MEDIA_SERVER", default='')
+PROTECTED_MEDIA_PREFIX = '/protected-media/'
+
+# In production requests come through nginx (nginx/default.conf), which sets X-Forwarded-Proto
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+
+
+# CACHES
+# 'default' lives in each process (e.g. matching scores). 'shared' is seen by all
+# workers on the host and holds sessions and users' profile ids
+# (accounts/identity.py); point it at Redis when the site runs on several hosts.
+SHARED_CACHE_BACKEND = config('SHARED_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': config('SHARED_CACHE_LOCATION', default=str(Path(tempfile.gettempdir()) / 'matkamestre-cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20_000} if SHARED_CACHE_BACKEND.endswith('FileBasedCache') else {},
+    },
+}
+
+# manage.py test: a cache of the test process only, never entries of the site or of other runs
+if TESTING:
+    CACHES['shared'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'matkamestre-tests'}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
 
 
 # Default primary key field type
@@ -155,3 +227,26 @@ SERVER_EMAIL = config('SERVER_EMAIL')
 
 
 
+# REQUEST PROFILING (core/middleware.py), off unless PROFILING_ENABLED is set
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+# Share of requests recorded; slow requests are recorded anyway
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+# Process-wide, so they slow down every request of the worker: template timing
+# replaces Template.render, memory tracing runs tracemalloc for all threads.
+# Template.render stays replaced until the process exits; it is never restored.
+PROFILING_TEMPLATES = config('PROFILING_TEMPLATES', default=False, cast=bool)
+PROFILING_MEMORY = config('PROFILING_MEMORY', default=False, cast=bool)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=1000, cast=int)
+PROFILING_BUFFER_SIZE = 200
+PROFILING_DUMP_DIR = config('PROFILING_DUMP_DIR', default=str(BASE_DIR / 'profiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
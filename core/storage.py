@@ -0,0 +1,304 @@
+"""
+Content-addressed media storage.
+
+Every uploaded file is hashed (SHA-256) while it is written and stored once
+under its digest, ``blobs/ab/cd/<digest><ext>``. Identical CVs, pictures or
+recordings share one blob, and a blob's name never changes meaning, so it
+can be cached forever.
+
+Profile pictures live in MEDIA_ROOT, which the web server serves to anyone.
+Recordings and CVs use ``protected_storage`` under PROTECTED_MEDIA_ROOT, which
+it never serves: they are only sent by views that check permissions
+(``core.streaming``).
+
+Blobs are reference-counted from the FileFields that point at them: when a
+file is replaced or its row deleted (signals in ``accounts.signals`` and
+``mentor.signals``), the old blob is removed once no field references it.
+``python manage.py collect_media_garbage`` sweeps anything those missed.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.utils.functional import cached_property
+
+
+
+BLOB_DIR = 'blobs'
+INCOMING_DIR = 'blobs/incoming'
+
+READ_SIZE = 1024 * 1024
+
+# A blob this recent may belong to a row that is not committed yet
+GRACE_SECONDS = 60 * 60
+
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+
+def blob_name(digest, extension):
+    extension = extension.lower()
+    if not EXTENSION_RE.match(extension):
+        extension = ''
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + '/') and not name.startswith(INCOMING_DIR + '/')
+
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """A FileSystemStorage that names files by their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the digest in _save; equal names mean equal files
+        return name
+
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1]
+        digest = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large uploads, staged recordings): hash it, then move it
+            source = content.temporary_file_path()
+            with open(source, 'rb') as file:
+                for block in iter(lambda: file.read(READ_SIZE), b''):
+                    digest.update(block)
+        else:
+            incoming = self.path(INCOMING_DIR)
+            os.makedirs(incoming, exist_ok=True)
+            fd, source = tempfile.mkstemp(dir=incoming)
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    for chunk in content.chunks():
+                        digest.update(chunk)
+                        file.write(chunk)
+            except BaseException:
+                os.remove(source)
+                raise
+
+        name = blob_name(digest.hexdigest(), extension)
+        path = self.path(name)
+
+        if os.path.exists(path):
+            # Stored before: keep the existing blob and mark it as in use again
+            if not hasattr(content, 'temporary_file_path'):
+                os.remove(source)
+            os.utime(path)
+            return name
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(source, path, allow_overwrite=True)
+        else:
+            os.replace(source, path)
+        os.utime(path)
+
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+
+        return name
+
+
+
+class ProtectedStorage(ContentAddressedStorage):
+    """Blobs under PROTECTED_MEDIA_ROOT, only served after a permission check."""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PROTECTED_MEDIA_ROOT)
+
+
+    @cached_property
+    def base_url(self):
+        # The internal location of X-Accel-Redirect; nothing outside the server can open it
+        return self._value_or_setting(self._base_url, settings.PROTECTED_MEDIA_PREFIX)
+
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        # Follows the PROTECTED_ settings instead of MEDIA_ROOT and MEDIA_URL
+        renamed = {'PROTECTED_MEDIA_ROOT': 'MEDIA_ROOT', 'PROTECTED_MEDIA_PREFIX': 'MEDIA_URL'}
+        if setting in ('MEDIA_ROOT', 'MEDIA_URL'):
+            return
+        super()._clear_cached_properties(renamed.get(setting, setting), **kwargs)
+
+
+
+protected = ProtectedStorage()
+
+
+def protected_storage():
+    # A callable, so migrations refer to it rather than to the storage class
+    return protected
+
+
+
+def file_fields(storage=None):
+    """(model, field) for every FileField stored in a content-addressed storage, or in ``storage``."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if hasattr(field, 'storage') and isinstance(field.storage, ContentAddressedStorage)
+        and (storage is None or field.storage.location == storage.location)
+    ]
+
+
+def storages_in_use():
+    return list({field.storage.location: field.storage for _, field in file_fields()}.values())
+
+
+def is_referenced(storage, name):
+    return any(
+        model._default_manager.filter(**{field.name: name}).exists()
+        for model, field in file_fields(storage)
+    )
+
+
+
+def release(files):
+    """Delete the blobs among ``files``, (storage, name) pairs, that no FileField references any more."""
+    for storage, name in set(files):
+        if not is_blob(name) or is_referenced(storage, name):
+            continue
+
+        try:
+            if time.time() - os.path.getmtime(storage.path(name)) < GRACE_SECONDS:
+                continue
+        except FileNotFoundError:
+            continue
+
+        storage.delete(name)
+
+
+
+def stored_names(instance):
+    return {
+        field.name: getattr(instance, field.attname).name
+        for field in instance._meta.concrete_fields
+        if hasattr(field, 'storage') and isinstance(field.storage, ContentAddressedStorage)
+    }
+
+
+def storage_of(instance, field_name):
+    return instance._meta.get_field(field_name).storage
+
+
+
+# Signal handlers, connected per model by the apps
+
+def remember_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: note which files the row pointed at before this save."""
+    instance._stored_files = {}
+    if raw or instance._state.adding or instance.pk is None:
+        return
+
+    fields = list(stored_names(instance))
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+    if fields:
+        instance._stored_files = sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+def release_replaced(sender, instance, raw=False, **kwargs):
+    """post_save: release the files this save replaced or cleared."""
+    current = stored_names(instance)
+    replaced = [
+        (storage_of(instance, field), name) for field, name in getattr(instance, '_stored_files', {}).items()
+        if name and name != current.get(field)
+    ]
+    if replaced and not raw:
+        transaction.on_commit(lambda: release(replaced))
+
+
+def release_deleted(sender, instance, **kwargs):
+    """post_delete: release every file of the deleted row."""
+    files = [(storage_of(instance, field), name) for field, name in stored_names(instance).items() if name]
+    if files:
+        transaction.on_commit(lambda: release(files))
+
+
+
+def collect_garbage(grace_seconds=GRACE_SECONDS):
+    """
+    Delete blobs no FileField references and leftovers of interrupted saves,
+    in every storage. Returns (deleted files, freed bytes).
+    """
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    freed = 0
+
+    for storage in storages_in_use():
+        referenced = set()
+        for model, field in file_fields(storage):
+            referenced.update(
+                model._default_manager.exclude(**{field.name: ''})
+                .exclude(**{f'{field.name}__isnull': True})
+                .values_list(field.name, flat=True)
+                .iterator()
+            )
+
+        for directory, _, files in os.walk(storage.path(BLOB_DIR)):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+
+                stat = os.stat(path)
+                if name in referenced or stat.st_mtime > cutoff:
+                    continue
+
+                os.remove(path)
+                deleted += 1
+                freed += stat.st_size
+
+    return deleted, freed
+
+
+
+def adopt_legacy_files():
+    """
+    Move files stored under their upload names (before this storage), and
+    recordings and CVs still in MEDIA_ROOT, into blobs of their field's
+    storage, deduplicating them. Returns the number of files moved.
+    """
+    moved = 0
+
+    for model, field in file_fields():
+        storage = field.storage
+        rows = (
+            model._default_manager.exclude(**{field.name: ''})
+            .exclude(**{f'{field.name}__isnull': True})
+            .values_list('pk', field.name)
+        )
+
+        for pk, name in rows.iterator():
+            in_place = storage.exists(name)
+            if is_blob(name) and in_place:
+                continue
+
+            source = storage if in_place else default_storage
+            if not source.exists(name):
+                continue
+
+            with source.open(name, 'rb') as file:
+                new_name = storage.save(name, file)
+
+            if new_name != name:
+                # A queryset update keeps auto_now fields and signals out of it
+                model._default_manager.filter(pk=pk).update(**{field.name: new_name})
+            moved += 1
+
+            if not is_referenced(source, name):
+                source.delete(name)
+
+    return moved
@@ -0,0 +1,133 @@
+"""
+Access-controlled delivery of large media files with HTTP Range support.
+
+Views check permissions and hand the file to ``serve_file``. Depending on
+``PROTECTED_MEDIA_SERVER`` the bytes are then either sent by the front proxy
+(``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd), which
+handles ranges itself, or streamed by Django in fixed-size chunks so a
+multi-GB file never has to fit in worker memory.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+
+def parse_range(header, size):
+    """
+    Return the (first, last) byte positions requested by a Range header, or
+    None to send the whole file. Multiple ranges are answered with the whole
+    file, which RFC 9110 allows.
+    """
+    if not header:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # "bytes=-500" is the last 500 bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - int(last)), size - 1
+
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+
+    if first >= size or first > last:
+        raise RangeNotSatisfiable
+
+    return first, last
+
+
+
+def read_range(file, first, length, chunk_size=CHUNK_SIZE):
+    try:
+        file.seek(first)
+        while length > 0:
+            data = file.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+
+def serve_file(request, field_file, filename=None):
+    """Return a response for ``field_file`` (a FieldFile) honouring Range requests."""
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', '')
+
+    if server == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.PROTECTED_MEDIA_PREFIX + field_file.name)
+        return response
+
+    if server == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+
+    storage = field_file.storage
+    size = storage.size(field_file.name)
+
+    modified = None
+    try:
+        modified = http_date(storage.get_modified_time(field_file.name).timestamp())
+    except NotImplementedError:
+        pass
+
+    # A range of a file that changed since the client's copy must not be mixed
+    # in: the Range header is ignored and the whole file sent
+    header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != modified:
+        header = None
+
+    try:
+        requested = parse_range(header, size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = storage.open(field_file.name, 'rb')
+
+    if requested is None:
+        response = FileResponse(file, content_type=content_type, filename=filename)
+    else:
+        first, last = requested
+        length = last - first + 1
+        response = StreamingHttpResponse(read_range(file, first, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    if modified:
+        response['Last-Modified'] = modified
+    return response
@@ -0,0 +1,389 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.template import base as template_base
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from accounts.models import CustomUser, MentorProfile, MenteeProfile
+from mentor import services
+from mentor.models import MeetingRecording
+
+from . import middleware, storage, thumbnails
+from .replicas import PIN_COOKIE
+from .streaming import RangeNotSatisfiable, parse_range
+
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_open_range_is_the_whole_file(self):
+        self.assertEqual(parse_range('bytes=0-', 1000), (0, 999))
+        self.assertEqual(parse_range('bytes=100-', 1000), (100, 999))
+
+
+    def test_closed_range_is_clamped_to_the_file(self):
+        self.assertEqual(parse_range('bytes=10-19', 1000), (10, 19))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+
+
+    def test_suffix_range_is_the_end_of_the_file(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+
+    def test_unsatisfiable_ranges(self):
+        for header in ['bytes=1000-', 'bytes=2000-3000', 'bytes=20-10', 'bytes=-0']:
+            with self.subTest(header=header), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 1000)
+
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 1000))
+
+
+    def test_missing_or_malformed_headers_get_the_whole_file(self):
+        for header in [None, '', 'bytes=', 'bytes=-', 'bytes=a-b', 'items=0-9', 'bytes 0-9']:
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='matkamestre-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=f'{media_root}/public', PROTECTED_MEDIA_ROOT=f'{media_root}/protected')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+    def add_recording(self, content, name='talk.mp4'):
+        recording = MeetingRecording(title='Talk')
+        recording.video.save(name, ContentFile(content))
+        return recording
+
+
+    def age(self, name, seconds=storage.GRACE_SECONDS + 60):
+        past = time.time() - seconds
+        os.utime(storage.protected.path(name), (past, past))
+
+
+    def test_equal_files_share_one_blob(self):
+        first = self.add_recording(b'same bytes', 'one.mp4')
+        second = self.add_recording(b'same bytes', 'two.MP4')
+        other = self.add_recording(b'other bytes')
+
+        self.assertEqual(first.video.name, second.video.name)
+        self.assertTrue(storage.is_blob(first.video.name))
+        self.assertTrue(first.video.name.endswith('.mp4'))
+        self.assertNotEqual(first.video.name, other.video.name)
+        self.assertTrue(storage.protected.exists(first.video.name))
+        self.assertFalse(default_storage.exists(first.video.name))
+
+
+    def test_blob_is_released_when_its_last_row_goes(self):
+        first = self.add_recording(b'same bytes')
+        second = self.add_recording(b'same bytes')
+        name = first.video.name
+        self.age(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.protected.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.protected.exists(name))
+
+
+    def test_recent_blob_outlives_its_release(self):
+        # It may belong to a row another transaction has not committed yet
+        recording = self.add_recording(b'fresh bytes')
+        name = recording.video.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recording.delete()
+        self.assertTrue(storage.protected.exists(name))
+
+        self.age(name)
+        storage.release([(storage.protected, name)])
+        self.assertFalse(storage.protected.exists(name))
+
+
+    def test_collect_garbage_deletes_old_unreferenced_files(self):
+        kept = self.add_recording(b'kept').video.name
+        orphan = storage.protected.save('orphan.mp4', ContentFile(b'orphan'))
+        recent = storage.protected.save('recent.mp4', ContentFile(b'recent'))
+        leftover = f'{storage.INCOMING_DIR}/tmpleftover'
+        with storage.protected.open(leftover, 'wb') as file:
+            file.write(b'half')
+        for name in [kept, orphan, leftover]:
+            self.age(name)
+
+        self.assertEqual(storage.collect_garbage(), (2, len(b'orphan') + len(b'half')))
+
+        self.assertTrue(storage.protected.exists(kept))
+        self.assertTrue(storage.protected.exists(recent))
+        self.assertFalse(storage.protected.exists(orphan))
+        self.assertFalse(storage.protected.exists(leftover))
+
+
+    def test_adopt_legacy_files_moves_them_into_blobs(self):
+        # One recording left in the public MEDIA_ROOT, one under its upload name
+        for location in [default_storage, storage.protected]:
+            os.makedirs(location.path('video'))
+        with open(default_storage.path('video/public.mp4'), 'wb') as file:
+            file.write(b'old recording')
+        with open(storage.protected.path('video/named.mp4'), 'wb') as file:
+            file.write(b'old recording')
+        first = MeetingRecording.objects.create(title='Public', video='video/public.mp4')
+        second = MeetingRecording.objects.create(title='Named', video='video/named.mp4')
+
+        self.assertEqual(storage.adopt_legacy_files(), 2)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(storage.is_blob(first.video.name))
+        self.assertEqual(first.video.name, second.video.name)
+        with first.video.open('rb') as video:
+            self.assertEqual(video.read(), b'old recording')
+        self.assertFalse(default_storage.exists('video/public.mp4'))
+        self.assertFalse(storage.protected.exists('video/named.mp4'))
+
+        self.assertEqual(storage.adopt_legacy_files(), 0)
+
+
+
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='matkamestre-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # The renditions directory is resolved once, from the MEDIA_ROOT of its first use
+        patcher = mock.patch.object(thumbnails, 'renditions', thumbnails.RenditionStorage())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        self.profile = MentorProfile(user=user)
+
+
+    def test_picture_gets_a_square_rendition(self):
+        image = io.BytesIO()
+        Image.new('RGB', (300, 200), 'red').save(image, 'PNG')
+        self.profile.profile_picture.save('picture.png', ContentFile(image.getvalue()))
+
+        url = thumbnails.thumbnail_url(self.profile.profile_picture, 100)
+
+        name = thumbnails.rendition_name(self.profile.profile_picture.name, 128)
+        self.assertEqual(url, thumbnails.renditions.url(name))
+        with Image.open(thumbnails.renditions.path(name)) as rendition:
+            self.assertEqual(rendition.size, (128, 128))
+
+
+    def test_undecodable_picture_is_tried_once(self):
+        self.profile.profile_picture.save('picture.jpg', ContentFile(b'not an image'))
+        picture = self.profile.profile_picture
+
+        with self.assertLogs('core.thumbnails', 'WARNING'):
+            self.assertEqual(thumbnails.thumbnail_url(picture, 64), picture.url)
+
+        with self.assertNoLogs('core.thumbnails', 'WARNING'), mock.patch.object(thumbnails, 'render') as render:
+            self.assertEqual(thumbnails.thumbnail_url(picture, 64), picture.url)
+        render.assert_not_called()
+
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # replica1 mirrors the test database (settings), so committed rows are on both
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        caches['shared'].clear()
+        mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        mentor_profile = MentorProfile.objects.create(user=mentor)
+        mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=mentor)
+        self.task = services.create_task(mentor_profile, MenteeProfile.objects.create(user=mentee), 'Task', 'Description')
+        self.client.force_login(mentor)
+
+
+    def get_task_list(self):
+        with CaptureQueriesContext(connections['replica1']) as replica:
+            response = self.client.get(reverse('list_task'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['tasks']), [self.task])
+        return response, len(replica)
+
+
+    def test_read_only_view_reads_from_the_replica(self):
+        response, replica_queries = self.get_task_list()
+
+        self.assertGreater(replica_queries, 0)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+    def test_write_pins_the_browser_to_the_primary(self):
+        response = self.client.post(reverse('toggle_task_status', args=[self.task.pk]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # The test client sends the cookie back, as a browser would
+        response, replica_queries = self.get_task_list()
+        self.assertEqual(replica_queries, 0)
+        self.assertTrue(response.context['tasks'][0].is_done)
+
+
+    def test_expired_pin_reads_from_the_replica_again(self):
+        self.client.cookies[PIN_COOKIE] = '1'
+
+        self.assertGreater(self.get_task_list()[1], 0)
+
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.dump_dir = tempfile.mkdtemp(prefix='matkamestre-profiles-')
+        self.addCleanup(shutil.rmtree, self.dump_dir, ignore_errors=True)
+        middleware.records.clear()
+        self.addCleanup(middleware.records.clear)
+
+        self.staff = CustomUser.objects.create_user(username='staff', email='staff@example.com', password='pw', is_staff=True)
+        self.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+
+
+    def profiling(self, **options):
+        # The middleware reads its settings once, when the client's handler loads it
+        settings = override_settings(**{
+            'PROFILING_ENABLED': True,
+            'PROFILING_SAMPLE_RATE': 0,
+            'PROFILING_SLOW_MS': 60_000,
+            'PROFILING_DUMP_DIR': self.dump_dir,
+            **options,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+    def test_only_sampled_or_slow_requests_are_recorded(self):
+        self.profiling()
+        self.client.get(reverse('home'))
+        self.assertEqual(list(middleware.records), [])
+
+
+    def test_sampled_request_is_recorded_and_logged(self):
+        self.profiling(PROFILING_SAMPLE_RATE=1)
+        self.client.force_login(self.mentor)
+
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get(reverse('home'))
+
+        [record] = middleware.records
+        self.assertEqual((record['path'], record['view'], record['status']), ('/', 'home', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertIsNone(record['template_ms'])
+        self.assertIsNone(record['peak_kb'])
+        self.assertIn(f"GET / 200 {record['wall_ms']}ms queries={record['queries']}", logs.output[0])
+
+
+    def test_slow_request_is_recorded_unsampled(self):
+        self.profiling(PROFILING_SLOW_MS=0)
+
+        with self.assertLogs('core.profiling', 'INFO'):
+            self.client.get(reverse('home'))
+
+        self.assertEqual(len(middleware.records), 1)
+
+
+    def test_template_timing(self):
+        # Put back the render the middleware replaces for the rest of the process
+        patcher = mock.patch.object(template_base.Template, 'render', template_base.Template.render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.profiling(PROFILING_SAMPLE_RATE=1, PROFILING_TEMPLATES=True)
+
+        with self.assertLogs('core.profiling', 'INFO'):
+            self.client.get(reverse('home'))
+
+        self.assertGreater(middleware.records[0]['template_ms'], 0)
+
+
+    def test_staff_can_profile_one_request(self):
+        self.profiling()
+        self.client.force_login(self.staff)
+
+        with self.assertLogs('core.profiling', 'INFO'):
+            response = self.client.get(reverse('home'), headers={'X-Profile': '1'})
+
+        name = response['X-Profile-Dump']
+        self.assertEqual(os.listdir(self.dump_dir), [name])
+        self.assertEqual(len(middleware.records), 1)
+
+        response = self.client.get(reverse('admin_profiling_dump', args=[name]))
+        self.assertEqual(response.status_code, 200)
+        with open(os.path.join(self.dump_dir, name), 'rb') as dump:
+            self.assertEqual(b''.join(response.streaming_content), dump.read())
+        response.close()
+
+
+    def test_profile_header_is_ignored_for_other_users(self):
+        self.profiling()
+
+        response = self.client.get(reverse('home'), headers={'X-Profile': '1'})
+        self.assertNotIn('X-Profile-Dump', response)
+
+        self.client.force_login(self.mentor)
+        response = self.client.get(reverse('home'), headers={'X-Profile': '1'})
+        self.assertNotIn('X-Profile-Dump', response)
+
+        self.assertEqual(os.listdir(self.dump_dir), [])
+        self.assertEqual(list(middleware.records), [])
+
+
+    def test_profiling_page_is_staff_only(self):
+        self.profiling(PROFILING_SAMPLE_RATE=1)
+
+        self.client.force_login(self.mentor)
+        with self.assertLogs('core.profiling', 'INFO'):
+            response = self.client.get(reverse('admin_profiling'))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        with self.assertLogs('core.profiling', 'INFO'):
+            response = self.client.get(reverse('admin_profiling'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['view'] for row in response.context['summary']], ['admin_profiling'])
+
+
+    def test_dump_view_only_serves_dumps(self):
+        self.profiling()
+        with open(os.path.join(self.dump_dir, 'notes.txt'), 'w') as file:
+            file.write('not a dump')
+        self.client.force_login(self.staff)
+
+        for name in ['notes.txt', 'missing.prof', '..', '.prof']:
+            with self.subTest(name=name):
+                response = self.client.get(reverse('admin_profiling_dump', args=[name]))
+                self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.mentor)
+        open(os.path.join(self.dump_dir, 'run.prof'), 'wb').close()
+        response = self.client.get(reverse('admin_profiling_dump', args=['run.prof']))
+        self.assertEqual(response.status_code, 302)
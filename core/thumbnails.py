@@ -0,0 +1,159 @@
+"""
+Square thumbnails of profile pictures.
+
+Each picture is rendered once per size in SIZES and kept under
+MEDIA_ROOT/renditions, named after the source's content digest (the blob
+name from core.storage). A re-uploaded or shared picture reuses its
+renditions, and a rendition never goes stale because a changed picture has a
+new digest. Renditions are made right after a picture is saved (signals in
+``accounts.signals``) or, failing that, on first use by the ``thumbnail``
+template filter.
+
+A picture that cannot be decoded is tried once: a ``failed`` marker in its
+renditions directory sends later renders straight to the original, without
+decoding and logging it again. Delete the marker to try again.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import ImageField
+from django.utils.functional import LazyObject
+from PIL import Image, ImageOps, features
+
+from .storage import file_fields, is_blob
+
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = (64, 128, 256)
+
+# WebP is a fraction of the size of JPEG at the same quality, when Pillow supports it
+if features.check('webp'):
+    FORMAT, EXTENSION, SAVE_OPTIONS = 'WEBP', 'webp', {'quality': 80, 'method': 4}
+else:
+    FORMAT, EXTENSION, SAVE_OPTIONS = 'JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}
+
+
+
+class RenditionStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = FileSystemStorage(
+            location=os.path.join(settings.MEDIA_ROOT, 'renditions'),
+            base_url=f'{settings.MEDIA_URL}renditions/',
+        )
+
+
+renditions = RenditionStorage()
+
+
+
+def source_key(name):
+    """The content digest of a blob, or a hash of the name for older files."""
+    if is_blob(name):
+        return os.path.splitext(os.path.basename(name))[0]
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def rendition_name(name, size):
+    key = source_key(name)
+    return f'{key[:2]}/{key}/{size}.{EXTENSION}'
+
+
+def failure_marker(name):
+    key = source_key(name)
+    return f'{key[:2]}/{key}/failed'
+
+
+def nearest_size(size):
+    return next((candidate for candidate in SIZES if candidate >= size), SIZES[-1])
+
+
+
+def render(field_file, sizes=SIZES):
+    """Write the missing renditions of ``field_file``, decoding the source once."""
+    missing = [size for size in sizes if not renditions.exists(rendition_name(field_file.name, size))]
+    if not missing:
+        return
+
+    with field_file.storage.open(field_file.name, 'rb') as source:
+        image = Image.open(source)
+        # JPEG can decode straight at a fraction of its size, far faster than in full
+        image.draft('RGB', (max(missing) * 2, max(missing) * 2))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if FORMAT == 'WEBP' and image.has_transparency_data else 'RGB')
+
+    # Largest first, each one scaled down from the previous
+    for size in sorted(missing, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+
+        # Written aside and renamed, so a concurrent request never sees half a file
+        path = renditions.path(rendition_name(field_file.name, size))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        image.save(temporary, FORMAT, **SAVE_OPTIONS)
+        os.replace(temporary, path)
+
+
+
+def prepare(field_file):
+    """Render the thumbnails of ``field_file``; False when it is not a readable image."""
+    marker = failure_marker(field_file.name)
+    if renditions.exists(marker):
+        return False
+
+    try:
+        render(field_file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning(f'Could not make thumbnails of {field_file.name}', exc_info=True)
+        try:
+            path = renditions.path(marker)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+        except OSError:
+            pass
+        return False
+    return True
+
+
+
+def thumbnail_url(field_file, size=128):
+    """URL of the rendition nearest ``size``, made on demand; the original if it cannot be made."""
+    if not field_file:
+        return ''
+
+    name = rendition_name(field_file.name, nearest_size(size))
+    if not renditions.exists(name) and not prepare(field_file):
+        return field_file.url
+
+    return renditions.url(name)
+
+
+
+def collect_garbage():
+    """Delete the renditions of pictures nobody uses any more. Returns how many sources."""
+    used = set()
+    for model, field in file_fields():
+        if isinstance(field, ImageField):
+            used.update(
+                source_key(name)
+                for name in model._default_manager.exclude(**{field.name: ''})
+                .exclude(**{f'{field.name}__isnull': True})
+                .values_list(field.name, flat=True)
+                .iterator()
+            )
+
+    deleted = 0
+    root = renditions.path('')
+    for prefix in os.listdir(root) if os.path.isdir(root) else ():
+        for key in os.listdir(os.path.join(root, prefix)):
+            if key not in used:
+                shutil.rmtree(os.path.join(root, prefix, key), ignore_errors=True)
+                deleted += 1
+
+    return deleted
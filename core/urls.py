@@ -22,6 +22,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
+    path('admin/profiling/', views.profiling, name='admin_profiling'),
+    path('admin/profiling/<str:name>', views.profiling_dump, name='admin_profiling_dump'),
     path('admin/', admin.site.urls),
     path('schema-viewer/', include('schema_viewer.urls')),
     path('', views.home, name='home'),
@@ -1,6 +1,73 @@
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
 from django.shortcuts import render
 
+from core.middleware import records
+
 
 
 def home(request):
-    return render(request, 'home.html')
\ No newline at end of file
+    return render(request, 'home.html')
+
+
+
+def average(values):
+    return round(sum(values) / len(values), 1) if values else None
+
+
+
+def profile_dumps():
+    directory = settings.PROFILING_DUMP_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted((name for name in os.listdir(directory) if name.endswith('.prof')), reverse=True)
+
+
+
+@staff_member_required
+def profiling(request):
+    # Records live in each worker process; this shows the one serving the page
+    recent = list(reversed(records))
+
+    by_view = defaultdict(list)
+    for record in recent:
+        by_view[record['view'] or record['path']].append(record)
+
+    summary = []
+    for view, rows in by_view.items():
+        wall = sorted(row['wall_ms'] for row in rows)
+        summary.append({
+            'view': view,
+            'requests': len(rows),
+            'average_ms': round(sum(wall) / len(wall), 1),
+            'max_ms': wall[-1],
+            'queries': round(sum(row['queries'] for row in rows) / len(rows), 1),
+            'query_ms': round(sum(row['query_ms'] for row in rows) / len(rows), 1),
+            'template_ms': average([row['template_ms'] for row in rows if row['template_ms'] is not None]),
+        })
+    summary.sort(key=lambda row: row['average_ms'] * row['requests'], reverse=True)
+
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiling',
+        'enabled': settings.PROFILING_ENABLED,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'pid': os.getpid(),
+        'summary': summary,
+        'records': recent,
+        'dumps': profile_dumps()[:50],
+    }
+    return render(request, 'admin/profiling.html', context)
+
+
+
+@staff_member_required
+def profiling_dump(request, name):
+    if name not in profile_dumps():
+        raise Http404('No such profile.')
+    return FileResponse(open(os.path.join(settings.PROFILING_DUMP_DIR, name), 'rb'), as_attachment=True)
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for production (``gunicorn core.wsgi``), read from the
+environment or .env like core/settings.py.
+
+Each worker is a process running ``GUNICORN_THREADS`` threads; the views are
+synchronous and mostly wait on the database, so a few threads per worker
+serve more requests than extra processes for less memory. nginx sits in
+front (nginx/default.conf): it buffers slow clients and serves static files,
+media and recordings, so workers only run Django.
+
+Send SIGHUP to the master for a graceful reload: new workers start on the new
+code and old ones finish their requests first.
+"""
+
+import multiprocessing
+import os
+
+import decouple
+
+
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = decouple.config('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=4, cast=int)
+
+# A worker busy longer than this is killed and replaced
+timeout = decouple.config('GUNICORN_TIMEOUT', default=60, cast=int)
+# On reload or shutdown, time given to in-flight requests
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = 5
+
+# Recycle workers now and then so slow memory growth cannot pile up
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files in memory: a slow container filesystem can stall workers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Only nginx can reach the container, so trust its X-Forwarded-* headers
+forwarded_allow_ips = decouple.config('GUNICORN_FORWARDED_ALLOW_IPS', default='*')
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,82 @@
+"""
+Read model for the mentee dashboard, the most visited page of the site.
+
+Everything the page shows is loaded up front in a fixed number of queries:
+the profile with its user, mentor and task counters (kept by
+mentor.services), then one query each for languages, tasks, recordings and
+the mentor's slots. Nothing in the template triggers a lazy lookup.
+"""
+
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from accounts.models import CustomUser, MenteeProfile
+from mentor.models import MeetingRecording, MentorAvailability, Task
+
+
+
+def mentee_dashboard(user):
+    """
+    Return the dashboard context for ``user``, or None when the user has no
+    mentee profile. ``mentor_profile`` is None when the mentee has no mentor,
+    and ``mentor_missing`` is set when the mentor has no profile yet.
+    """
+    mentee_profile = (
+        MenteeProfile.objects
+        .select_related('user__mentor__mentor_profile')
+        .prefetch_related(
+            'languages',
+            Prefetch('task_set', queryset=Task.objects.order_by('due_date'), to_attr='dashboard_tasks'),
+            Prefetch(
+                'meetingrecording_set',
+                queryset=MeetingRecording.objects.order_by('-uploaded_at'),
+                to_attr='dashboard_recordings',
+            ),
+        )
+        .defer('cv_text')
+        .filter(user=user)
+        .first()
+    )
+
+    if mentee_profile is None:
+        return None
+
+    mentor = mentee_profile.user.mentor
+    mentor_profile = None
+    mentor_missing = False
+
+    if mentor is not None:
+        try:
+            mentor_profile = mentor.mentor_profile
+        except CustomUser.mentor_profile.RelatedObjectDoesNotExist:
+            mentor_missing = True
+
+    available_slots = []
+    reserved_slots = []
+
+    if mentor_profile is not None:
+        # Free slots of the mentor and the ones this mentee booked, in one query
+        slots = MentorAvailability.objects.filter(
+            Q(is_booked=False) | Q(is_booked=True, mentee=mentee_profile),
+            mentor=mentor_profile,
+            start_time__gte=timezone.now(),
+        ).order_by('start_time')
+
+        for slot in slots:
+            if slot.is_booked:
+                reserved_slots.append(slot)
+            else:
+                available_slots.append(slot)
+
+    return {
+        'mentee_profile': mentee_profile,
+        'mentor_profile': mentor_profile,
+        'mentor_missing': mentor_missing,
+        'tasks': mentee_profile.dashboard_tasks,
+        'completed_tasks_count': mentee_profile.done_task_count,
+        'pending_tasks_count': mentee_profile.pending_task_count,
+        'available_slots': available_slots,
+        'reserved_slots': reserved_slots,
+        'recordings': mentee_profile.dashboard_recordings,
+        'formatted_languages': mentee_profile.formatted_languages,
+    }
@@ -1,3 +1,114 @@
+from datetime import timedelta
+
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser, MentorProfile, MenteeProfile
+from mentor import services
+from mentor.models import MeetingRecording, MentorAvailability
+
+
+
+class DashboardMenteeQueryCountTests(TestCase):
+    # User, profile with task counts, languages, tasks, recordings, slots (the session comes from the cache)
+    QUERY_BUDGET = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=mentor)
+
+        cls.mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=mentor)
+        cls.mentee_profile = MenteeProfile.objects.create(user=cls.mentee, location='Helsinki')
+        cls.mentee_profile.languages.set(['en', 'fi'])
+
+
+    def setUp(self):
+        caches['shared'].clear()
+
+
+    def add_dashboard_data(self, count):
+        start = timezone.now() + timedelta(days=1)
+
+        for i in range(count):
+            task = services.create_task(self.mentor_profile, self.mentee_profile, f'Task {i}', 'Description')
+            if i % 2 == 0:
+                services.set_task_done(task, True)
+            MeetingRecording.objects.create(
+                mentor=self.mentor_profile, mentee=self.mentee_profile,
+                title=f'Recording {i}', video=f'video/recording{i}.mp4',
+            )
+            MentorAvailability.objects.create(
+                mentor=self.mentor_profile,
+                mentee=self.mentee_profile if i % 2 else None,
+                is_booked=bool(i % 2),
+                start_time=start + timedelta(hours=2 * i),
+                end_time=start + timedelta(hours=2 * i + 1),
+            )
+
+
+    def get_dashboard(self):
+        self.client.force_login(self.mentee)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard_mentee'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+    def test_query_budget_without_data(self):
+        response = self.get_dashboard()
+        self.assertEqual(response.context['pending_tasks_count'], 0)
+
+
+    def test_query_budget_does_not_grow_with_data(self):
+        self.add_dashboard_data(10)
+        response = self.get_dashboard()
+
+        self.assertEqual(response.context['completed_tasks_count'], 5)
+        self.assertEqual(response.context['pending_tasks_count'], 5)
+        self.assertEqual(len(response.context['tasks']), 10)
+        self.assertEqual(len(response.context['recordings']), 10)
+        self.assertEqual(len(response.context['available_slots']), 5)
+        self.assertEqual(len(response.context['reserved_slots']), 5)
+        self.assertEqual(response.context['formatted_languages'], 'English, Finnish')
+
+
+
+class MenteeProfileFragmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+
+        mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=cls.mentor)
+        cls.mentee_profile = MenteeProfile.objects.create(user=mentee)
+        cls.task = services.create_task(cls.mentor_profile, cls.mentee_profile, 'Write a CV', 'Description')
+
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client.force_login(self.mentor)
+
+
+    def get_profile(self):
+        response = self.client.get(reverse('mentee_profile', args=[self.mentee_profile.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+    def test_cached_page_changes_with_the_tasks(self):
+        self.assertContains(self.get_profile(), 'In Progress')
+
+        # User and mentee only: the body comes from the cache
+        with self.assertNumQueries(2):
+            self.get_profile()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.set_task_done(self.task, True)
 
-# Create your tests here.
+        response = self.get_profile()
+        self.assertContains(response, 'Completed')
+        self.assertNotContains(response, 'In Progress')
@@ -6,5 +6,6 @@ urlpatterns = [
     path('complete_task/<int:task_id>', views.complete_task, name='complete_task'),
     path('book_slot/<int:slot_id>/', views.book_slot, name='book_slot'),
     path('mentee_profile/<int:mentee_id>/', views.mentee_profile, name='mentee_profile'),
+    path('mentee_profile/<int:mentee_id>/<str:document>/', views.mentee_document, name='mentee_document'),
     
 ]
\ No newline at end of file
@@ -1,9 +1,18 @@
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from accounts.models import MenteeProfile, CustomUser, MentorProfile
+from accounts.models import MenteeProfile
 from mentor.models import Task, MentorAvailability, MeetingRecording
+from mentor import services
+from accounts import identity
+from core import fragments
+from core.replicas import read_from_replica
+from core.streaming import serve_file
+from .dashboard import mentee_dashboard
 from django.utils import timezone
 
 
@@ -11,75 +20,21 @@ from django.utils import timezone
 
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
+@read_from_replica()
 def dashboard_mentee(request):
     if request.user.is_mentor:
         messages.error(request, 'Access denied. Only Mentees can have access this page.')
         return redirect('login') 
 
-    # Get mentee
-    mentee_profile = get_object_or_404(MenteeProfile.objects.select_related('user'), user=request.user)
-    if not mentee_profile:
-        messages.error(request, 'Mentee not found.')
-        return redirect('login')
-
-
-    # Tasks
-    tasks = Task.objects.filter(mentee = mentee_profile).order_by('due_date')
-    completed_tasks_count = tasks.filter(is_done=True).count()
-    pending_tasks_count = tasks.filter(is_done=False).count()
-
-
-
-    # Availability Times
-    available_slots = []
-    if request.user.mentor:
-        try:
-            mentor_profile = request.user.mentor.mentor_profile
-            available_slots = MentorAvailability.objects.filter(
-                mentor=mentor_profile,
-                is_booked=False,
-                start_time__gte=timezone.now()
-            ).order_by('start_time')
-        except CustomUser.mentor_profile.RelatedObjectDoesNotExist:
-            messages.warning(request, 'Mentor profile not found. Contact your Mentor.')
-
-
-    # Reserved Slots
-    reserved_slots = []
-    if mentor_profile:
-        reserved_slots = MentorAvailability.objects.filter(
-            mentee=mentee_profile,
-            mentor=mentor_profile,
-            is_booked=True,
-            start_time__gte=timezone.now()
-        ).order_by('start_time')
-
+    # All dashboard data comes from the read model in a fixed number of queries
+    context = mentee_dashboard(request.user)
+    if context is None:
+        raise Http404('Mentee not found.')
 
+    if context.pop('mentor_missing'):
+        messages.warning(request, 'Mentor profile not found. Contact your Mentor.')
 
-    # Meeting recordings
-    recordings = MeetingRecording.objects.filter(mentee=mentee_profile).order_by('-uploaded_at')
-
-    # Format languages for display with full names
-    language_codes = mentee_profile.language.split(',') if mentee_profile.language else []
-    language_map = dict(MenteeProfile.LANGUAGE_CHOICES)
-    full_language_names = [language_map.get(code, code.upper()) for code in language_codes if code]
-    formatted_languages = ', '.join(full_language_names) if full_language_names else "Not specified"
-
-    
-
-
-    context = {
-        'tasks': tasks,
-        'completed_tasks_count': completed_tasks_count,
-        'pending_tasks_count': pending_tasks_count,
-        'available_slots': available_slots,
-        'recordings': recordings,
-        'is_mentor': False,
-        'reserved_slots': reserved_slots,
-        'mentor_profile': mentor_profile,
-        'mentee_profile': mentee_profile,
-        'formatted_languages': formatted_languages,
-    }
+    context['is_mentor'] = False
     
     
 
@@ -96,16 +51,13 @@ def complete_task(request, task_id):
         messages.error(request, 'Access denied. Only Mentee can have access this page.')
         return redirect('login')
     
-    try:
-        mentee_profile = request.user.mentee_profile
-
-    except CustomUser.mentee_profile.RelatedObjectDoesNotExist:
+    mentee_profile = identity.own_mentee_profile(request.user)
+    if mentee_profile is None:
         messages.error(request, 'Mentee profile not found. Please complete your profile.')
         return redirect('login')
 
     task = get_object_or_404(Task, id=task_id, mentee=mentee_profile, is_done=False)
-    task.is_done = True
-    task.save()
+    services.set_task_done(task, True)
 
     messages.success(request, 'Task marked as completed successfully!')
     return redirect('dashboard_mentee')
@@ -119,34 +71,26 @@ def book_slot(request, slot_id):
         messages.error(request, 'Access denied. Only Mentee can have access this page.')
         return redirect('login')
     
-    try:
-        mentee_profile = request.user.mentee_profile
-
-    except CustomUser.mentee_profile.RelatedObjectDoesNotExist:
+    mentee_profile = identity.own_mentee_profile(request.user)
+    if mentee_profile is None:
         messages.error(request, 'Mentee profile not found. Please complete your profile.')
         return redirect('login')
     
 
-    try:
-        mentor_profile = request.user.mentor.mentor_profile
-
-    except CustomUser.mentor_profile.RelatedObjectDoesNotExist:
+    mentor_profile = identity.assigned_mentor_profile(request.user)
+    if mentor_profile is None:
         messages.error(request, 'Mentor profile not found. Contact your Mentor.')
         return redirect('dashboard_mentee')
     
 
-    slot = get_object_or_404(
-        MentorAvailability, 
-        id=slot_id, 
-        mentor = mentor_profile, 
-        is_booked = False, 
-        start_time__gte=timezone.now()
-    )
+    result = services.book_slot(slot_id, mentee_profile, mentor_profile)
 
-    
-    slot.is_booked = True
-    slot.mentee = mentee_profile
-    slot.save()
+    if result == services.NOT_FOUND:
+        raise Http404('Time slot not found.')
+
+    if result == services.ALREADY_TAKEN:
+        messages.error(request, 'Sorry, this time slot has already been booked. Please choose another one.')
+        return redirect('dashboard_mentee')
 
     messages.success(request, 'Time slot booked successfully!')
     return redirect('dashboard_mentee')
@@ -157,21 +101,34 @@ def book_slot(request, slot_id):
 
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
+@read_from_replica()
 def mentee_profile(request, mentee_id):
 
     # Get mentee
-    mentee_profile = get_object_or_404(MenteeProfile, id=mentee_id)
+    mentee_profile = get_object_or_404(MenteeProfile.objects.select_related('user'), id=mentee_id)
     if not mentee_profile:
         messages.error(request, 'Mentee not found.')
         return redirect('login')
     
 
-    if mentee_profile.user.mentor != request.user:
+    if mentee_profile.user.mentor_id != request.user.pk:
         messages.error(request, 'Access denied. You can only view profiles of your assigned Mentee.')
         return redirect('dashboard_mentor')
 
     
 
+    # Get Mentor
+    mentor = identity.own_mentor_profile(request.user)
+    if mentor is None:
+        messages.error(request, "Your Mentor profile could not be found. Please contact support.")
+        return redirect('dashboard_mentor')
+
+
+    # Stamp first: the page body is cached under it, and the querysets below
+    # only run when it is rendered
+    stamp = fragments.stamp(MenteeProfile, mentee_profile.pk)
+
+
     # Tasks
     tasks = Task.objects.filter(mentee = mentee_profile).order_by('is_done', 'due_date', '-created_at')
 
@@ -180,14 +137,6 @@ def mentee_profile(request, mentee_id):
     recordings = MeetingRecording.objects.filter(mentee=mentee_profile).order_by('-uploaded_at')
 
 
-    # Get Mentor
-    try:
-        mentor = request.user.mentor_profile
-    except MentorProfile.DoesNotExist:
-        messages.error(request, "Your Mentor profile could not be found. Please contact support.")
-        return redirect('dashboard_mentor')
-
-
     # Reserved Slots
     reserved_slots = MentorAvailability.objects.filter(
         mentee=mentee_profile,
@@ -197,13 +146,6 @@ def mentee_profile(request, mentee_id):
         ).order_by('start_time')
 
     
-    # Format languages for display with full names
-    language_codes = mentee_profile.language.split(',') if mentee_profile.language else []
-    language_map = dict(MenteeProfile.LANGUAGE_CHOICES)
-    full_language_names = [language_map.get(code, code.upper()) for code in language_codes if code]
-    formatted_languages = ', '.join(full_language_names) if full_language_names else "Not specified"
-
-    
 
     context = {
         'tasks': tasks,
@@ -212,9 +154,36 @@ def mentee_profile(request, mentee_id):
         'reserved_slots': reserved_slots,
         'mentee_profile': mentee_profile,
         'mentor': mentor,
-        'formatted_languages': formatted_languages,
+        'stamp': stamp,
+        'fragment_timeout': fragments.TIMEOUT,
 
     }
     
 
-    return render(request, 'mentee_profile.html', context)
\ No newline at end of file
+    return render(request, 'mentee_profile.html', context)
+
+
+
+
+
+# Files of a mentee profile, by the name used in their URL
+MENTEE_DOCUMENTS = {'cv': 'cv_file', 'cv-analysis': 'cv_analysis_feedback'}
+
+
+
+@login_required(redirect_field_name='login')
+@require_http_methods(['GET', 'HEAD'])
+def mentee_document(request, mentee_id, document):
+    # Only the mentee and their mentor, like mentee_profile
+    if document not in MENTEE_DOCUMENTS:
+        raise Http404('Document not found.')
+
+    mentee_profile = get_object_or_404(MenteeProfile.objects.select_related('user'), id=mentee_id)
+    if request.user.pk not in (mentee_profile.user_id, mentee_profile.user.mentor_id):
+        raise Http404('Document not found.')
+
+    field_file = getattr(mentee_profile, MENTEE_DOCUMENTS[document])
+    if not field_file:
+        raise Http404('Document not found.')
+
+    return serve_file(request, field_file, filename=document + os.path.splitext(field_file.name)[1])
@@ -0,0 +1,87 @@
+import time as timer
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.utils import timezone
+
+from accounts.models import MentorProfile
+from mentor import services
+
+
+
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+
+def parse_weekday(value):
+    value = value.strip().lower()
+
+    if value.isdigit() and int(value) < 7:
+        return int(value)
+    if value[:3] in WEEKDAY_NAMES:
+        return WEEKDAY_NAMES.index(value[:3])
+
+    raise CommandError(f'Invalid weekday: {value}')
+
+
+
+class Command(BaseCommand):
+    help = 'Expand a weekly availability rule into slots for one or more mentors.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentor-email', action='append', default=[], help='Mentor to back-fill (repeatable).')
+        parser.add_argument('--all-mentors', action='store_true', help='Back-fill every mentor.')
+        parser.add_argument('--weekdays', nargs='+', required=True, help='Weekdays as names (tue) or numbers (Monday is 0).')
+        parser.add_argument('--start', required=True, help='Daily window start, e.g. 10:00.')
+        parser.add_argument('--end', required=True, help='Daily window end, e.g. 12:00.')
+        parser.add_argument('--slot-minutes', type=int, default=30)
+        parser.add_argument('--weeks', type=int, default=12)
+        parser.add_argument('--from', dest='first_day', help='First day (YYYY-MM-DD), defaults to today.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+
+    def handle(self, *args, **options):
+        try:
+            weekdays = {parse_weekday(day) for day in options['weekdays']}
+            start = time.fromisoformat(options['start'])
+            end = time.fromisoformat(options['end'])
+            first_day = date.fromisoformat(options['first_day']) if options['first_day'] else timezone.now().date()
+        except ValueError as e:
+            raise CommandError(f'Invalid date or time: {e}')
+
+        if end <= start:
+            raise CommandError('End time must be after start time.')
+
+        if options['all_mentors']:
+            mentors = MentorProfile.objects.select_related('user')
+        elif options['mentor_email']:
+            mentors = MentorProfile.objects.select_related('user').filter(user__email__in=options['mentor_email'])
+        else:
+            raise CommandError('Pass --mentor-email or --all-mentors.')
+
+        # Like the recurring availability view, only slots still to come are added
+        slots = [
+            (slot_start, slot_end)
+            for slot_start, slot_end in services.expand_recurring_slots(first_day, weekdays, start, end, options['slot_minutes'], options['weeks'])
+            if slot_start >= timezone.now()
+        ]
+
+        total_created = 0
+        began = timer.perf_counter()
+
+        for mentor_profile in mentors.iterator():
+            try:
+                created, skipped = services.create_recurring_availability(
+                    mentor_profile, slots, batch_size=options['batch_size']
+                )
+            except IntegrityError:
+                self.stderr.write(f'{mentor_profile.user.email}: availability changed while back-filling, skipped.')
+                continue
+
+            total_created += created
+            self.stdout.write(f'{mentor_profile.user.email}: {created} created, {skipped} skipped')
+
+        elapsed = timer.perf_counter() - began
+        self.stdout.write(self.style.SUCCESS(f'{total_created} slots created in {elapsed:.2f}s'))
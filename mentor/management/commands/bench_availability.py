@@ -0,0 +1,75 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarking import benchmark_database, create_mentor
+from mentor import services
+from mentor.models import MentorAvailability
+
+
+
+def range_scan_overlap(mentor_profile, start, end):
+    """The previous start_time__lt / end_time__gt check, kept for comparison."""
+    return MentorAvailability.objects.filter(
+        mentor=mentor_profile,
+        start_time__lt=end,
+        end_time__gt=start
+    ).exists()
+
+
+
+class Command(BaseCommand):
+    help = 'Measure availability overlap checks as a mentor\'s slot history grows.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Slot history sizes to measure.')
+        parser.add_argument('--probes', type=int, default=200, help='Overlap checks per history size.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            mentor_profile = create_mentor('overlap')
+
+            # History is laid out backwards from yesterday in 30 minute slots.
+            anchor = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+            created = 0
+
+            self.stdout.write(f'Database: {connection.vendor}, {options["probes"]} probes per size')
+            self.stdout.write(f'{"slots":>10} {"indexed probe":>16} {"range scan":>16}')
+
+            for size in sorted(options['sizes']):
+                MentorAvailability.objects.bulk_create(
+                    [
+                        MentorAvailability(
+                            mentor=mentor_profile,
+                            start_time=anchor - timedelta(minutes=30 * (i + 1)),
+                            end_time=anchor - timedelta(minutes=30 * i),
+                        )
+                        for i in range(created, size)
+                    ],
+                    batch_size=1000,
+                )
+                created = max(created, size)
+
+                probe = self.measure(services.has_overlap, mentor_profile, anchor, options['probes'])
+                scan = self.measure(range_scan_overlap, mentor_profile, anchor, options['probes'])
+
+                self.stdout.write(f'{created:>10,} {probe * 1e6:>13,.0f} us {scan * 1e6:>13,.0f} us')
+
+
+    def measure(self, check, mentor_profile, anchor, probes):
+        timings = []
+
+        for i in range(probes):
+            start = anchor + timedelta(hours=i + 1)
+            begin = time.perf_counter()
+            check(mentor_profile, start, start + timedelta(minutes=30))
+            timings.append(time.perf_counter() - begin)
+
+        return statistics.median(timings)
@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarking import benchmark_database, create_mentor, create_mentees
+from mentor import services
+from mentor.models import MentorAvailability
+
+
+
+def naive_book_slot(slot_id, mentee_profile, mentor_profile):
+    """The previous read-modify-write booking, kept for comparison."""
+    slot = MentorAvailability.objects.filter(
+        id=slot_id,
+        mentor=mentor_profile,
+        is_booked=False,
+        start_time__gte=timezone.now()
+    ).first()
+
+    if slot is None:
+        return services.ALREADY_TAKEN
+
+    slot.is_booked = True
+    slot.mentee = mentee_profile
+    slot.save()
+    return services.BOOKED
+
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent bookings at a single slot and report throughput and double bookings.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=200, help='Parallel booking attempts per round.')
+        parser.add_argument('--rounds', type=int, default=5, help='Number of slots to race for.')
+        parser.add_argument('--naive', action='store_true', help='Also run the old read-modify-write booking.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            mentor_profile = create_mentor('booking')
+            mentees = create_mentees(mentor_profile, options['bookings'], 'booking')
+
+            strategies = [('conditional update', services.book_slot)]
+            if options['naive']:
+                strategies.append(('read-modify-write', naive_book_slot))
+
+            self.stdout.write(f'Database: {connection.vendor}, {options["bookings"]} bookings x {options["rounds"]} rounds')
+
+            for label, book in strategies:
+                total_attempts = 0
+                total_seconds = 0.0
+                double_bookings = 0
+                errors = 0
+
+                for _ in range(options['rounds']):
+                    slot = MentorAvailability.objects.create(
+                        mentor=mentor_profile,
+                        start_time=timezone.now() + timedelta(days=1),
+                        end_time=timezone.now() + timedelta(days=1, hours=1),
+                    )
+                    winners, failed, seconds = self.race(book, slot.id, mentor_profile, mentees)
+
+                    total_attempts += len(mentees)
+                    total_seconds += seconds
+                    double_bookings += max(0, winners - 1)
+                    errors += failed
+
+                    slot.delete()
+
+                self.stdout.write(
+                    f'{label:>20}: {total_attempts / total_seconds:,.0f} bookings/s, '
+                    f'double bookings: {double_bookings}, errors: {errors}'
+                )
+
+
+    def race(self, book, slot_id, mentor_profile, mentees):
+        barrier = threading.Barrier(len(mentees))
+        results = []
+        lock = threading.Lock()
+
+        def attempt(mentee_profile):
+            barrier.wait()
+            try:
+                result = book(slot_id, mentee_profile, mentor_profile)
+            except Exception:
+                result = None
+            finally:
+                connection.close()
+
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=attempt, args=(mentee,)) for mentee in mentees]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        winners = results.count(services.BOOKED)
+        failed = results.count(None)
+        return winners, failed, seconds
@@ -0,0 +1,86 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from accounts import search
+from accounts.models import MenteeProfile
+from core.benchmarking import benchmark_database, create_mentees, create_mentor
+from core.pagination import encode_cursor, keyset_page
+from mentor import services
+
+
+
+def dashboard_queryset(mentor_user):
+    return MenteeProfile.objects.filter(user__mentor=mentor_user).select_related('user').annotate(
+        has_pending_tasks=models.ExpressionWrapper(models.Q(pending_task_count__gt=0), output_field=models.BooleanField())
+    )
+
+
+
+class Command(BaseCommand):
+    help = 'Measure dashboard_mentor pages (keyset vs OFFSET vs the whole list) as a cohort grows.'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1_000, 10_000, 100_000])
+        parser.add_argument('--per-page', type=int, default=25)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        limit = 1000
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(
+                f"{'mentees':>8} {'first page':>11} {'last page':>11} {'OFFSET last':>12} {'whole list':>11}"
+            )
+
+            for size in options['sizes']:
+                mentor_profile = create_mentor(f'pages{size}')
+                create_mentees(mentor_profile, size, f'pages{size}')
+                search.rebuild_index()
+
+                queryset = dashboard_queryset(mentor_profile.user)
+
+                def page(after=None):
+                    annotated = services.annotate_mentee_facets(queryset, queryset, limit)
+                    items, next_cursor, _ = keyset_page(
+                        annotated, after=after, per_page=per_page, fields=('user__created_at', 'user_id')
+                    )
+                    services.mentee_facets(queryset, limit, items)
+                    return next_cursor
+
+                # Walk to the last page once to get a deep cursor
+                cursor = deepest = page()
+                while cursor:
+                    deepest = cursor
+                    cursor = page(cursor) if size <= 10_000 else None
+
+                if size > 10_000:
+                    last = queryset.order_by('-user__created_at', '-user_id')[size - per_page - 1]
+                    deepest = encode_cursor(last.user.created_at, last.user_id)
+
+                first = self.measure(lambda: page(), options['repeat'])
+                last = self.measure(lambda: page(deepest), options['repeat'])
+                offset = self.measure(
+                    lambda: (list(queryset.order_by('-user__created_at', '-user_id')[size - per_page:size]), queryset.count()),
+                    options['repeat'],
+                )
+                whole = self.measure(lambda: (list(queryset), queryset.count()), max(1, options['repeat'] // 10))
+
+                self.stdout.write(
+                    f'{size:>8,} {first * 1000:>9.2f}ms {last * 1000:>9.2f}ms {offset * 1000:>10.2f}ms {whole * 1000:>9.1f}ms'
+                )
+
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - begin)
+        return statistics.median(timings)
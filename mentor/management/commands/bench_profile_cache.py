@@ -0,0 +1,196 @@
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser, MenteeProfile
+from core import fragments, seeding
+from core.benchmarking import benchmark_database, summarize
+from core.middleware import QueryTimer
+from mentor import services
+from mentor.models import Task
+
+
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+FILE = 'django.core.cache.backends.filebased.FileBasedCache'
+REDIS = 'django.core.cache.backends.redis.RedisCache'
+
+
+
+def cache_settings(backend, location):
+    return {
+        'default': {'BACKEND': LOCMEM},
+        # As in settings: the default 300 entries would cull sessions and stamps
+        'shared': {'BACKEND': backend, 'LOCATION': location, 'OPTIONS': {'MAX_ENTRIES': 20_000} if backend != REDIS else {}},
+    }
+
+
+
+class FragmentCounter:
+    """Counts the {% cache %} lookups of the shared cache that found a fragment."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.get = cache.get
+        self.lookups = self.hits = 0
+
+
+    def __enter__(self):
+        def get(key, *args, **kwargs):
+            value = self.get(key, *args, **kwargs)
+            if key.startswith('template.cache.'):
+                self.lookups += 1
+                self.hits += value is not None
+            return value
+
+        # Caches are per thread and the benchmark runs in one
+        self.cache.get = get
+        return self
+
+
+    def __exit__(self, *exc_info):
+        del self.cache.get
+        return False
+
+
+
+class Command(BaseCommand):
+    help = (
+        'View cached profile pages (mentors reading mentee profiles, mentees their mentor\'s) mixed with '
+        'task updates, without fragment caching and with each cache backend, and compare latency, queries '
+        'and hit rate.'
+    )
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2_000, help='Page views per scenario.')
+        parser.add_argument('--profiles', type=int, default=200, help='Distinct mentees whose pages are viewed.')
+        parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of views preceded by a task update.')
+        parser.add_argument('--mentors', type=int, default=50)
+        parser.add_argument('--mentees', type=int, default=2_000)
+        parser.add_argument('--slots', type=int, default=50_000)
+        parser.add_argument('--tasks', type=int, default=50_000)
+        parser.add_argument('--recordings', type=int, default=10_000)
+        parser.add_argument('--redis', help='Also run with RedisCache at this URL, e.g. redis://localhost:6379/9.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='matkamestre-fragments-')
+        scenarios = [
+            ('uncached', LOCMEM, 'bench-uncached', 0),
+            ('locmem', LOCMEM, 'bench-locmem', fragments.TIMEOUT),
+            ('file', FILE, directory, fragments.TIMEOUT),
+        ]
+        if options['redis']:
+            scenarios.append(('redis', REDIS, options['redis'], fragments.TIMEOUT))
+
+        summary = []
+        original_timeout = fragments.TIMEOUT
+
+        try:
+            with benchmark_database(keepdb=options['keepdb']):
+                seeding.seed_database(
+                    mentors=options['mentors'], mentees=options['mentees'], slots=options['slots'],
+                    tasks=options['tasks'], recordings=options['recordings'], seed=options['seed'],
+                )
+                profiles = self.pick_profiles(options)
+
+                for name, backend, location, timeout in scenarios:
+                    # A timeout of 0 stores nothing: every view renders the whole page
+                    fragments.TIMEOUT = timeout
+                    with override_settings(CACHES=cache_settings(backend, location)):
+                        steps, hit_rate, wall = self.run(profiles, options)
+
+                    views = sum(row['runs'] for step, row in steps.items() if step.endswith('_profile'))
+                    summary.append((name, views / wall, hit_rate))
+                    self.print_scenario(name, steps, hit_rate)
+
+        finally:
+            fragments.TIMEOUT = original_timeout
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.stdout.write(f"\n{'cache':<10} {'views/s':>8} {'hit rate':>9}")
+        for name, throughput, hit_rate in summary:
+            self.stdout.write(f'{name:<10} {throughput:>8.1f} {hit_rate:>8.1%}')
+
+
+    def pick_profiles(self, options):
+        """[(mentee profile id, mentee user id, mentor user id, a task id)] of the viewed mentees."""
+        rows = list(
+            MenteeProfile.objects.filter(user__mentor__isnull=False)
+            .values_list('pk', 'user_id', 'user__mentor_id')
+            .order_by('pk')
+        )
+        rows = random.Random(options['seed']).sample(rows, min(options['profiles'], len(rows)))
+
+        tasks = dict(
+            Task.objects.filter(mentee_id__in=[row[0] for row in rows])
+            .order_by('mentee_id', 'pk').distinct()
+            .values_list('mentee_id', 'pk')
+        )
+        return [(*row, tasks.get(row[0])) for row in rows]
+
+
+    def run(self, profiles, options):
+        rng = random.Random(options['seed'])
+        users = CustomUser.objects.in_bulk({user_id for row in profiles for user_id in row[1:3]})
+        clients = {}
+        results = {}
+
+        def client(user_id):
+            if user_id not in clients:
+                clients[user_id] = Client()
+                clients[user_id].force_login(users[user_id])
+            return clients[user_id]
+
+        def view(step, user_id, path):
+            # Logged in outside the timings
+            browser = client(user_id)
+            stats = {'queries': 0, 'query_ms': 0.0}
+            with connection.execute_wrapper(QueryTimer(stats)):
+                start = time.perf_counter()
+                response = browser.get(path)
+                elapsed = time.perf_counter() - start
+            results.setdefault(step, []).append((elapsed * 1000, stats['queries'], response.status_code == 200))
+
+        with FragmentCounter(caches[fragments.CACHE_ALIAS]) as counter:
+            began = time.perf_counter()
+
+            for _ in range(options['requests']):
+                mentee_id, mentee_user_id, mentor_user_id, task_id = rng.choice(profiles)
+
+                if task_id and rng.random() < options['write_ratio']:
+                    # The mentee ticks a task off: their profile page must be rendered again
+                    task = Task.objects.only('pk', 'mentee_id', 'is_done').get(pk=task_id)
+                    start = time.perf_counter()
+                    services.set_task_done(task, not task.is_done)
+                    results.setdefault('task update', []).append(((time.perf_counter() - start) * 1000, 0, True))
+
+                if rng.random() < 0.8:
+                    view('mentee_profile', mentor_user_id, reverse('mentee_profile', args=[mentee_id]))
+                else:
+                    view('mentor_profile', mentee_user_id, reverse('mentor_profile'))
+
+            wall = time.perf_counter() - began
+
+        return summarize(results), counter.hits / max(1, counter.lookups), wall
+
+
+    def print_scenario(self, name, steps, hit_rate):
+        self.stdout.write(f'\n{name}: fragment hit rate {hit_rate:.1%}')
+        self.stdout.write(f"{'step':<16} {'runs':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+        for step, row in sorted(steps.items()):
+            self.stdout.write(
+                f"{step:<16} {row['runs']:>6} {row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms "
+                f"{row['p99_ms']:>7.2f}ms {row['queries']:>8.1f}"
+            )
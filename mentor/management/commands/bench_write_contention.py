@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.utils import timezone
+
+from accounts.models import MenteeProfile, MentorProfile
+from core import seeding
+from core.benchmarking import benchmark_database, summarize
+from core.database import sqlite_options
+from mentor import services
+from mentor.models import MentorAvailability, Task
+
+
+
+# Share of each operation in the mix; the rest are reads
+WRITES = {'toggle_task': 0.2, 'create_task': 0.1, 'book_slot': 0.1}
+
+
+
+def scenarios(settings_dict):
+    """(name, settings, PRAGMAs run once first) before and after the tuning of core/database.py."""
+    if settings_dict['ENGINE'].endswith('sqlite3'):
+        return [
+            ('defaults', {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, ['PRAGMA journal_mode=DELETE']),
+            ('tuned', {'OPTIONS': sqlite_options(), 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}, []),
+        ]
+
+    options = {name: value for name, value in settings_dict['OPTIONS'].items() if name != 'pool'}
+    tuned = (
+        {'OPTIONS': settings_dict['OPTIONS'], 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+        if 'pool' in settings_dict['OPTIONS']
+        else {'OPTIONS': options, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}
+    )
+    return [
+        ('defaults', {'OPTIONS': options, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, []),
+        ('tuned', tuned, []),
+    ]
+
+
+
+class Workload:
+    """A request-like mix of reads and writes; each operation ends like a request does."""
+
+    def __init__(self, mentees, record):
+        self.mentees = mentees
+        self.record = record
+        self.task_ids = list(Task.objects.values_list('pk', flat=True))
+
+
+    def run(self, rng, operations):
+        for _ in range(operations):
+            roll = rng.random()
+            name = 'read'
+            for write, share in WRITES.items():
+                if roll < share:
+                    name = write
+                    break
+                roll -= share
+
+            start = time.perf_counter()
+            try:
+                getattr(self, name)(rng)
+                ok = True
+            except OperationalError:  # "database is locked"
+                ok = False
+            self.record(name, (time.perf_counter() - start) * 1000, 0, ok)
+
+            # What the request_finished signal does at the end of a request
+            close_old_connections()
+
+
+    def read(self, rng):
+        mentee_id, mentor_id = rng.choice(self.mentees)
+        list(Task.objects.filter(mentor_id=mentor_id).order_by('-created_at')[:50])
+        Task.objects.filter(mentor_id=mentor_id, is_done=False).count()
+
+
+    def toggle_task(self, rng):
+        task = Task.objects.only('pk', 'mentee_id', 'is_done').get(pk=rng.choice(self.task_ids))
+        services.set_task_done(task, not task.is_done)
+
+
+    def create_task(self, rng):
+        mentee_id, mentor_id = rng.choice(self.mentees)
+        services.create_task(
+            MentorProfile(pk=mentor_id), MenteeProfile(pk=mentee_id), 'Contention task', 'Created by a benchmark.'
+        )
+
+
+    def book_slot(self, rng):
+        mentee_id, mentor_id = rng.choice(self.mentees)
+        slot = (
+            MentorAvailability.objects.filter(
+                mentor_id=mentor_id,
+                is_booked=False,
+                start_time__gt=timezone.now() + timedelta(days=rng.randint(0, 90)),
+            )
+            .order_by('start_time')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if slot:
+            services.book_slot(slot, MenteeProfile(pk=mentee_id), MentorProfile(pk=mentor_id))
+
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent readers and writers (task toggles, new tasks, bookings) with the default database '
+        'settings and with the tuned ones of core/database.py, and compare throughput, latency and lock errors.'
+    )
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=200, help='Operations per thread.')
+        parser.add_argument('--mentors', type=int, default=50)
+        parser.add_argument('--mentees', type=int, default=2_000)
+        parser.add_argument('--slots', type=int, default=50_000)
+        parser.add_argument('--tasks', type=int, default=50_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+
+    def handle(self, *args, **options):
+        with benchmark_database() as connection:
+            seeding.seed_database(
+                mentors=options['mentors'], mentees=options['mentees'], slots=options['slots'],
+                tasks=options['tasks'], seed=options['seed'],
+            )
+            mentees = list(MenteeProfile.objects.values_list('pk', 'user__mentor__mentor_profile'))
+
+            settings_dict = connection.settings_dict
+            original = {key: settings_dict[key] for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+            summary = []
+
+            try:
+                for name, overrides, pragmas in scenarios(settings_dict):
+                    # Worker threads open their connections from this same dict
+                    connections.close_all()
+                    settings_dict.update(overrides)
+                    with connection.cursor() as cursor:
+                        for pragma in pragmas:
+                            cursor.execute(pragma)
+                    connection.close()
+
+                    steps, wall = self.run(mentees, options)
+                    operations = sum(row['runs'] for row in steps.values())
+                    errors = sum(row['errors'] for row in steps.values())
+                    summary.append((name, operations / wall, errors))
+                    self.print_scenario(name, steps, wall)
+
+            finally:
+                connections.close_all()
+                settings_dict.update(original)
+
+        self.stdout.write(f"\n{'settings':<10} {'ops/s':>8} {'lock errors':>12}")
+        for name, throughput, errors in summary:
+            self.stdout.write(f'{name:<10} {throughput:>8.1f} {errors:>12}')
+
+
+    def run(self, mentees, options):
+        results = {}
+        lock = threading.Lock()
+
+        def record(step, ms, queries, ok):
+            with lock:
+                results.setdefault(step, []).append((ms, queries, ok))
+
+        workload = Workload(mentees, record)
+
+        def worker(number):
+            try:
+                workload.run(random.Random(f"{options['seed']}-{number}"), options['operations'])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['threads'])]
+
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return summarize(results), time.perf_counter() - began
+
+
+    def print_scenario(self, name, steps, wall):
+        operations = sum(row['runs'] for row in steps.values())
+        self.stdout.write(f'\n{name}: {operations:,} operations in {wall:.1f}s ({operations / wall:.1f} ops/s)')
+        self.stdout.write(f"{'operation':<12} {'runs':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+        for step, row in sorted(steps.items()):
+            self.stdout.write(
+                f"{step:<12} {row['runs']:>6} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+                f"{row['p99_ms']:>7.1f}ms {row['errors']:>7}"
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mentor.uploads import purge_stale_uploads
+
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable recording uploads that were abandoned, with their partial files. Safe to schedule (e.g. daily from cron).'
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-hours', type=int, default=24, help='Delete uploads not resumed for this many hours.')
+
+
+    def handle(self, *args, **options):
+        deleted = purge_stale_uploads(max_age_hours=options['max_age_hours'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stale uploads.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mentor.services import reconcile_task_counters
+
+
+
+class Command(BaseCommand):
+    help = "Recount each mentee's pending and done tasks and repair counters that drifted (e.g. after admin edits)."
+
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Mentees updated per statement.')
+
+
+    def handle(self, *args, **options):
+        fixed = reconcile_task_counters(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired task counters of {fixed} mentees.'))
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.1 on 2026-10-17 15:26
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+# Slots of the same mentor must never overlap. Because they don't, the slot
+# with the latest start before a candidate's end is the only one that can
+# overlap it, so a single descending probe on the interval index is enough.
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER mentor_availability_no_overlap_insert
+    BEFORE INSERT ON mentor_mentoravailability
+    WHEN (
+        SELECT end_time FROM mentor_mentoravailability
+        WHERE mentor_id = NEW.mentor_id AND start_time < NEW.end_time
+        ORDER BY start_time DESC LIMIT 1
+    ) > NEW.start_time
+    BEGIN
+        SELECT RAISE(ABORT, 'mentor availability overlaps an existing slot');
+    END
+    """,
+    """
+    CREATE TRIGGER mentor_availability_no_overlap_update
+    BEFORE UPDATE OF mentor_id, start_time, end_time ON mentor_mentoravailability
+    WHEN (
+        SELECT end_time FROM mentor_mentoravailability
+        WHERE mentor_id = NEW.mentor_id AND start_time < NEW.end_time AND id != OLD.id
+        ORDER BY start_time DESC LIMIT 1
+    ) > NEW.start_time
+    BEGIN
+        SELECT RAISE(ABORT, 'mentor availability overlaps an existing slot');
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS mentor_availability_no_overlap_insert',
+    'DROP TRIGGER IF EXISTS mentor_availability_no_overlap_update',
+]
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+    """
+    ALTER TABLE mentor_mentoravailability
+    ADD CONSTRAINT mentor_availability_no_overlap
+    EXCLUDE USING gist (mentor_id WITH =, tsrange(start_time, end_time) WITH &&)
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    'ALTER TABLE mentor_mentoravailability DROP CONSTRAINT IF EXISTS mentor_availability_no_overlap',
+]
+
+
+
+def check_overlaps(apps, schema_editor):
+    """
+    Stop before the constraint below if slots already overlap: it would fail
+    on PostgreSQL, and has_overlap assumes they never do. Which slot to move
+    or remove is the mentor's call, so the error lists them instead.
+    """
+    MentorAvailability = apps.get_model('mentor', 'MentorAvailability')
+    slots = (
+        MentorAvailability.objects.order_by('mentor_id', 'start_time', 'pk')
+        .values_list('pk', 'mentor_id', 'start_time', 'end_time', 'is_booked')
+    )
+
+    conflicts = []
+    for mentor_id, rows in groupby(slots.iterator(), key=lambda row: row[1]):
+        # In start order, a slot overlaps an earlier one if it starts before the latest end so far
+        latest = None
+        for pk, _, start, end, is_booked in rows:
+            if latest is not None and start < latest[1]:
+                conflicts.append(
+                    f'mentor profile {mentor_id}: slot {pk} ({start} - {end}{", booked" if is_booked else ""}) '
+                    f'overlaps slot {latest[0]}'
+                )
+            if latest is None or end > latest[1]:
+                latest = (pk, end)
+
+    if conflicts:
+        raise RuntimeError(
+            'Mentor availability slots overlap. Move or delete them, then migrate again:\n'
+            + '\n'.join(conflicts)
+        )
+
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_mentorprofile_language'),
+        ('mentor', '0003_mentoravailability_mentee'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentoravailability',
+            index=models.Index(fields=['mentor', 'start_time', 'end_time'], name='mentor_avail_interval_idx'),
+        ),
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_statements({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
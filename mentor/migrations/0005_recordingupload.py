@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_menteeprofile_task_counters'),
+        ('mentor', '0004_mentoravailability_interval_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('file_name', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('checksum', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mentee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.menteeprofile')),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.mentorprofile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor', '0005_recordingupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='meetingrecording',
+            name='video',
+            field=models.FileField(db_index=True, upload_to='video'),
+        ),
+    ]
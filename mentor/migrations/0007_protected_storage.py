@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:44
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor', '0006_index_stored_files'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='meetingrecording',
+            name='video',
+            field=models.FileField(db_index=True, storage=core.storage.protected_storage, upload_to='video'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from accounts.models import MentorProfile, MenteeProfile
+from core.storage import protected_storage
 
 
 
@@ -10,6 +13,12 @@ class MentorAvailability(models.Model):
     end_time = models.DateTimeField()
     is_booked = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Backs the overlap probe in mentor.services.has_overlap
+            models.Index(fields=['mentor', 'start_time', 'end_time'], name='mentor_avail_interval_idx'),
+        ]
+
 
 
 class Task(models.Model):
@@ -27,10 +36,31 @@ class MeetingRecording(models.Model):
     mentor = models.ForeignKey(MentorProfile, on_delete=models.SET_NULL, null=True, blank=True)
     mentee = models.ForeignKey(MenteeProfile, on_delete=models.SET_NULL, null=True, blank=True)
     title = models.CharField(max_length=255, blank=False, null=False)
-    video = models.FileField(upload_to='video')
+    # Outside MEDIA_ROOT: only stream_meeting_recording serves it
+    video = models.FileField(upload_to='video', storage=protected_storage, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
 
 
 
+class RecordingUpload(models.Model):
+    # A recording being uploaded in chunks; see mentor.uploads
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE)
+    mentee = models.ForeignKey(MenteeProfile, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    checksum = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+
+
+
 
@@ -0,0 +1,280 @@
+from datetime import datetime, timedelta
+
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from accounts.invitations import chunked
+from accounts.models import MenteeProfile
+from core import fragments
+from .models import MentorAvailability, Task
+
+
+
+# Booking outcomes
+BOOKED = 'booked'
+ALREADY_TAKEN = 'already_taken'
+NOT_FOUND = 'not_found'
+
+
+
+def book_slot(slot_id, mentee_profile, mentor_profile):
+    """
+    Claim an open availability slot for a mentee.
+
+    The claim is a single conditional UPDATE that only matches while the slot
+    is still free, so when several mentees race for the same slot exactly one
+    of them gets the row. Returns BOOKED, ALREADY_TAKEN or NOT_FOUND.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        claimed = MentorAvailability.objects.filter(
+            id=slot_id,
+            mentor=mentor_profile,
+            is_booked=False,
+            start_time__gte=now
+        ).update(is_booked=True, mentee=mentee_profile)
+        if claimed:
+            # update() sends no signals; the mentee's cached profile page must change
+            transaction.on_commit(lambda: fragments.touch(MenteeProfile, [mentee_profile.pk]))
+
+    if claimed:
+        return BOOKED
+
+    slot_exists = MentorAvailability.objects.filter(
+        id=slot_id,
+        mentor=mentor_profile,
+        start_time__gte=now
+    ).exists()
+
+    return ALREADY_TAKEN if slot_exists else NOT_FOUND
+
+
+
+def has_overlap(mentor_profile, start, end, exclude_pk=None):
+    """
+    Check whether [start, end) overlaps any slot of the mentor.
+
+    A mentor's slots never overlap each other (the database enforces it, see
+    migration 0004), so only the slot with the latest start before ``end`` can
+    collide with the new interval. That makes the check one indexed probe no
+    matter how much slot history the mentor has.
+    """
+    slots = MentorAvailability.objects.filter(mentor=mentor_profile, start_time__lt=end)
+
+    if exclude_pk is not None:
+        slots = slots.exclude(pk=exclude_pk)
+
+    latest_end = slots.order_by('-start_time').values_list('end_time', flat=True).first()
+
+    return latest_end is not None and latest_end > start
+
+
+
+def expand_recurring_slots(first_day, weekdays, start_time, end_time, slot_minutes, weeks):
+    """
+    Expand a weekly rule into (start, end) datetime pairs.
+
+    Every day in ``weeks`` weeks from ``first_day`` whose weekday (Monday is 0)
+    is in ``weekdays`` gets the window [start_time, end_time) split into
+    ``slot_minutes`` slots. A trailing remainder shorter than a slot is dropped.
+    """
+    step = timedelta(minutes=slot_minutes)
+    slots = []
+
+    for offset in range(weeks * 7):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() not in weekdays:
+            continue
+
+        start = datetime.combine(day, start_time)
+        window_end = datetime.combine(day, end_time)
+
+        while start + step <= window_end:
+            slots.append((start, start + step))
+            start += step
+
+    return slots
+
+
+
+def create_recurring_availability(mentor_profile, slots, batch_size=1000):
+    """
+    Insert many availability slots for one mentor.
+
+    Existing availability in the covered window is read with a single query
+    and the candidates are swept against it in memory, so the overlap check
+    costs the same for ten slots or ten thousand. Candidates that overlap an
+    existing slot (or an earlier candidate) are skipped. Returns a tuple of
+    (created, skipped) counts.
+    """
+    if not slots:
+        return 0, 0
+
+    slots = sorted(slots)
+    window_start = slots[0][0]
+    window_end = max(end for _, end in slots)
+
+    existing = MentorAvailability.objects.filter(
+        mentor=mentor_profile,
+        start_time__lt=window_end,
+        end_time__gt=window_start
+    ).order_by('start_time').values_list('start_time', 'end_time')
+
+    busy = list(existing)
+    index = 0
+    accepted = []
+    last_end = None
+
+    for start, end in slots:
+        # Existing slots are sorted and never overlap, so the ones ending at or
+        # before this start can not collide with any later candidate either.
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+
+        clashes_existing = index < len(busy) and busy[index][0] < end
+        clashes_batch = last_end is not None and last_end > start
+
+        if clashes_existing or clashes_batch:
+            continue
+
+        accepted.append(MentorAvailability(mentor=mentor_profile, start_time=start, end_time=end))
+        last_end = end
+
+    with transaction.atomic():
+        MentorAvailability.objects.bulk_create(accepted, batch_size=batch_size)
+
+    return len(accepted), len(slots) - len(accepted)
+
+
+
+def facet_queries(base, limit):
+    """SQL counting ``base`` (capped at ``limit`` + 1 rows) and its mentees with pending tasks."""
+    sql, params = base.order_by().values('pk', 'has_pending_tasks')[:limit + 1].query.sql_with_params()
+    total = f'SELECT COUNT(*) FROM ({sql}) facet'
+    pending = f'SELECT COALESCE(SUM(CASE WHEN facet.has_pending_tasks THEN 1 ELSE 0 END), 0) FROM ({sql}) facet'
+    return total, pending, params
+
+
+def facets(total, pending, limit):
+    # Above the cap the pending split of a partial sample would be misleading
+    exact = total <= limit
+    return {
+        'total': min(total, limit),
+        'exact': exact,
+        'pending': pending if exact else None,
+        'no_pending': total - pending if exact else None,
+    }
+
+
+
+def annotate_mentee_facets(queryset, base, limit):
+    """
+    Attach the task status facets of ``base`` (the mentee list before the task
+    status filter) to every row of ``queryset`` as uncorrelated subqueries, so
+    a page and its facet counts come back from a single query.
+    """
+    total, pending, params = facet_queries(base, limit)
+    return queryset.annotate(
+        facet_total=RawSQL(total, params, output_field=models.IntegerField()),
+        facet_pending=RawSQL(pending, params, output_field=models.IntegerField()),
+    )
+
+
+def mentee_facets(base, limit, page=None):
+    """Facet counts from an annotated page, or with their own query for an empty page."""
+    if page:
+        return facets(page[0].facet_total, page[0].facet_pending, limit)
+
+    total, pending, params = facet_queries(base, limit)
+    with connections[base.db].cursor() as cursor:
+        cursor.execute(f'SELECT ({total}), ({pending})', [*params, *params])
+        return facets(*cursor.fetchone(), limit)
+
+
+
+def adjust_task_counters(mentee_id, pending=0, done=0):
+    changes = {}
+    if pending:
+        changes['pending_task_count'] = F('pending_task_count') + pending
+    if done:
+        changes['done_task_count'] = F('done_task_count') + done
+    if changes:
+        MenteeProfile.objects.filter(pk=mentee_id).update(**changes)
+
+
+
+def create_task(mentor_profile, mentee_profile, title, description, due_date=None):
+    with transaction.atomic():
+        task = Task.objects.create(
+            mentor=mentor_profile,
+            mentee=mentee_profile,
+            title=title,
+            description=description,
+            due_date=due_date
+        )
+        adjust_task_counters(mentee_profile.pk, pending=1)
+    return task
+
+
+
+def set_task_done(task, is_done):
+    """
+    Mark a task done or pending and move it between the mentee's counters.
+
+    The status only changes if it is not already ``is_done``, so two requests
+    racing on the same task move the counters once. Returns whether the task
+    changed.
+    """
+    with transaction.atomic():
+        changed = Task.objects.filter(pk=task.pk, is_done=not is_done).update(is_done=is_done)
+        if changed:
+            step = 1 if is_done else -1
+            adjust_task_counters(task.mentee_id, pending=-step, done=step)
+            mentee_id = task.mentee_id
+            transaction.on_commit(lambda: fragments.touch(MenteeProfile, [mentee_id]))
+
+    task.is_done = is_done
+    return bool(changed)
+
+
+
+def delete_task(task):
+    with transaction.atomic():
+        row = Task.objects.select_for_update().filter(pk=task.pk).values_list('mentee_id', 'is_done').first()
+        if row is None:
+            return False
+
+        mentee_id, is_done = row
+        Task.objects.filter(pk=task.pk).delete()
+        adjust_task_counters(mentee_id, pending=0 if is_done else -1, done=-1 if is_done else 0)
+    return True
+
+
+
+def task_count(is_done):
+    counts = (
+        Task.objects.filter(mentee=models.OuterRef('pk'), is_done=is_done)
+        .order_by().values('mentee').annotate(count=models.Count('pk')).values('count')
+    )
+    return Coalesce(models.Subquery(counts, output_field=models.IntegerField()), models.Value(0))
+
+
+
+def reconcile_task_counters(chunk_size=500):
+    """Recount the tasks of every mentee whose counters drifted. Returns how many were fixed."""
+    drifted = list(
+        MenteeProfile.objects.annotate(pending=task_count(False), done=task_count(True))
+        .exclude(pending_task_count=F('pending'), done_task_count=F('done'))
+        .values_list('pk', flat=True)
+    )
+
+    for chunk in chunked(drifted, chunk_size):
+        MenteeProfile.objects.filter(pk__in=chunk).update(
+            pending_task_count=task_count(False),
+            done_task_count=task_count(True),
+        )
+
+    return len(drifted)
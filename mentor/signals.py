@@ -0,0 +1,33 @@
+"""
+Release stored recording files (``core.storage``) when they are replaced or
+deleted, and move the mentee's fragment stamp (``core.fragments``) when their
+tasks, booked slots or recordings change.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from accounts.models import MenteeProfile
+from core import fragments, storage
+
+from .models import MeetingRecording, MentorAvailability, Task
+
+
+
+pre_save.connect(storage.remember_files, sender=MeetingRecording)
+post_save.connect(storage.release_replaced, sender=MeetingRecording)
+post_delete.connect(storage.release_deleted, sender=MeetingRecording)
+
+
+
+def touch_mentee_stamp(sender, instance, raw=False, **kwargs):
+    mentee_id = instance.mentee_id
+    if raw or mentee_id is None:
+        return
+    transaction.on_commit(lambda: fragments.touch(MenteeProfile, [mentee_id]))
+
+
+# Rows shown on the mentee profile page; mentor.services touches the stamp after its update() calls
+for model in (Task, MentorAvailability, MeetingRecording):
+    post_save.connect(touch_mentee_stamp, sender=model)
+    post_delete.connect(touch_mentee_stamp, sender=model)
@@ -1,3 +1,536 @@
-from django.test import TestCase
+import base64
+import io
+import shutil
+import tempfile
+import zlib
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser, MentorProfile, MenteeProfile
+
+from . import services, uploads
+from .models import MeetingRecording, MentorAvailability, RecordingUpload, Task
+
+
+
+class ProtectedMediaTestCase(TestCase):
+    """Runs each test with empty media directories of its own."""
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        media_root = tempfile.mkdtemp(prefix='matkamestre-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=f'{media_root}/public', PROTECTED_MEDIA_ROOT=f'{media_root}/protected')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+
+class BookSlotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=mentor)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw', is_mentor=True)
+        cls.other_mentor_profile = MentorProfile.objects.create(user=other)
+
+        first = CustomUser.objects.create_user(username='first', email='first@example.com', password='pw', mentor=mentor)
+        cls.first = MenteeProfile.objects.create(user=first)
+        second = CustomUser.objects.create_user(username='second', email='second@example.com', password='pw', mentor=mentor)
+        cls.second = MenteeProfile.objects.create(user=second)
+
+
+    def setUp(self):
+        caches['shared'].clear()
+
+
+    def add_slot(self, hours_from_now=24):
+        start = timezone.now() + timedelta(hours=hours_from_now)
+        return MentorAvailability.objects.create(mentor=self.mentor_profile, start_time=start, end_time=start + timedelta(hours=1))
+
+
+    def test_open_slot_is_booked(self):
+        slot = self.add_slot()
+
+        self.assertEqual(services.book_slot(slot.pk, self.first, self.mentor_profile), services.BOOKED)
+
+        slot.refresh_from_db()
+        self.assertTrue(slot.is_booked)
+        self.assertEqual(slot.mentee, self.first)
+
+
+    def test_second_booking_is_refused_and_keeps_the_first_mentee(self):
+        slot = self.add_slot()
+        services.book_slot(slot.pk, self.first, self.mentor_profile)
+
+        self.assertEqual(services.book_slot(slot.pk, self.second, self.mentor_profile), services.ALREADY_TAKEN)
+
+        slot.refresh_from_db()
+        self.assertTrue(slot.is_booked)
+        self.assertEqual(slot.mentee, self.first)
+
+
+    def test_past_slot_is_not_found(self):
+        slot = self.add_slot(hours_from_now=-2)
+
+        self.assertEqual(services.book_slot(slot.pk, self.first, self.mentor_profile), services.NOT_FOUND)
+
+        slot.refresh_from_db()
+        self.assertFalse(slot.is_booked)
+        self.assertIsNone(slot.mentee)
+
+
+    def test_slot_of_another_mentor_is_not_found(self):
+        slot = self.add_slot()
+
+        self.assertEqual(services.book_slot(slot.pk, self.first, self.other_mentor_profile), services.NOT_FOUND)
+
+        slot.refresh_from_db()
+        self.assertFalse(slot.is_booked)
+
+
+    def test_missing_slot_is_not_found(self):
+        self.assertEqual(services.book_slot(0, self.first, self.mentor_profile), services.NOT_FOUND)
+
+
+
+class AvailabilityOverlapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+        # 10:00 to 12:00 tomorrow
+        cls.start = (timezone.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+        cls.slot = cls.add_slot(cls.start, cls.start + timedelta(hours=2))
+
+
+    @classmethod
+    def add_slot(cls, start, end, mentor_profile=None):
+        return MentorAvailability.objects.create(mentor=mentor_profile or cls.mentor_profile, start_time=start, end_time=end)
+
+
+    def at(self, hours):
+        return self.start + timedelta(hours=hours - 10)
+
+
+    def test_has_overlap_at_both_edges(self):
+        cases = [
+            ((8, 10), False),       # ends as the slot starts
+            ((12, 13), False),      # starts as the slot ends
+            ((9, 11), True),        # over the start
+            ((11, 13), True),       # over the end
+            ((10, 12), True),
+            ((10.5, 11.5), True),   # inside
+            ((9, 13), True),        # around
+        ]
+        for (start, end), expected in cases:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(services.has_overlap(self.mentor_profile, self.at(start), self.at(end)), expected)
+
+        self.assertFalse(services.has_overlap(self.mentor_profile, self.at(9), self.at(13), exclude_pk=self.slot.pk))
+
+
+    def test_database_rejects_overlapping_slots(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.add_slot(self.at(11), self.at(13))
+
+        later = self.add_slot(self.at(12), self.at(13))
+        later.start_time = self.at(11)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            later.save(update_fields=['start_time'])
+
+        # Back to back, or another mentor at the same time, is fine
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw', is_mentor=True)
+        self.add_slot(self.at(10), self.at(12), MentorProfile.objects.create(user=other))
+        self.add_slot(self.at(8), self.at(10))
+
+
+    @mock.patch('mentor.services.has_overlap', return_value=False)
+    def test_views_report_a_slot_added_after_their_check(self, has_overlap):
+        # As if another request saved the clashing slot between the check and the save
+        self.client.force_login(self.mentor)
+        later = self.add_slot(self.at(13), self.at(14))
+
+        response = self.client.post(reverse('set_availability'), {
+            'start_time': self.at(11).isoformat(), 'end_time': self.at(13).isoformat(),
+        })
+        self.assertContains(response, 'conflicts with an existing availability')
+
+        response = self.client.post(reverse('edit_availability', args=[later.pk]), {
+            'start_time': self.at(11).isoformat(), 'end_time': self.at(14).isoformat(),
+        })
+        self.assertContains(response, 'conflicts with an existing availability')
+
+        self.assertEqual(MentorAvailability.objects.filter(mentor=self.mentor_profile).count(), 2)
+        later.refresh_from_db()
+        self.assertEqual(later.start_time, self.at(13))
+
+
+
+class RecurringAvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+        # A Monday
+        cls.day = date(2099, 1, 5)
+
+
+    def at(self, hours, days=0):
+        return datetime.combine(self.day + timedelta(days=days), time()) + timedelta(hours=hours)
+
+
+    def test_expand_splits_each_window_and_drops_the_remainder(self):
+        slots = services.expand_recurring_slots(self.day, {0, 2}, time(10), time(11, 10), 30, 2)
+
+        expected = []
+        for days in [0, 2, 7, 9]:
+            expected += [(self.at(10, days), self.at(10.5, days)), (self.at(10.5, days), self.at(11, days))]
+        self.assertEqual(slots, expected)
+
+
+    def test_expand_with_a_window_shorter_than_a_slot(self):
+        self.assertEqual(services.expand_recurring_slots(self.day, {0}, time(10), time(10, 20), 30, 1), [])
+
+
+    def test_candidates_are_swept_against_existing_slots_and_each_other(self):
+        for start, end in [(10, 11), (12, 12.5), (15, 20)]:
+            MentorAvailability.objects.create(mentor=self.mentor_profile, start_time=self.at(start), end_time=self.at(end))
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw', is_mentor=True)
+        MentorAvailability.objects.create(mentor=MentorProfile.objects.create(user=other), start_time=self.at(9), end_time=self.at(10))
+
+        candidates = [
+            (13, 14),
+            (9, 9.5),
+            (9.5, 10),          # up to the first existing slot
+            (10.5, 11),         # inside it
+            (11, 11.5),         # right after it
+            (11.25, 11.75),     # over the previous candidate
+            (12.25, 12.75),     # over the end of the second existing slot
+            (16, 17),           # inside the last one
+        ]
+        created, skipped = services.create_recurring_availability(
+            self.mentor_profile, [(self.at(start), self.at(end)) for start, end in candidates], batch_size=2
+        )
+
+        self.assertEqual((created, skipped), (4, 4))
+        added = MentorAvailability.objects.filter(mentor=self.mentor_profile).exclude(start_time__in=[self.at(10), self.at(12), self.at(15)])
+        self.assertEqual(
+            list(added.order_by('start_time').values_list('start_time', flat=True)),
+            [self.at(9), self.at(9.5), self.at(11), self.at(13)],
+        )
+
+
+    def test_backfill_only_adds_future_slots(self):
+        now = timezone.now()
+        today = now.date()
+        out = io.StringIO()
+
+        call_command(
+            'backfill_availability', '--mentor-email', 'mentor@example.com', '--weekdays', *map(str, range(7)),
+            '--start', '00:00', '--end', '23:00', '--slot-minutes', '60', '--weeks', '2',
+            '--from', (today - timedelta(days=7)).isoformat(), stdout=out,
+        )
+
+        slots = MentorAvailability.objects.filter(mentor=self.mentor_profile)
+        self.assertGreaterEqual(slots.count(), 6 * 23)
+        self.assertFalse(slots.filter(start_time__lt=now).exists())
+        self.assertIn(f'mentor@example.com: {slots.count()} created, 0 skipped', out.getvalue())
+
+
+
+class TaskCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+        mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=cls.mentor)
+        cls.mentee_profile = MenteeProfile.objects.create(user=mentee)
+
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client.force_login(self.mentor)
+
+
+    def assertCounters(self, pending, done):
+        self.mentee_profile.refresh_from_db()
+        self.assertEqual(
+            (self.mentee_profile.pending_task_count, self.mentee_profile.done_task_count), (pending, done)
+        )
+
+
+    def test_counters_follow_create_toggle_edit_and_delete(self):
+        for title in ['First', 'Second']:
+            self.client.post(reverse('create_task'), {
+                'mentee_email': 'mentee@example.com', 'title': title, 'description': 'Description',
+            })
+        self.assertCounters(pending=2, done=0)
+        task = Task.objects.get(title='First')
+
+        self.client.post(reverse('toggle_task_status', args=[task.pk]))
+        self.assertCounters(pending=1, done=1)
+        self.client.post(reverse('toggle_task_status', args=[task.pk]))
+        self.assertCounters(pending=2, done=0)
+
+        # Marking a task done that already is changes nothing
+        services.set_task_done(task, True)
+        services.set_task_done(task, True)
+        self.assertCounters(pending=1, done=1)
+
+        self.client.post(reverse('edit_task', args=[task.pk]), {'title': 'Renamed', 'description': 'Changed'})
+        self.assertEqual(Task.objects.get(pk=task.pk).title, 'Renamed')
+        self.assertCounters(pending=1, done=1)
+
+        self.client.post(reverse('delete_task', args=[task.pk]))
+        self.assertCounters(pending=1, done=0)
+        self.client.post(reverse('delete_task', args=[Task.objects.get().pk]))
+        self.assertCounters(pending=0, done=0)
+
+
+    def test_reconcile_repairs_drifted_counters(self):
+        for i in range(3):
+            task = services.create_task(self.mentor_profile, self.mentee_profile, f'Task {i}', 'Description')
+        services.set_task_done(task, True)
+        MenteeProfile.objects.filter(pk=self.mentee_profile.pk).update(pending_task_count=7, done_task_count=0)
+
+        self.assertEqual(services.reconcile_task_counters(), 1)
+        self.assertCounters(pending=2, done=1)
+        self.assertEqual(services.reconcile_task_counters(), 0)
+
+
+
+class StreamMeetingRecordingTests(ProtectedMediaTestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        cls.mentor_profile = MentorProfile.objects.create(user=cls.mentor)
+
+
+    def setUp(self):
+        super().setUp()
+        self.recording = MeetingRecording(mentor=self.mentor_profile, title='Talk')
+        self.recording.video.save('talk.mp4', ContentFile(self.CONTENT))
+        self.url = reverse('stream_meeting_recording', args=[self.recording.pk])
+        self.client.force_login(self.mentor)
+
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+
+    def test_range_is_answered_with_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+
+    def test_range_past_the_end_is_not_satisfiable(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='Thu, 01 Jan 2015 00:00:00 GMT')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+
+    def test_current_if_range_gets_the_range(self):
+        modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=modified)
+
+        self.assertEqual(response.status_code, 206)
+
+
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx')
+    def test_nginx_serves_the_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.recording.video.name}')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response.content, b'')
+
+
+    def test_other_mentors_do_not_get_the_file(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw', is_mentor=True)
+        MentorProfile.objects.create(user=other)
+        self.client.force_login(other)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+
+class RecordingUploadTests(ProtectedMediaTestCase):
+    CONTENT = b'recording ' * 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        MentorProfile.objects.create(user=cls.mentor)
+        mentee = CustomUser.objects.create_user(username='mentee', email='mentee@example.com', password='pw', mentor=cls.mentor)
+        cls.mentee_profile = MenteeProfile.objects.create(user=mentee)
+
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.mentor)
+        response = self.client.post(reverse('create_recording_upload'), {
+            'mentee_email': 'mentee@example.com', 'title': 'Talk', 'filename': 'talk.mp4', 'size': len(self.CONTENT),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.url = response['Location']
+        self.upload = RecordingUpload.objects.get()
+
+
+    def send(self, offset, data, **headers):
+        return self.client.patch(
+            self.url, data, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+
+    def finalize(self, **data):
+        return self.client.post(reverse('finalize_recording_upload', args=[self.upload.pk]), data)
+
+
+    def test_chunks_then_finalize_attach_the_file(self):
+        self.assertEqual(self.send(0, self.CONTENT[:4000])['Upload-Offset'], '4000')
+        response = self.send(4000, self.CONTENT[4000:])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Upload-Offset'], str(len(self.CONTENT)))
+
+        checksum = base64.b64encode(zlib.crc32(self.CONTENT).to_bytes(4, 'big')).decode()
+        response = self.finalize(checksum=f'crc32 {checksum}')
+
+        self.assertEqual(response.status_code, 200)
+        recording = MeetingRecording.objects.get()
+        self.assertEqual((recording.title, recording.mentee), ('Talk', self.mentee_profile))
+        with recording.video.open('rb') as video:
+            self.assertEqual(video.read(), self.CONTENT)
+        self.assertFalse(RecordingUpload.objects.exists())
+        self.assertEqual(self.client.head(self.url).status_code, 404)
+
+
+    def test_chunk_at_the_wrong_offset_is_refused(self):
+        self.send(0, self.CONTENT[:4000])
+
+        for offset in [0, 5000]:
+            with self.subTest(offset=offset):
+                response = self.send(offset, self.CONTENT[offset:offset + 1000])
+                self.assertEqual(response.status_code, 409)
+
+        self.assertEqual(self.client.head(self.url)['Upload-Offset'], '4000')
+
+
+    def test_chunk_past_the_declared_length_is_refused(self):
+        response = self.send(0, self.CONTENT + b'extra')
+
+        self.assertEqual(response.status_code, 400)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 0)
+
+
+    def test_chunk_with_a_wrong_checksum_is_dropped(self):
+        checksum = base64.b64encode(zlib.crc32(b'other').to_bytes(4, 'big')).decode()
+        response = self.send(0, self.CONTENT[:4000], HTTP_UPLOAD_CHECKSUM=f'crc32 {checksum}')
+
+        self.assertEqual(response.status_code, uploads.ChecksumMismatch.status)
+        self.assertEqual(self.client.head(self.url)['Upload-Offset'], '0')
+
+
+    def test_incomplete_upload_is_not_finalized(self):
+        self.send(0, self.CONTENT[:4000])
+
+        response = self.finalize()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MeetingRecording.objects.exists())
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 4000)
+
+
+
+class MentorDashboardPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', email='mentor@example.com', password='pw', is_mentor=True)
+        MentorProfile.objects.create(user=cls.mentor)
+        for i in range(8):
+            mentee = CustomUser.objects.create_user(username=f'mentee{i}', email=f'mentee{i}@example.com', password='pw', mentor=cls.mentor)
+            MenteeProfile.objects.create(user=mentee)
+
+        # Two runs of mentees created at the very same moment, split across pages
+        moment = timezone.now().replace(microsecond=0)
+        users = CustomUser.objects.filter(mentor=cls.mentor).order_by('pk')
+        CustomUser.objects.filter(pk__in=list(users.values_list('pk', flat=True)[:5])).update(created_at=moment)
+        CustomUser.objects.filter(pk__in=list(users.values_list('pk', flat=True)[5:])).update(created_at=moment + timedelta(seconds=1))
+
+        cls.expected = list(
+            MenteeProfile.objects.filter(user__mentor=cls.mentor)
+            .order_by('-user__created_at', '-user_id').values_list('pk', flat=True)
+        )
+
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client.force_login(self.mentor)
+
+
+    def page(self, **cursor):
+        response = self.client.get(reverse('dashboard_mentor'), cursor)
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        return [mentee.pk for mentee in context['my_mentees']], context['next_cursor'], context['previous_cursor']
+
+
+    @mock.patch('mentor.views.MENTEES_PER_PAGE', 3)
+    def test_cursors_return_every_mentee_once_in_both_directions(self):
+        pages = []
+        mentees, next_cursor, previous_cursor = self.page()
+        self.assertIsNone(previous_cursor)
+        pages.append(mentees)
+        while next_cursor:
+            mentees, next_cursor, previous_cursor = self.page(after=next_cursor)
+            pages.append(mentees)
+
+        self.assertEqual([len(mentees) for mentees in pages], [3, 3, 2])
+        self.assertEqual([pk for mentees in pages for pk in mentees], self.expected)
+
+        # And back from the last page to the first
+        backwards = [pages[-1]]
+        while previous_cursor:
+            mentees, _, previous_cursor = self.page(before=previous_cursor)
+            backwards.append(mentees)
+
+        self.assertEqual(list(reversed(backwards)), pages)
+
+
+    def test_tampered_cursor_starts_over(self):
+        self.assertEqual(self.page(after='not-a-cursor')[0], self.expected)
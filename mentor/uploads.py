@@ -0,0 +1,239 @@
+"""
+Resumable, chunked upload of meeting recordings, following the core of the
+tus protocol (https://tus.io).
+
+1. ``create_upload`` creates an empty staging file, PROTECTED_MEDIA_ROOT/uploads/<id>.part.
+2. Each PATCH carries the next chunk at the offset the server expects. The
+   request body is copied in CHUNK_SIZE pieces straight into that file, so a
+   byte is written once and a worker never holds more than one piece. A
+   running CRC-32 of the file is stored along with the new offset.
+3. ``finalize_upload`` hands the staging file to the storage, which hashes
+   it and moves it into place (core.storage), and creates the MeetingRecording.
+
+Writers of one upload take turns on an exclusive lock of its staging file, not
+on a database row: no transaction stays open while a client sends a chunk or
+a file is hashed. The offset then moves in one short conditional UPDATE.
+
+A dropped connection costs at most the chunk in flight: the client asks for
+the offset (HEAD) and carries on from there. The storage must be on the local
+file system, since chunks are appended to ``storage.path()``.
+"""
+
+import base64
+import os
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.files import File, locks
+from django.db import transaction
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .models import MeetingRecording, RecordingUpload
+
+
+
+CHUNK_SIZE = 64 * 1024
+
+MAX_UPLOAD_SIZE = 4 * 1024 ** 3
+
+
+
+class UploadError(Exception):
+    status = 400
+
+
+class OffsetMismatch(UploadError):
+    status = 409
+
+
+class UploadNotFound(UploadError):
+    status = 404
+
+
+class ChecksumMismatch(UploadError):
+    # Status used by the tus checksum extension
+    status = 460
+
+
+
+def parse_checksum(header):
+    """Read an ``Upload-Checksum: crc32 <base64 digest>`` header; None when absent."""
+    if not header:
+        return None
+
+    algorithm, _, digest = header.strip().partition(' ')
+    if algorithm.lower() != 'crc32':
+        raise UploadError('Only crc32 checksums are supported.')
+
+    try:
+        return int.from_bytes(base64.b64decode(digest, validate=True), 'big')
+    except ValueError:
+        raise UploadError('The checksum is not valid base64.')
+
+
+
+class StagedFile(File):
+    """A finished staging file; storages move it instead of copying it."""
+
+    def __init__(self, path):
+        super().__init__(open(path, 'rb'), name=os.path.basename(path))
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+
+def video_storage():
+    return MeetingRecording._meta.get_field('video').storage
+
+
+def staging_path(upload):
+    return video_storage().path(f'uploads/{upload.pk}.part')
+
+
+
+def create_upload(mentor_profile, mentee_profile, title, filename, size):
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        raise UploadError('The file size is missing or too large.')
+
+    upload = RecordingUpload.objects.create(
+        mentor=mentor_profile,
+        mentee=mentee_profile,
+        title=title,
+        file_name=os.path.basename(filename)[-255:],
+        size=size,
+    )
+
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'xb').close()
+
+    return upload
+
+
+
+@contextmanager
+def locked(upload):
+    """
+    Hold the lock of the upload's staging file: one writer per upload, and a
+    retried chunk waits for the one it repeats. No database transaction is
+    open meanwhile, however slowly the client sends.
+    """
+    try:
+        file = open(staging_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise UploadNotFound('The upload was finished or cancelled.')
+
+    with file:
+        locks.lock(file, locks.LOCK_EX)
+        try:
+            # Re-read under the lock: only its holder moves the offset
+            try:
+                current = RecordingUpload.objects.get(pk=upload.pk)
+            except RecordingUpload.DoesNotExist:
+                raise UploadNotFound('The upload was finished or cancelled.')
+            yield current, file
+        finally:
+            locks.unlock(file)
+
+
+
+def append_chunk(upload, offset, stream, length, expected_checksum=None):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset`` and return the
+    updated upload. ``expected_checksum`` is the client's CRC-32 of the chunk;
+    on a mismatch the chunk is dropped and the offset does not move.
+    """
+    with locked(upload) as (upload, file):
+        if offset != upload.offset:
+            raise OffsetMismatch(f'Expected offset {upload.offset}.')
+        if length > upload.size - upload.offset:
+            raise UploadError('The chunk goes past the end of the file.')
+
+        checksum = upload.checksum
+        chunk_checksum = 0
+        written = 0
+
+        # Bytes past the stored offset come from a chunk that was never recorded
+        file.truncate(upload.offset)
+        file.seek(upload.offset)
+
+        while written < length:
+            try:
+                data = stream.read(min(CHUNK_SIZE, length - written))
+            except UnreadablePostError:
+                break
+            if not data:
+                break
+
+            file.write(data)
+            checksum = zlib.crc32(data, checksum)
+            chunk_checksum = zlib.crc32(data, chunk_checksum)
+            written += len(data)
+
+        if expected_checksum is not None and (written < length or chunk_checksum != expected_checksum):
+            raise ChecksumMismatch('The chunk does not match its checksum.')
+
+        file.flush()
+        os.fsync(file.fileno())
+
+        # Keep what arrived of an interrupted chunk, as tus allows. The offset
+        # only moves from the one the bytes were written at.
+        now = timezone.now()
+        moved = RecordingUpload.objects.filter(pk=upload.pk, offset=upload.offset).update(
+            offset=upload.offset + written, checksum=checksum, updated_at=now
+        )
+        if not moved:
+            raise OffsetMismatch('The upload moved on meanwhile.')
+
+        upload.offset += written
+        upload.checksum = checksum
+        upload.updated_at = now
+
+    return upload
+
+
+
+def finalize_upload(upload, expected_checksum=None):
+    """Turn a complete upload into its MeetingRecording."""
+    with locked(upload) as (upload, file):
+        if not upload.is_complete:
+            raise UploadError(f'Only {upload.offset} of {upload.size} bytes were received.')
+        if expected_checksum is not None and expected_checksum != upload.checksum:
+            raise ChecksumMismatch('The file does not match its checksum.')
+
+        # Hashing and moving a large file happens outside any transaction
+        recording = MeetingRecording(mentor=upload.mentor, mentee=upload.mentee, title=upload.title)
+        with StagedFile(staging_path(upload)) as staged:
+            recording.video.save(upload.file_name, staged, save=False)
+
+        with transaction.atomic():
+            recording.save()
+            abort_upload(upload)
+
+    return recording
+
+
+
+def abort_upload(upload):
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+
+def purge_stale_uploads(max_age_hours=24):
+    """Delete uploads (and their partial files) not resumed for ``max_age_hours``."""
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    deleted = 0
+
+    for upload in RecordingUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        abort_upload(upload)
+        deleted += 1
+
+    return deleted
@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
     path('dashboard_mentor/', views.dashboard_mentor, name='dashboard_mentor'),
     path('set_availability/', views.set_availability, name='set_availability'),
+    path('set_recurring_availability/', views.set_recurring_availability, name='set_recurring_availability'),
     path('availability_list/', views.availability_list, name='availability_list'),
     path('delete_availability/<int:pk>', views.delete_availability, name='delete_availability'),
     path('edit_availability/<int:pk>', views.edit_availability, name='edit_availability'),
@@ -14,6 +15,10 @@ urlpatterns = [
     path('toggle_task_status/<int:pk>', views.toggle_task_status, name='toggle_task_status'),
     path('edit_task/<int:pk>', views.edit_task, name='edit_task'),
     path('upload_meeting_recording/', views.upload_meeting_recording, name='upload_meeting_recording'),
+    path('recordings/uploads/', views.create_recording_upload, name='create_recording_upload'),
+    path('recordings/uploads/<uuid:pk>/', views.recording_upload, name='recording_upload'),
+    path('recordings/uploads/<uuid:pk>/finalize/', views.finalize_recording_upload, name='finalize_recording_upload'),
     path('list_meeting_recordings/', views.list_meeting_recordings, name='list_meeting_recordings'),
+    path('recordings/<int:pk>/video/', views.stream_meeting_recording, name='stream_meeting_recording'),
     path('mentor_profile/', views.mentor_profile, name='mentor_profile'),
 ]
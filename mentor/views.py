@@ -1,50 +1,97 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from accounts.models import MenteeProfile, MentorProfile
-from django.http import HttpResponse
+from accounts import identity, search
+from django.http import HttpResponse, Http404, JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from .models import MentorAvailability, Task, MeetingRecording
+from django.urls import reverse
+from .models import MentorAvailability, Task, MeetingRecording, RecordingUpload
+from . import services, uploads
+from core import fragments
+from core.pagination import keyset_page
+from core.replicas import read_from_replica
+from core.streaming import serve_file
 from django.utils import timezone
-from django.db import transaction, models
+from django.db import transaction, models, IntegrityError
+from datetime import date, time
+
+
+
+WEEKDAY_CHOICES = [
+    (0, 'Monday'),
+    (1, 'Tuesday'),
+    (2, 'Wednesday'),
+    (3, 'Thursday'),
+    (4, 'Friday'),
+    (5, 'Saturday'),
+    (6, 'Sunday'),
+]
+SLOT_MINUTE_CHOICES = [15, 30, 45, 60, 90, 120]
+MAX_RECURRING_WEEKS = 52
+
+MENTEES_PER_PAGE = 25
+# Above this many mentees the dashboard shows "1000+" instead of counting them all
+MENTEE_COUNT_LIMIT = 1000
 
 
 
 @login_required(redirect_field_name='login')
+@read_from_replica()
 def dashboard_mentor(request):
     if not request.user.is_mentor:
         messages.error(request, 'Access denied. Only Mentor can view this dashboard.')
         return redirect('login')
 
-    my_mentees = MenteeProfile.objects.filter(user__mentor=request.user).select_related('user')
+    my_mentees = MenteeProfile.objects.filter(user__mentor=request.user).select_related('user').defer('cv_text')
 
     # Get filter values
     search_query = request.GET.get('q', '')
     location_filter = request.GET.get('location', '')
     task_status_filter = request.GET.get('task_status', '')
 
-    # Annotate with pending task status
-    pending_tasks_subquery = Task.objects.filter(
-        mentee=models.OuterRef('pk'), 
-        is_done=False
-    )
+    # Annotate with pending task status, from the denormalized counter
     my_mentees = my_mentees.annotate(
-        has_pending_tasks=models.Exists(pending_tasks_subquery)
+        has_pending_tasks=models.ExpressionWrapper(models.Q(pending_task_count__gt=0), output_field=models.BooleanField())
     )
 
-    # Apply filters
-    if search_query:
-        my_mentees = my_mentees.filter(models.Q(user__username__icontains=search_query) | models.Q(user__email__icontains=search_query))
-    if location_filter:
-        my_mentees = my_mentees.filter(location__icontains=location_filter)
+    # Apply filters, through the full-text index when the database has one
+    searched = search.search_mentees(my_mentees, search_query, location_filter, mentor=request.user)
+    if searched is not None:
+        my_mentees = searched
+    else:
+        if search_query:
+            my_mentees = my_mentees.filter(models.Q(user__username__icontains=search_query) | models.Q(user__email__icontains=search_query))
+        if location_filter:
+            my_mentees = my_mentees.filter(location__icontains=location_filter)
+    filtered_mentees = my_mentees
     if task_status_filter == 'pending':
-        my_mentees = my_mentees.filter(has_pending_tasks=True)
+        my_mentees = my_mentees.filter(pending_task_count__gt=0)
     elif task_status_filter == 'no_pending':
-        my_mentees = my_mentees.filter(has_pending_tasks=False)
+        my_mentees = my_mentees.filter(pending_task_count=0)
 
-    total_mentees = my_mentees.count()
+    # The page and the task status facet counts come back from one query
+    my_mentees = services.annotate_mentee_facets(my_mentees, filtered_mentees, MENTEE_COUNT_LIMIT)
+
+    if search.is_ranked(my_mentees):
+        # Ranked search results are bounded by search.RANK_LIMIT and shown best first
+        page = list(my_mentees)
+        next_cursor = previous_cursor = None
+    else:
+        page, next_cursor, previous_cursor = keyset_page(
+            my_mentees,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            per_page=MENTEES_PER_PAGE,
+            fields=('user__created_at', 'user_id'),
+        )
 
-    mentor_profile = request.user.mentor_profile
+    facets = services.mentee_facets(filtered_mentees, MENTEE_COUNT_LIMIT, page)
+    total_mentees = facets['total']
+    if facets['exact'] and task_status_filter in ('pending', 'no_pending'):
+        total_mentees = facets[task_status_filter]
+
+    mentor_profile = identity.own_mentor_profile(request.user)
 
     
     reserved_slots = []
@@ -57,8 +104,11 @@ def dashboard_mentor(request):
     
 
     context = {
-        'my_mentees': my_mentees,
+        'my_mentees': page,
         'total_mentees': total_mentees,
+        'facets': facets,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
         'reserved_slots': reserved_slots,
         'mentor_profile': mentor_profile,
         'filters': {
@@ -108,20 +158,14 @@ def set_availability(request):
                 return render(request, 'set_availability.html')
             
 
-            conflict_date = MentorAvailability.objects.filter(
-                mentor = request.user.mentor_profile,
-                start_time__lt = end,
-                end_time__gt = start
-            ).exists()
-
-            if conflict_date:
+            if services.has_overlap(identity.mentor_profile_or_404(request.user), start, end):
                 messages.error(request, 'This time slot conflicts with an existing availability.')
                 return render(request, 'set_availability.html')
             
 
             with transaction.atomic():
                 MentorAvailability.objects.create(
-                    mentor = request.user.mentor_profile,
+                    mentor = identity.mentor_profile_or_404(request.user),
                     start_time=start,
                     end_time=end
                 )
@@ -129,6 +173,11 @@ def set_availability(request):
             messages.success(request, 'Availability slot added successfully!')
             return redirect('availability_list')
         
+        except IntegrityError:
+            # Another request created an overlapping slot after our check.
+            messages.error(request, 'This time slot conflicts with an existing availability.')
+            return render(request, 'set_availability.html')
+
         except ValueError:
             messages.error(request, 'Invalid date or time format.')
             return render(request, 'set_availability.html')
@@ -141,14 +190,114 @@ def set_availability(request):
 
 
 
+@login_required(redirect_field_name='login')
+@require_http_methods(['GET','POST'])
+def set_recurring_availability(request):
+    if not request.user.is_mentor:
+        messages.error(request, 'Access denied. Only Mentores can set availability.')
+        return redirect('login')
+
+
+    context = {
+        'current_timezone': timezone.get_current_timezone_name(),
+        'weekday_choices': WEEKDAY_CHOICES,
+        'slot_minute_choices': SLOT_MINUTE_CHOICES,
+    }
+
+
+    if request.method == 'POST':
+        weekdays = request.POST.getlist('weekdays')
+        first_day = request.POST.get('first_day')
+        start_time = request.POST.get('start_time')
+        end_time = request.POST.get('end_time')
+        slot_minutes = request.POST.get('slot_minutes')
+        weeks = request.POST.get('weeks')
+
+        context['form_data'] = {
+            'weekdays': weekdays,
+            'first_day': first_day,
+            'start_time': start_time,
+            'end_time': end_time,
+            'slot_minutes': slot_minutes,
+            'weeks': weeks,
+        }
+
+        if not all([weekdays, first_day, start_time, end_time, slot_minutes, weeks]):
+            messages.error(request, 'All fields are required.')
+            return render(request, 'set_recurring_availability.html', context)
+
+
+        try:
+            weekdays = {int(day) for day in weekdays}
+            first_day = date.fromisoformat(first_day)
+            start = time.fromisoformat(start_time)
+            end = time.fromisoformat(end_time)
+            slot_minutes = int(slot_minutes)
+            weeks = int(weeks)
+
+        except ValueError:
+            messages.error(request, 'Invalid date or time format.')
+            return render(request, 'set_recurring_availability.html', context)
+
+
+        if end <= start:
+            messages.error(request, 'End time must be after start time.')
+            return render(request, 'set_recurring_availability.html', context)
+
+        if first_day < timezone.now().date():
+            messages.error(request, 'Starting date cannot be in the past.')
+            return render(request, 'set_recurring_availability.html', context)
+
+        if slot_minutes not in SLOT_MINUTE_CHOICES or not 1 <= weeks <= MAX_RECURRING_WEEKS:
+            messages.error(request, f'Choose a valid slot length and between 1 and {MAX_RECURRING_WEEKS} weeks.')
+            return render(request, 'set_recurring_availability.html', context)
+
+
+        slots = [
+            (slot_start, slot_end)
+            for slot_start, slot_end in services.expand_recurring_slots(first_day, weekdays, start, end, slot_minutes, weeks)
+            if slot_start >= timezone.now()
+        ]
+
+        if not slots:
+            messages.error(request, 'This rule does not produce any future slots.')
+            return render(request, 'set_recurring_availability.html', context)
+
+
+        try:
+            created, skipped = services.create_recurring_availability(identity.mentor_profile_or_404(request.user), slots)
+
+        except IntegrityError:
+            messages.error(request, 'Your availability changed while saving. Please, try again.')
+            return render(request, 'set_recurring_availability.html', context)
+
+
+        if not created:
+            messages.error(request, 'No slots were added. All of them conflict with an existing availability.')
+            return render(request, 'set_recurring_availability.html', context)
+
+        if skipped:
+            messages.success(request, f'{created} availability slots added. {skipped} slots were skipped because they conflict with an existing availability.')
+        else:
+            messages.success(request, f'{created} availability slots added successfully!')
+        return redirect('availability_list')
+
+
+    return render(request, 'set_recurring_availability.html', context)
+
+
+
+
+
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
+@read_from_replica()
 def availability_list(request):
     if not request.user.is_mentor:
         messages.error(request, 'Access denied. Only Mentores can list availability.')
         return redirect('login')
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
 
     slots = MentorAvailability.objects.filter(mentor=mentor_profile).order_by('start_time')
 
@@ -173,7 +322,7 @@ def delete_availability(request, pk):
     
 
     try:
-        slot = get_object_or_404(MentorAvailability, id=pk, mentor=request.user.mentor_profile)
+        slot = get_object_or_404(MentorAvailability, id=pk, mentor=identity.mentor_profile_or_404(request.user))
 
     except Exception:
         messages.error(request, 'Slot not found.')
@@ -208,7 +357,7 @@ def edit_availability(request, pk):
     
 
     try:
-        slot = get_object_or_404(MentorAvailability, id=pk, mentor=request.user.mentor_profile)
+        slot = get_object_or_404(MentorAvailability, id=pk, mentor=identity.mentor_profile_or_404(request.user))
 
     
     except Exception:
@@ -251,13 +400,7 @@ def edit_availability(request, pk):
                 return render(request, 'edit_availability.html', context)
             
 
-            conflict_date = MentorAvailability.objects.filter(
-                mentor = request.user.mentor_profile,
-                start_time__lt = end,
-                end_time__gt = start
-            ).exclude(pk=slot.pk)
-
-            if conflict_date:
+            if services.has_overlap(identity.mentor_profile_or_404(request.user), start, end, exclude_pk=slot.pk):
                 messages.error(request, 'This time slot conflicts with an existing availability.')
                 return render(request, 'edit_availability.html', context)
             
@@ -265,11 +408,15 @@ def edit_availability(request, pk):
             with transaction.atomic():
                 slot.start_time = start
                 slot.end_time = end
-                slot.save()
+                slot.save(update_fields=['start_time', 'end_time'])
 
             messages.success(request, 'Availability slot updated successfully!')
             return redirect('availability_list')
         
+        except IntegrityError:
+            messages.error(request, 'This time slot conflicts with an existing availability.')
+            return render(request, 'edit_availability.html', context)
+
         except ValueError:
             messages.error(request, 'Invalid date or time format.')
             return render(request, 'edit_availability.html', context)
@@ -289,7 +436,7 @@ def create_task(request):
         messages.error(request, 'Access denied. Only Mentores can create tasks.')
         return redirect('login')
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
     
     my_mentees = MenteeProfile.objects.filter(user__mentor=request.user)
 
@@ -323,14 +470,7 @@ def create_task(request):
                     messages.error(request, 'Due date cannot be in the past.')
                     return render(request, 'create_task.html', context)
             
-            with transaction.atomic():
-                Task.objects.create(
-                    mentor=mentor_profile,
-                    mentee=mentee_profile,
-                    title=title,
-                    description=description,
-                    due_date=due_date
-                )
+            services.create_task(mentor_profile, mentee_profile, title, description, due_date)
             messages.success(request, 'Task created successfully!')
             return redirect('list_task')
         
@@ -348,13 +488,14 @@ def create_task(request):
 
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
+@read_from_replica()
 def list_task(request):
     if not request.user.is_mentor:
         messages.error(request, 'Access denied. Only Mentores can create tasks.')
         return redirect('login')
     
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
     
     tasks = Task.objects.filter(mentor = mentor_profile).order_by('due_date')
 
@@ -371,13 +512,12 @@ def delete_task(request, pk):
         return redirect('login')
     
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
     
     task = get_object_or_404(Task, mentor=mentor_profile, pk=pk)
     
     try:
-        with transaction.atomic():
-            task.delete()
+        services.delete_task(task)
         messages.success(request, 'Task deleted successfully!')
         return redirect('list_task')
 
@@ -393,14 +533,12 @@ def toggle_task_status(request, pk):
         messages.error(request, 'Access denied. Only Mentores can update task status.')
         return redirect('login')
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
     
     task = get_object_or_404(Task, mentor=mentor_profile, pk=pk)
     
     try:
-        with transaction.atomic():
-            task.is_done = not task.is_done
-            task.save()
+        services.set_task_done(task, not task.is_done)
         messages.success(request, 'Task status updated successfully!')
         return redirect('list_task')
     except Exception as e:
@@ -417,7 +555,7 @@ def edit_task(request, pk):
         messages.error(request, 'Access denied. Only Mentores can create tasks.')
         return redirect('login')
     
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
 
     task = get_object_or_404(Task, mentor=mentor_profile, pk=pk)
 
@@ -444,11 +582,12 @@ def edit_task(request, pk):
                     messages.error(request, 'Due date cannot be in the past.')
                     return render(request, 'edit_task.html', context)
             
+            # Status and mentee are not editable here, so the task counters stay as they are
             with transaction.atomic():
                 task.title = title
                 task.description = description                
                 task.due_date = due_date
-                task.save()
+                task.save(update_fields=['title', 'description', 'due_date'])
             messages.success(request, 'Task updated successfully!')
             return redirect('list_task')
         
@@ -473,7 +612,7 @@ def upload_meeting_recording(request):
         return redirect('login')
     
 
-    mentor_profile = get_object_or_404(MentorProfile, user=request.user)
+    mentor_profile = identity.mentor_profile_or_404(request.user)
 
 
     my_mentees = MenteeProfile.objects.filter(user__mentor=request.user)
@@ -524,12 +663,106 @@ def upload_meeting_recording(request):
 
 
 
+def upload_error(error):
+    return JsonResponse({'error': str(error)}, status=error.status)
+
+
+
+@login_required(redirect_field_name='login')
+@require_http_methods(['POST'])
+def create_recording_upload(request):
+    # Step 1 of the resumable upload in upload_meeting_recording.html
+    if not request.user.is_mentor:
+        return JsonResponse({'error': 'Only mentors can upload recordings.'}, status=403)
+
+    mentor_profile = identity.mentor_profile_or_404(request.user)
+
+    mentee_email = request.POST.get('mentee_email')
+    title = request.POST.get('title')
+    filename = request.POST.get('filename')
+
+    if not all([mentee_email, title, filename]):
+        return JsonResponse({'error': 'Mentee, title and file are required.'}, status=400)
+
+    mentee_profile = MenteeProfile.objects.filter(user__email=mentee_email, user__mentor=request.user).first()
+    if mentee_profile is None:
+        return JsonResponse({'error': 'Selected Mentee is not associated with your profile.'}, status=400)
+
+    try:
+        size = int(request.headers.get('Upload-Length') or request.POST.get('size', ''))
+        upload = uploads.create_upload(mentor_profile, mentee_profile, title, filename, size)
+    except ValueError:
+        return JsonResponse({'error': 'The file size is required.'}, status=400)
+    except uploads.UploadError as error:
+        return upload_error(error)
+
+    url = reverse('recording_upload', args=[upload.pk])
+    response = JsonResponse({'url': url, 'offset': 0, 'size': upload.size}, status=201)
+    response['Location'] = url
+    response['Upload-Offset'] = '0'
+    return response
+
+
+
+@login_required(redirect_field_name='login')
+@require_http_methods(['HEAD', 'PATCH', 'DELETE'])
+def recording_upload(request, pk):
+    upload = get_object_or_404(RecordingUpload, pk=pk, mentor__user=request.user)
+
+    if request.method == 'DELETE':
+        uploads.abort_upload(upload)
+        return HttpResponse(status=204)
+
+    if request.method == 'PATCH':
+        if request.content_type != 'application/offset+octet-stream':
+            return JsonResponse({'error': 'Send chunks as application/offset+octet-stream.'}, status=415)
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length are required.'}, status=400)
+
+        try:
+            checksum = uploads.parse_checksum(request.headers.get('Upload-Checksum'))
+            upload = uploads.append_chunk(upload, offset, request, length, checksum)
+        except uploads.UploadError as error:
+            return upload_error(error)
+
+        response = HttpResponse(status=204)
+    else:
+        response = HttpResponse()
+        response['Upload-Length'] = str(upload.size)
+
+    response['Upload-Offset'] = str(upload.offset)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+
+@login_required(redirect_field_name='login')
+@require_http_methods(['POST'])
+def finalize_recording_upload(request, pk):
+    upload = get_object_or_404(RecordingUpload, pk=pk, mentor__user=request.user)
+
+    try:
+        checksum = uploads.parse_checksum(request.POST.get('checksum'))
+        uploads.finalize_upload(upload, checksum)
+    except uploads.UploadError as error:
+        return upload_error(error)
+
+    messages.success(request, 'Meeting recording uploaded successfully!')
+    return JsonResponse({'redirect': reverse('list_meeting_recordings')})
+
+
+
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
+@read_from_replica()
 def list_meeting_recordings(request):    
 
     if request.user.is_mentor:
-        mentor_profile = get_object_or_404(MentorProfile, user=request.user)        
+        mentor_profile = identity.mentor_profile_or_404(request.user)        
         recordings = MeetingRecording.objects.filter(mentor=mentor_profile).order_by('mentee', '-uploaded_at')
 
         context = {
@@ -538,7 +771,7 @@ def list_meeting_recordings(request):
         }
         
     elif request.user.is_mentee:
-        mentee_profile = get_object_or_404(MenteeProfile, user=request.user)
+        mentee_profile = identity.mentee_profile_or_404(request.user)
         recordings = MeetingRecording.objects.filter(mentee=mentee_profile).order_by('mentee', '-uploaded_at')
 
         context = {
@@ -555,23 +788,39 @@ def list_meeting_recordings(request):
 
 
 
+@login_required(redirect_field_name='login')
+@require_http_methods(['GET', 'HEAD'])
+def stream_meeting_recording(request, pk):
+    # Same ownership rules as list_meeting_recordings
+    if request.user.is_mentor:
+        recording = get_object_or_404(MeetingRecording, pk=pk, mentor__user=request.user)
+    elif request.user.is_mentee:
+        recording = get_object_or_404(MeetingRecording, pk=pk, mentee__user=request.user)
+    else:
+        raise Http404('Recording not found.')
+
+    if not recording.video:
+        raise Http404('Recording not found.')
+
+    return serve_file(request, recording.video)
+
+
+
 @login_required(redirect_field_name='login')
 @require_http_methods(['GET'])
 def mentor_profile(request):
 
 
 
-    # get mentor profile directly
-    mentor_profile = request.user.mentor.mentor_profile
+    # get mentor profile directly, with the mentor's user
+    profile_id = identity.identity(request.user)['mentors_profile_id']
+    mentor_profile = get_object_or_404(MentorProfile.objects.select_related('user'), pk=profile_id)
 
     # get mentor user form CustomUser
     mentor_user = mentor_profile.user
 
-    # Format languages for display
-    language_codes = mentor_profile.language.split(',') if mentor_profile.language else []
-    language_map = dict(MentorProfile.LANGUAGE_CHOICES)
-    full_language_names = [language_map.get(code, code.upper()) for code in language_codes if code]
-    formatted_languages = ', '.join(full_language_names) if full_language_names else "Not specified"
+    # The page body is cached; languages are only read when it is rendered
+    stamp = fragments.stamp(MentorProfile, mentor_profile.pk)
 
 
     
@@ -580,7 +829,8 @@ def mentor_profile(request):
 
         'mentor_user': mentor_user,
         'mentor_profile': mentor_profile,
-        'formatted_languages': formatted_languages,
+        'stamp': stamp,
+        'fragment_timeout': fragments.TIMEOUT,
 
     }
     